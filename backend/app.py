@@ -1,24 +1,38 @@
 import os
+import asyncio
 import uuid
+import hashlib
 import json
-import base64
 import shutil
-import tempfile
 import re
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import BinaryIO, List, Optional, Dict, Any, Tuple
+from urllib.parse import quote
 
 import numpy as np
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel
-from skimage import io as skio
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, Response
+from starlette.datastructures import Headers
+from pydantic import BaseModel, Field
 import tifffile
 import io
 
-from inference import create_predictor, BiomassPredictor
+from inference import create_predictor, BiomassPredictor, PredictionJob
+from scheduler import MicroBatchScheduler
+from executor import BoundedExecutor, ExecutorSaturated
+from worker_pool import InferenceWorkerPool
+from dataset import MAX_TTA, IMG_SIZE, read_imgs, read_imgs_from_files, set_decode_threads
+from tiling import predict_scene
+from chip_cache import ChipCache, chip_files_signature
+from chip_store import open_store
+from chip_catalog import ChipCatalog
+from gt_cache import GroundTruthCache
+from result_store import ResultStore
+from prediction_cache import PredictionCache, fingerprint, upload_fingerprint
+from rendering import MEDIA_TYPES, get_lut
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -41,21 +55,139 @@ BASE_PATH = Path(__file__).resolve().parent.parent
 TEST_DATA_PATH = BASE_PATH / "test_subset100chip"
 RESULTS_PATH = BASE_PATH / "results"
 RESULTS_PATH.mkdir(exist_ok=True)
+# Full-size scenes for sliding-window prediction (<scene_id>_S{1,2}_MM.tif)
+SCENES_PATH = Path(os.environ.get("BIOMASS_SCENES_PATH", str(BASE_PATH / "scenes")))
+# Scene jobs run on their own executor so a long scene never holds up chip
+# requests; finished jobs and their output files expire after the TTL
+SCENE_WORKERS = int(os.environ.get("BIOMASS_SCENE_WORKERS", "1"))
+SCENE_MAX_PENDING = int(os.environ.get("BIOMASS_SCENE_MAX_PENDING", "4"))
+SCENE_JOB_TTL_S = float(os.environ.get("BIOMASS_SCENE_JOB_TTL_S", "3600"))
+
+# Micro-batching: requests arriving within the window share a forward pass
+MAX_BATCH_SIZE = int(os.environ.get("BIOMASS_MAX_BATCH_SIZE", "8"))
+BATCH_WINDOW_MS = float(os.environ.get("BIOMASS_BATCH_WINDOW_MS", "10"))
+# Jobs allowed to wait for a batch before requests get 503
+SCHEDULER_MAX_QUEUE = int(os.environ.get("BIOMASS_SCHEDULER_MAX_QUEUE", "64"))
+
+# Models load lazily on first request unless preloading is enabled
+PRELOAD_MODELS = os.environ.get("BIOMASS_PRELOAD_MODELS", "0") == "1"
+
+# Worker-pool mode: N inference processes share the model weights (0 = in-process)
+WORKER_PROCESSES = int(os.environ.get("BIOMASS_WORKER_PROCESSES", "0"))
+
+# Executors keep inference and raster decoding off the event loop.
+# Inference shares the in-process models, so it always uses threads (in
+# worker-pool mode those threads only wait on the pool); decoding and heatmap
+# rendering can use a process pool (BIOMASS_IO_EXECUTOR=process).
+INFERENCE_WORKERS = int(os.environ.get("BIOMASS_INFERENCE_WORKERS", str(max(1, WORKER_PROCESSES))))
+INFERENCE_MAX_PENDING = int(os.environ.get("BIOMASS_INFERENCE_MAX_PENDING", "16"))
+IO_EXECUTOR_KIND = os.environ.get("BIOMASS_IO_EXECUTOR", "thread")
+IO_WORKERS = int(os.environ.get("BIOMASS_IO_WORKERS", "4"))
+IO_MAX_PENDING = int(os.environ.get("BIOMASS_IO_MAX_PENDING", "64"))
+
+# Preprocessed chip stacks (~47 MB each in float32) kept across requests (0 disables)
+CHIP_CACHE_MB = float(os.environ.get("BIOMASS_CHIP_CACHE_MB", "512"))
+CHIP_CACHE_DTYPE = os.environ.get("BIOMASS_CHIP_CACHE_DTYPE", "float32")
+
+# Keep chips as native int16/uint16 values through caching, batching and worker
+# IPC and normalise on the inference device (38 instead of 60 bytes per pixel)
+RAW_INPUTS = os.environ.get("BIOMASS_RAW_INPUTS", "0") == "1"
+
+# Threads decoding the 24 monthly TIFFs of a chip concurrently (1 = sequential)
+DECODE_THREADS = int(os.environ.get("BIOMASS_DECODE_THREADS", str(min(8, os.cpu_count() or 1))))
+
+# Upload bodies are counted as they arrive and cut off at the size limit;
+# files are hashed, validated and decoded in place from Starlette's spool.
+UPLOAD_MAX_FILES = int(os.environ.get("BIOMASS_UPLOAD_MAX_FILES", "25"))
+UPLOAD_MAX_BYTES = int(float(os.environ.get("BIOMASS_UPLOAD_MAX_MB", "256")) * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Seconds between chip catalog refreshes (re-stats only chips whose files were added or removed)
+CATALOG_REFRESH_S = float(os.environ.get("BIOMASS_CATALOG_REFRESH_S", "30"))
+
+# Decoded ground truth with precomputed stats and heatmaps (~0.4 MB per chip);
+# warm-up decodes and renders the catalog's ground truth in the background
+GT_CACHE_MB = float(os.environ.get("BIOMASS_GT_CACHE_MB", "256"))
+GT_WARMUP = os.environ.get("BIOMASS_GT_WARMUP", "0") == "1"
+
+# Model outputs keyed by input fingerprint, checkpoint digest and TTA
+# (~0.25 MB per model and chip, twice that for ensembles)
+PREDICTION_CACHE_MB = float(os.environ.get("BIOMASS_PREDICTION_CACHE_MB", "256"))
+
+# Stored prediction maps under RESULTS_PATH/predictions (float16 halves disk use)
+RESULTS_DTYPE = os.environ.get("BIOMASS_RESULTS_DTYPE", "float32")
+
+# Result retention (0 disables a limit); the sweep runs in the background
+RESULTS_MAX_AGE_H = float(os.environ.get("BIOMASS_RESULTS_MAX_AGE_H", "0"))
+RESULTS_MAX_COUNT = int(os.environ.get("BIOMASS_RESULTS_MAX_COUNT", "1000"))
+RESULTS_MAX_MB = int(os.environ.get("BIOMASS_RESULTS_MAX_MB", "2048"))
+RESULTS_SWEEP_S = float(os.environ.get("BIOMASS_RESULTS_SWEEP_S", "60"))
+
+# A stored result's heatmaps never change; ground truth can, so it is revalidated
+RESULT_HEATMAP_CACHE_CONTROL = "public, max-age=31536000, immutable"
+GT_HEATMAP_CACHE_CONTROL = "no-cache"
+
+# Packed chip store built with chip_store.py; chips missing from it fall back to TIFFs
+CHIP_STORE_PATH = os.environ.get("BIOMASS_CHIP_STORE")
+
+inference_executor = BoundedExecutor(
+    "inference",
+    kind="thread",
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING
+)
+io_executor = BoundedExecutor(
+    "io",
+    kind=IO_EXECUTOR_KIND,
+    max_workers=IO_WORKERS,
+    max_pending=IO_MAX_PENDING
+)
+scene_executor = BoundedExecutor(
+    "scene",
+    kind="thread",
+    max_workers=SCENE_WORKERS,
+    max_pending=SCENE_MAX_PENDING
+)
+
+set_decode_threads(DECODE_THREADS)
+chip_cache = ChipCache(int(CHIP_CACHE_MB * 1024 * 1024), dtype=CHIP_CACHE_DTYPE)
+chip_store = open_store(CHIP_STORE_PATH)
+prediction_cache = PredictionCache(int(PREDICTION_CACHE_MB * 1024 * 1024))
 
 # Initialize predictor
 predictor: Optional[BiomassPredictor] = None
+scheduler: Optional[MicroBatchScheduler] = None
+worker_pool: Optional[InferenceWorkerPool] = None
+catalog: Optional[ChipCatalog] = None
+catalog_task: Optional[asyncio.Task] = None
+gt_cache: Optional[GroundTruthCache] = None
+gt_warmup_task: Optional[asyncio.Task] = None
 
-# Results storage (in-memory for demo, use database for production)
-results_storage: Dict[str, Dict] = {}
+# Prediction results on disk; only a small summary per result stays in memory
+result_store: Optional[ResultStore] = None
+retention_task: Optional[asyncio.Task] = None
+retention_wakeup: Optional[asyncio.Event] = None
+
+# Sliding-window scene jobs; tasks are kept referenced until they finish
+scene_jobs: Dict[str, Dict] = {}
+scene_tasks = set()
 
 
 class PredictionRequest(BaseModel):
     chip_id: str
     model_names: Optional[List[str]] = None
-    ntta: int = 1
+    ntta: int = Field(1, ge=1, le=MAX_TTA)
     include_ground_truth: bool = True
 
 
+class ScenePredictionRequest(BaseModel):
+    scene_id: str = Field(..., pattern=r"^[A-Za-z0-9_-]+$")
+    model_names: Optional[List[str]] = None
+    ntta: int = Field(1, ge=1, le=MAX_TTA)
+    overlap: int = Field(64, ge=0, lt=IMG_SIZE[0])
+    batch_size: int = Field(8, ge=1, le=64)
+
+
 class PredictionResult(BaseModel):
     id: str
     chip_id: str
@@ -85,11 +217,449 @@ def extract_chip_id(filename: str) -> Optional[str]:
 @app.on_event("startup")
 async def startup_event():
     """Initialize models on startup."""
-    global predictor
+    global predictor, scheduler, worker_pool, catalog, catalog_task, gt_cache, gt_warmup_task
+    global result_store, retention_task, retention_wakeup
+    # Colour tables are built from matplotlib once, before any I/O worker forks
+    for colormap in ("viridis", "magma"):
+        await asyncio.to_thread(get_lut, colormap)
+    result_store = await asyncio.to_thread(
+        ResultStore,
+        RESULTS_PATH / "predictions",
+        RESULTS_DTYPE,
+        RESULTS_MAX_AGE_H * 3600,
+        RESULTS_MAX_COUNT,
+        RESULTS_MAX_MB * 1024 * 1024
+    )
+    retention_wakeup = asyncio.Event()
+    retention_task = asyncio.create_task(enforce_result_retention())
+    catalog = await asyncio.to_thread(
+        ChipCatalog,
+        TEST_DATA_PATH / "test_features",
+        TEST_DATA_PATH / "test_agbm",
+        chip_store
+    )
+    print(f"Chip catalog: {len(catalog)} chips")
+    if CATALOG_REFRESH_S > 0:
+        catalog_task = asyncio.create_task(refresh_catalog_periodically())
+    
+    gt_cache = GroundTruthCache(TEST_DATA_PATH / "test_agbm", int(GT_CACHE_MB * 1024 * 1024), store=chip_store)
+    if GT_WARMUP:
+        chip_ids = [entry.chip_id for entry in catalog.list(has_ground_truth=True)[0]]
+        gt_warmup_task = asyncio.create_task(asyncio.to_thread(gt_cache.warm, chip_ids))
+    
     print("Initializing biomass prediction models...")
     predictor = create_predictor(BASE_PATH)
-    load_results = predictor.load_all_models()
-    print(f"Model loading results: {load_results}")
+    if PRELOAD_MODELS:
+        load_results = predictor.load_all_models()
+        print(f"Model loading results: {load_results}")
+    else:
+        print(f"Models available for lazy loading: {predictor.available_models()}")
+    predictor.ground_truth_cache = gt_cache
+    
+    if WORKER_PROCESSES > 0:
+        worker_pool = InferenceWorkerPool(
+            predictor.models.resident(),
+            weights_paths={name: predictor.weights_file(name) for name in predictor.models.keys()},
+            num_workers=WORKER_PROCESSES,
+            batched_tta=predictor.batched_tta
+        )
+        worker_pool.start()
+        predictor.worker_pool = worker_pool
+    
+    scheduler = MicroBatchScheduler(
+        predictor,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=BATCH_WINDOW_MS,
+        executor=inference_executor,
+        max_concurrent_batches=INFERENCE_WORKERS,
+        max_queue_size=SCHEDULER_MAX_QUEUE
+    )
+    await scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batching scheduler and executors."""
+    if catalog_task is not None:
+        catalog_task.cancel()
+    if retention_task is not None:
+        retention_task.cancel()
+    if scheduler is not None:
+        await scheduler.stop()
+    if worker_pool is not None:
+        worker_pool.stop()
+    inference_executor.shutdown(wait=False)
+    scene_executor.shutdown(wait=False)
+    io_executor.shutdown(wait=False)
+
+
+async def refresh_catalog_periodically():
+    """Pick up added or removed chips; an unchanged directory costs two stat calls, a changed one a listing."""
+    while True:
+        await asyncio.sleep(CATALOG_REFRESH_S)
+        try:
+            await asyncio.to_thread(catalog.refresh)
+        except Exception as e:
+            print(f"Chip catalog refresh failed: {e}")
+
+
+async def enforce_result_retention():
+    """Evict expired and over-budget results every sweep interval, or right after a save pushes the store over a limit."""
+    while True:
+        try:
+            await asyncio.wait_for(retention_wakeup.wait(), timeout=RESULTS_SWEEP_S if RESULTS_SWEEP_S > 0 else None)
+        except asyncio.TimeoutError:
+            pass
+        retention_wakeup.clear()
+        try:
+            await asyncio.to_thread(result_store.evict)
+        except Exception as e:
+            print(f"Result retention sweep failed: {e}")
+
+
+class UploadLimitMiddleware:
+    """
+    Cap the request body of an upload route at `max_bytes`.
+
+    A declared Content-Length over the limit is rejected before anything is
+    read; otherwise body chunks are counted as the form parser receives them
+    and parsing stops with a 413 as soon as the total passes the limit, so an
+    oversized upload never reaches the spool in full.
+    """
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def too_large(self) -> HTTPException:
+        return HTTPException(status_code=413, detail=f"Upload exceeds {self.max_bytes // (1024 * 1024)} MB")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": self.too_large().detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise self.too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadLimitMiddleware, path="/api/predict/upload", max_bytes=UPLOAD_MAX_BYTES)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc: ExecutorSaturated):
+    """Reject work when an executor backlog is full instead of queueing forever."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+def chip_input_key(chip_id: str, features_dir: Path, signature: Tuple) -> Optional[str]:
+    """
+    Fingerprint of a chip's inputs: its store slice (with the store files'
+    mtimes and sizes, so a rebuilt store misses), or its files' names, mtimes
+    and sizes.
+    """
+    if chip_store is not None and chip_id in chip_store:
+        return fingerprint(("store", str(chip_store.path), chip_store.signature(), chip_id))
+    if not signature:
+        return None
+    return fingerprint(("files", str(Path(features_dir).resolve()), signature))
+
+
+async def predict_with_cache(
+    input_key: Optional[str],
+    chip_id: str,
+    model_names: Optional[List[str]],
+    ntta: int,
+    ground_truth: Optional[np.ndarray],
+    make_inputs
+) -> Dict:
+    """
+    Serve models whose output for this input is cached and run only the rest.
+
+    `make_inputs` is awaited for the (images, masks) tensors only when some
+    model misses, so a full hit skips decoding too. Stats and metrics of
+    cached outputs are recomputed; those entries are marked "cached".
+    """
+    names = model_names if model_names is not None else predictor.available_models()
+    fingerprints = {}
+    if input_key is not None and prediction_cache.enabled:
+        fingerprints = await asyncio.to_thread(
+            lambda: {m: predictor.model_fingerprint(m) for m in names if m in predictor.model_infos}
+        )
+    
+    cached = {}
+    for model_name, model_fingerprint in fingerprints.items():
+        if model_fingerprint is not None:
+            entry = prediction_cache.get((input_key, model_fingerprint, ntta))
+            if entry is not None:
+                cached[model_name] = entry
+    
+    computed, failed = {}, {}
+    missing = [m for m in names if m not in cached]
+    if missing:
+        images, masks = await make_inputs()
+        result = await scheduler.submit(PredictionJob(
+            chip_id=chip_id,
+            images=images,
+            masks=masks,
+            model_names=missing,
+            ntta=ntta,
+            ground_truth=ground_truth
+        ))
+        computed = result["predictions"]
+        failed = result["failed_models"]
+        for model_name, pred_data in computed.items():
+            if fingerprints.get(model_name) is not None:
+                prediction_cache.put(
+                    (input_key, fingerprints[model_name], ntta),
+                    pred_data["prediction"],
+                    pred_data["uncertainty"],
+                    pred_data["processing_time"]
+                )
+    
+    predictions = {}
+    for model_name in names:
+        if model_name in cached:
+            entry = cached[model_name]
+            predictions[model_name] = predictor.build_prediction(
+                model_name, entry.prediction, entry.processing_time, ground_truth, entry.uncertainty
+            )
+            predictions[model_name]["cached"] = True
+        elif model_name in computed:
+            predictions[model_name] = computed[model_name]
+    
+    return {
+        "chip_id": chip_id,
+        "predictions": predictions,
+        "failed_models": failed,
+        "ground_truth_available": ground_truth is not None
+    }
+
+
+def cached_chip_inputs(chip_id: str, features_dir: Path, signature: Tuple) -> Optional[Tuple]:
+    """Tensors of a chip held in the chip cache, or None on a miss."""
+    cached = chip_cache.get(chip_id, features_dir, signature)
+    return predictor.to_tensors(*cached) if cached is not None else None
+
+
+def cache_chip_inputs(
+    chip_id: str,
+    features_dir: Path,
+    imgs: np.ndarray,
+    mask: np.ndarray,
+    signature: Tuple
+) -> Tuple:
+    """Insert a decoded chip into the chip cache (casting it to the cache dtype) and return its tensors."""
+    chip_cache.put(chip_id, features_dir, imgs, mask, signature)
+    return predictor.to_tensors(imgs, mask)
+
+
+async def run_chip_prediction(
+    chip_id: str,
+    features_dir: Path,
+    model_names: Optional[List[str]],
+    ntta: int,
+    include_ground_truth: bool = True
+) -> Dict:
+    """
+    Decode a chip (and its ground truth) off the event loop and run it through the scheduler.
+
+    File stats, chip cache lookups and inserts and tensor conversion all
+    block, so they run on the I/O executor's threads too.
+    """
+    signature = await io_executor.run_shared(chip_files_signature, chip_id, features_dir)
+    gt_map = None
+    if include_ground_truth:
+        # Shared with /api/ground-truth; decoded once per chip
+        gt = await io_executor.run_shared(gt_cache.get, chip_id)
+        gt_map = gt.array if gt is not None else None
+    
+    async def make_inputs():
+        inputs = await io_executor.run_shared(cached_chip_inputs, chip_id, features_dir, signature)
+        if inputs is None:
+            # Pinned stacks only help when decoding runs in this process
+            pin = predictor.pin_inputs and io_executor.kind == "thread"
+            imgs, mask = await io_executor.run(read_imgs, chip_id, features_dir, chip_store, pin_memory=pin, raw=RAW_INPUTS)
+            inputs = await io_executor.run_shared(cache_chip_inputs, chip_id, features_dir, imgs, mask, signature)
+        return inputs
+    
+    input_key = await io_executor.run_shared(chip_input_key, chip_id, features_dir, signature)
+    return await predict_with_cache(
+        input_key,
+        chip_id,
+        model_names,
+        ntta,
+        gt_map,
+        make_inputs
+    )
+
+
+def hash_uploads(uploads: Dict[str, BinaryIO]) -> Dict[str, str]:
+    """SHA-256 of each uploaded file, read in chunks from its spooled file."""
+    hashes = {}
+    for filename, f in uploads.items():
+        f.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        hashes[filename] = digest.hexdigest()
+    return hashes
+
+
+def check_uploads(uploads: Dict[str, BinaryIO]) -> Tuple[Dict[str, BinaryIO], List[str]]:
+    """
+    Validate uploaded files from their TIFF headers alone.
+
+    Unreadable files are skipped as before; S1/S2/AGBM files whose shape is
+    not a chip's are reported as errors, so nothing larger than a chip is ever
+    decoded. Returns the usable files and the errors.
+    """
+    expected = {"_S1_": IMG_SIZE + (4,), "_S2_": IMG_SIZE + (11,)}
+    valid, errors = {}, []
+    for filename, f in uploads.items():
+        try:
+            f.seek(0)
+            with tifffile.TiffFile(f, name=filename) as tif:
+                shape = tuple(tif.series[0].shape)
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+            continue
+        
+        if "_agbm" in filename.lower():
+            if shape not in (IMG_SIZE, IMG_SIZE + (1,)):
+                errors.append(f"{filename}: expected shape {IMG_SIZE}, got {shape}")
+                continue
+        else:
+            sensor = next((key for key in expected if key in filename), None)
+            if sensor is None:
+                continue
+            if shape != expected[sensor]:
+                errors.append(f"{filename}: expected shape {expected[sensor]}, got {shape}")
+                continue
+        valid[filename] = f
+    return valid, errors
+
+
+def load_upload_ground_truth(f: BinaryIO) -> np.ndarray:
+    """Decode an uploaded AGBM map as a float32 [H, W] array."""
+    f.seek(0)
+    ground_truth = tifffile.imread(f, name="agbm.tif").astype(np.float32)
+    if ground_truth.ndim == 3:
+        ground_truth = ground_truth[..., 0]
+    return ground_truth
+
+
+async def store_prediction_results(results: Dict) -> Dict:
+    """Render heatmaps, store the result and build the API response."""
+    # Generate result ID
+    result_id = str(uuid.uuid4())[:8]
+    timestamp = datetime.now().isoformat()
+    
+    # Render heatmaps; the response links to them instead of embedding them
+    model_fields = {}
+    maps, heatmaps = {}, {}
+    for model_name, pred_data in results["predictions"].items():
+        heatmap_bytes = await io_executor.run(
+            BiomassPredictor.prediction_to_heatmap,
+            pred_data["prediction"],
+            vmin=0,
+            vmax=400,
+            colormap="viridis"
+        )
+        maps[model_name] = {"prediction": pred_data["prediction"]}
+        heatmaps[model_name] = {"prediction": heatmap_bytes}
+        
+        model_fields[model_name] = {
+            "stats": pred_data["stats"],
+            "metrics": pred_data["metrics"],
+            "processing_time": pred_data["processing_time"],
+            "backbone": pred_data["backbone"],
+            "cached": pred_data.get("cached", False)
+        }
+        
+        # Ensembles also return the per-pixel spread of their members
+        if pred_data.get("uncertainty") is not None:
+            uncertainty_bytes = await io_executor.run(
+                BiomassPredictor.prediction_to_heatmap,
+                pred_data["uncertainty"],
+                vmin=0,
+                vmax=100,
+                colormap="magma"
+            )
+            model_fields[model_name]["uncertainty_stats"] = pred_data["uncertainty_stats"]
+            maps[model_name]["uncertainty"] = pred_data["uncertainty"]
+            heatmaps[model_name]["uncertainty"] = uncertainty_bytes
+    
+    # Store result: maps and heatmaps go to disk, the JSON fields to its metadata
+    await asyncio.to_thread(
+        result_store.save,
+        result_id,
+        results["chip_id"],
+        timestamp,
+        results["ground_truth_available"],
+        model_fields,
+        maps,
+        heatmaps
+    )
+    if result_store.over_limits():
+        retention_wakeup.set()
+    
+    return {
+        "id": result_id,
+        "chip_id": results["chip_id"],
+        "timestamp": timestamp,
+        "models": {
+            name: result_model_response(result_id, name, fields, heatmaps[name])
+            for name, fields in model_fields.items()
+        },
+        # Requested models with no output, e.g. an ensemble missing a member
+        "failed_models": results.get("failed_models", {}),
+        "ground_truth_available": results["ground_truth_available"]
+    }
+
+
+def result_model_response(result_id: str, model_name: str, fields: Dict, heatmap_kinds) -> Dict:
+    """A model's stats and metrics plus the URLs of its heatmaps."""
+    url = f"/api/results/{quote(result_id)}/heatmap/{quote(model_name)}"
+    response = {"heatmap_url": url}
+    if "uncertainty" in heatmap_kinds:
+        response["uncertainty_heatmap_url"] = f"{url}?kind=uncertainty"
+    response.update(fields)
+    return response
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def heatmap_response(etag: str, cache_control: str, content: Optional[bytes]) -> Response:
+    """PNG response, or 304 Not Modified when the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if content is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=MEDIA_TYPES["png"], headers=headers)
 
 
 @app.get("/")
@@ -115,29 +685,120 @@ async def get_models():
     
     return {
         "models": predictor.get_model_info(),
-        "device": str(predictor.device)
+        "device": str(predictor.device),
+        "registry": predictor.models.get_stats()
     }
 
 
-@app.get("/api/chips")
-async def get_available_chips():
-    """Get list of available chip IDs in test dataset."""
-    features_dir = TEST_DATA_PATH / "test_features"
+@app.get("/api/scheduler")
+async def get_scheduler_stats():
+    """Get micro-batching queue depth and batch-size statistics."""
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Scheduler not initialized")
     
-    if not features_dir.exists():
-        return {"chips": [], "message": "Test features directory not found"}
+    return scheduler.get_stats()
+
+
+@app.get("/api/executor")
+async def get_executor_stats():
+    """Get configuration and occupancy of the inference and I/O executors."""
+    return {
+        "inference": inference_executor.get_stats(),
+        "scene": scene_executor.get_stats(),
+        "io": io_executor.get_stats()
+    }
+
+
+@app.get("/api/workers")
+async def get_worker_stats():
+    """Get inference worker-pool load and shared-weight statistics."""
+    if worker_pool is None:
+        return {"running": False, "num_workers": 0}
     
-    # Find unique chip IDs
-    chip_ids = set()
-    for f in features_dir.glob("*_S1_*.tif"):
-        chip_id = f.name.split("_S1_")[0]
-        chip_ids.add(chip_id)
+    return worker_pool.get_stats()
+
+
+@app.get("/api/cache/chips")
+async def get_chip_cache_stats():
+    """Get preprocessed chip cache occupancy and hit/miss/eviction counters."""
+    stats = chip_cache.get_stats()
+    stats["store"] = chip_store.get_stats() if chip_store is not None else None
+    return stats
+
+
+@app.delete("/api/cache/chips")
+async def invalidate_chip_cache(chip_id: Optional[str] = Query(None)):
+    """Drop one chip (chip_id) or every chip from the preprocessed chip cache."""
+    removed = chip_cache.invalidate(chip_id)
+    return {"message": "Chip cache invalidated", "chip_id": chip_id, "removed": removed}
+
+
+@app.get("/api/cache/predictions")
+async def get_prediction_cache_stats():
+    """Get prediction cache occupancy and hit/miss/eviction counters."""
+    return prediction_cache.get_stats()
+
+
+@app.delete("/api/cache/predictions")
+async def clear_prediction_cache():
+    """Drop every cached model output."""
+    removed = prediction_cache.clear()
+    return {"message": "Prediction cache cleared", "removed": removed}
+
+
+@app.get("/api/chips")
+async def get_available_chips(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    prefix: Optional[str] = Query(None),
+    has_ground_truth: Optional[bool] = Query(None),
+    min_months: int = Query(0, ge=0, le=12),
+    complete: bool = Query(False),
+    details: bool = Query(False)
+):
+    """
+    List chip IDs in the test dataset from the chip catalog, one page at a time.
     
-    return {
-        "chips": sorted(list(chip_ids)),
-        "count": len(chip_ids),
-        "features_dir": str(features_dir)
+    Filters: `prefix` (chip ID prefix), `has_ground_truth`, `min_months` (months
+    with S1 or S2) and `complete` (S1 and S2 for all 12 months). With
+    `details=true` per-chip month availability and file sizes are included.
+    """
+    entries, total = catalog.list(
+        offset=offset,
+        limit=limit,
+        prefix=prefix,
+        has_ground_truth=has_ground_truth,
+        min_months=min_months,
+        complete=complete
+    )
+    response = {
+        "chips": [entry.chip_id for entry in entries],
+        "count": len(entries),
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "features_dir": str(catalog.features_dir)
     }
+    if details:
+        response["details"] = [entry.to_dict() for entry in entries]
+    return response
+
+
+@app.get("/api/chips/{chip_id}")
+async def get_chip(chip_id: str):
+    """Get one chip's S1/S2 month availability, ground truth presence and file sizes."""
+    entry = await io_executor.run_shared(catalog.lookup, chip_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Chip {chip_id} not found")
+    
+    return entry.to_dict()
+
+
+@app.post("/api/chips/refresh")
+async def refresh_chip_catalog(force: bool = Query(False)):
+    """Rescan the test dataset now (only if it changed, unless force=true)."""
+    changes = await asyncio.to_thread(catalog.refresh, force)
+    return {**changes, **catalog.get_stats()}
 
 
 @app.post("/api/predict")
@@ -147,87 +808,155 @@ async def predict_biomass(request: PredictionRequest):
         raise HTTPException(status_code=503, detail="Models not initialized")
     
     features_dir = TEST_DATA_PATH / "test_features"
-    gt_dir = TEST_DATA_PATH / "test_agbm"
     
-    # Check if chip exists
-    s1_file = features_dir / f"{request.chip_id}_S1_00.tif"
-    if not s1_file.exists():
+    # Check if chip exists (any S1/S2 month, on disk or in the chip store)
+    if await io_executor.run_shared(catalog.lookup, request.chip_id) is None:
         raise HTTPException(status_code=404, detail=f"Chip {request.chip_id} not found")
     
-    # Get ground truth path if requested
-    gt_path = None
-    if request.include_ground_truth:
-        gt_path = gt_dir / f"{request.chip_id}_agbm.tif"
-        if not gt_path.exists():
-            gt_path = None
-    
     # Run prediction
     try:
-        results = predictor.predict(
-            chip_id=request.chip_id,
-            data_dir=features_dir,
-            model_names=request.model_names,
-            ntta=request.ntta,
-            ground_truth_path=gt_path
+        results = await run_chip_prediction(
+            request.chip_id,
+            features_dir,
+            request.model_names,
+            request.ntta,
+            request.include_ground_truth
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-    # Generate result ID
-    result_id = str(uuid.uuid4())[:8]
-    timestamp = datetime.now().isoformat()
+    return await store_prediction_results(results)
+
+
+async def run_scene_job(job_id: str, request: ScenePredictionRequest):
+    """Run a scene prediction on the scene executor and record its outcome."""
+    job = scene_jobs[job_id]
     
-    # Process predictions for response
-    processed_predictions = {}
-    for model_name, pred_data in results["predictions"].items():
-        # Convert prediction to base64 heatmap
-        heatmap_bytes = predictor.prediction_to_heatmap(
-            pred_data["prediction"],
-            vmin=0,
-            vmax=400,
-            colormap="viridis"
+    def progress(done: int, total: int):
+        job["windows_done"] = done
+        job["windows_total"] = total
+    
+    job["status"] = "running"
+    try:
+        result = await scene_executor.run(
+            predict_scene,
+            predictor,
+            SCENES_PATH,
+            request.scene_id,
+            RESULTS_PATH / "scenes" / job_id,
+            model_names=request.model_names,
+            overlap=request.overlap,
+            batch_size=request.batch_size,
+            ntta=request.ntta,
+            progress=progress
         )
-        heatmap_b64 = base64.b64encode(heatmap_bytes).decode()
-        
-        processed_predictions[model_name] = {
-            "heatmap": heatmap_b64,
-            "stats": pred_data["stats"],
-            "metrics": pred_data["metrics"],
-            "processing_time": pred_data["processing_time"],
-            "backbone": pred_data["backbone"]
-        }
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        job["finished_at"] = time.time()
+        return
     
-    # Store result
-    stored_result = {
-        "id": result_id,
-        "chip_id": results["chip_id"],
-        "timestamp": timestamp,
-        "models": processed_predictions,
-        "ground_truth_available": results["ground_truth_available"],
-        "predictions_raw": {
-            name: data["prediction"].tolist()
-            for name, data in results["predictions"].items()
+    job["status"] = "completed"
+    job["shape"] = result["shape"]
+    job["processing_time"] = result["processing_time"]
+    job["outputs"] = result["outputs"]
+    job["finished_at"] = time.time()
+
+
+async def expire_scene_jobs():
+    """Forget finished scene jobs older than the TTL and delete their output files."""
+    now = time.time()
+    expired = [
+        job_id for job_id, job in scene_jobs.items()
+        if "finished_at" in job and now - job["finished_at"] > SCENE_JOB_TTL_S
+    ]
+    for job_id in expired:
+        del scene_jobs[job_id]
+        await asyncio.to_thread(shutil.rmtree, RESULTS_PATH / "scenes" / job_id, True)
+
+
+def public_scene_job(job: Dict) -> Dict:
+    """Scene job as returned by the API (output files as download URLs)."""
+    response = {k: v for k, v in job.items() if k not in ("outputs", "finished_at")}
+    response["models"] = {
+        name: {
+            "stats": output["stats"],
+            "download_url": f"/api/predict/scene/{job['id']}/download/{name}"
         }
+        for name, output in job.get("outputs", {}).items()
     }
-    results_storage[result_id] = stored_result
+    return response
+
+
+@app.post("/api/predict/scene")
+async def predict_scene_endpoint(request: ScenePredictionRequest):
+    """
+    Start sliding-window prediction over a full-size scene in SCENES_PATH.
     
-    # Return response (without raw predictions to reduce size)
-    response = {
-        "id": result_id,
-        "chip_id": results["chip_id"],
-        "timestamp": timestamp,
-        "models": processed_predictions,
-        "ground_truth_available": results["ground_truth_available"]
+    Returns a job immediately; poll /api/predict/scene/{job_id} for progress.
+    """
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Models not initialized")
+    
+    if not any(SCENES_PATH.glob(f"{request.scene_id}_S[12]_*.tif")):
+        raise HTTPException(status_code=404, detail=f"Scene {request.scene_id} not found")
+    
+    await expire_scene_jobs()
+    unfinished = sum(1 for job in scene_jobs.values() if job["status"] in ("queued", "running"))
+    if unfinished >= scene_executor.max_pending:
+        scene_executor.rejected += 1
+        raise ExecutorSaturated(f"scene executor is busy ({unfinished} scene jobs unfinished)")
+    
+    job_id = str(uuid.uuid4())[:8]
+    scene_jobs[job_id] = {
+        "id": job_id,
+        "scene_id": request.scene_id,
+        "timestamp": datetime.now().isoformat(),
+        "status": "queued",
+        "windows_done": 0,
+        "windows_total": None,
+        "overlap": request.overlap,
+        "ntta": request.ntta
     }
+    task = asyncio.create_task(run_scene_job(job_id, request))
+    scene_tasks.add(task)
+    task.add_done_callback(scene_tasks.discard)
     
-    return response
+    return public_scene_job(scene_jobs[job_id])
+
+
+@app.get("/api/predict/scene/{job_id}")
+async def get_scene_job(job_id: str):
+    """Get the status, progress and outputs of a scene prediction job."""
+    await expire_scene_jobs()
+    if job_id not in scene_jobs:
+        raise HTTPException(status_code=404, detail="Scene job not found")
+    
+    return public_scene_job(scene_jobs[job_id])
+
+
+@app.get("/api/predict/scene/{job_id}/download/{model_name}")
+async def download_scene_prediction(job_id: str, model_name: str):
+    """Download a finished scene prediction as a float32 TIFF."""
+    await expire_scene_jobs()
+    if job_id not in scene_jobs:
+        raise HTTPException(status_code=404, detail="Scene job not found")
+    
+    outputs = scene_jobs[job_id].get("outputs", {})
+    if model_name not in outputs:
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found in scene job")
+    
+    path = Path(outputs[model_name]["path"])
+    return FileResponse(path, media_type="image/tiff", filename=path.name)
 
 
 @app.post("/api/predict/upload")
 async def predict_from_upload(
     files: List[UploadFile] = File(...),
     model_names: Optional[str] = Query(None),
-    ntta: int = Query(1),
+    ntta: int = Query(1, ge=1, le=MAX_TTA),
 ):
     """
     Run biomass prediction on uploaded TIFF files.
@@ -244,224 +973,184 @@ async def predict_from_upload(
         selected_models = [m.strip() for m in model_names.split(",")]
     
     features_dir = TEST_DATA_PATH / "test_features"
-    gt_dir = TEST_DATA_PATH / "test_agbm"
     
     # Try to extract chip_id from uploaded filenames
     chip_id = None
+    entry = None
     for file in files:
         extracted_id = extract_chip_id(file.filename)
         if extracted_id:
-            # Check if this chip exists in test_features
-            s1_check = features_dir / f"{extracted_id}_S1_00.tif"
-            if s1_check.exists():
+            # Check if this chip exists in the test dataset
+            entry = await io_executor.run_shared(catalog.lookup, extracted_id)
+            if entry is not None:
                 chip_id = extracted_id
                 print(f"Found chip_id from uploaded file: {chip_id}")
                 break
     
     # If we found a valid chip_id, use the standard prediction flow
     if chip_id:
-        # Get ground truth path
-        gt_path = gt_dir / f"{chip_id}_agbm.tif"
-        if not gt_path.exists():
-            gt_path = None
+        if not entry.has_ground_truth:
             print(f"Ground truth not found for chip: {chip_id}")
-        else:
-            print(f"Found ground truth: {gt_path}")
         
         # Run prediction using test dataset files
         try:
-            results = predictor.predict(
-                chip_id=chip_id,
-                data_dir=features_dir,
-                model_names=selected_models,
-                ntta=ntta,
-                ground_truth_path=gt_path
+            results = await run_chip_prediction(
+                chip_id,
+                features_dir,
+                selected_models,
+                ntta
             )
+        except ExecutorSaturated:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
         
-        # Generate result ID
-        result_id = str(uuid.uuid4())[:8]
-        timestamp = datetime.now().isoformat()
-        
-        # Process predictions for response
-        processed_predictions = {}
-        for model_name, pred_data in results["predictions"].items():
-            heatmap_bytes = predictor.prediction_to_heatmap(
-                pred_data["prediction"],
-                vmin=0,
-                vmax=400,
-                colormap="viridis"
-            )
-            heatmap_b64 = base64.b64encode(heatmap_bytes).decode()
-            
-            processed_predictions[model_name] = {
-                "heatmap": heatmap_b64,
-                "stats": pred_data["stats"],
-                "metrics": pred_data["metrics"],
-                "processing_time": pred_data["processing_time"],
-                "backbone": pred_data["backbone"]
-            }
-        
-        # Store result
-        stored_result = {
-            "id": result_id,
-            "chip_id": results["chip_id"],
-            "timestamp": timestamp,
-            "models": processed_predictions,
-            "ground_truth_available": results["ground_truth_available"],
-            "predictions_raw": {
-                name: data["prediction"].tolist()
-                for name, data in results["predictions"].items()
-            }
-        }
-        results_storage[result_id] = stored_result
-        
-        response = {
-            "id": result_id,
-            "chip_id": results["chip_id"],
-            "timestamp": timestamp,
-            "models": processed_predictions,
-            "ground_truth_available": results["ground_truth_available"]
-        }
-        
-        return response
+        return await store_prediction_results(results)
     
     # Fallback: Process uploaded files directly (original behavior)
     # This is for when the uploaded files don't match any chip in test_features
     print("No matching chip found, processing uploaded files directly...")
     
-    file_dict = {}
-    ground_truth = None
+    if len(files) > UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {UPLOAD_MAX_FILES} files per upload")
     
-    for file in files:
-        content = await file.read()
-        try:
-            # Read TIFF from bytes using tifffile for multi-band satellite imagery
-            img = tifffile.imread(io.BytesIO(content))
-            
-            if "_agbm" in file.filename.lower():
-                ground_truth = img.astype(np.float32)
-                if ground_truth.ndim == 3:
-                    ground_truth = ground_truth[..., 0]
-            else:
-                file_dict[file.filename] = img
-        except Exception as e:
-            print(f"Error reading {file.filename}: {e}")
-            continue
+    # The form parser has already spooled each file; they are read in place.
+    # Open files cannot be sent to a process pool, so this work stays on threads.
+    uploads = {file.filename: file.file for file in files}
+    hashes = await io_executor.run_shared(hash_uploads, uploads)
+    uploads, errors = await io_executor.run_shared(check_uploads, uploads)
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+    
+    ground_truth = None
+    file_dict = {}
+    for filename, f in uploads.items():
+        if "_agbm" in filename.lower():
+            ground_truth = await io_executor.run_shared(load_upload_ground_truth, f)
+        else:
+            file_dict[filename] = f
     
     if not file_dict:
         raise HTTPException(status_code=400, detail="No valid TIFF files uploaded")
     
-    # Run prediction
+    async def make_inputs():
+        # Months are decoded from the uploaded files one at a time
+        imgs, mask = await io_executor.run_shared(
+            read_imgs_from_files, file_dict, pin_memory=predictor.pin_inputs, raw=RAW_INPUTS
+        )
+        return predictor.to_tensors(imgs, mask)
+    
+    # Identical TIFF bytes share cached outputs whatever the files are called
     try:
-        results = predictor.predict_from_files(
-            file_dict=file_dict,
-            model_names=selected_models,
-            ntta=ntta,
-            ground_truth=ground_truth
+        results = await predict_with_cache(
+            upload_fingerprint({filename: hashes[filename] for filename in file_dict}),
+            BiomassPredictor.chip_id_from_files(file_dict),
+            selected_models,
+            ntta,
+            ground_truth,
+            make_inputs
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-    # Generate result ID
-    result_id = str(uuid.uuid4())[:8]
-    timestamp = datetime.now().isoformat()
-    
-    # Process predictions
-    processed_predictions = {}
-    for model_name, pred_data in results["predictions"].items():
-        heatmap_bytes = predictor.prediction_to_heatmap(
-            pred_data["prediction"],
-            vmin=0,
-            vmax=400,
-            colormap="viridis"
-        )
-        heatmap_b64 = base64.b64encode(heatmap_bytes).decode()
-        
-        processed_predictions[model_name] = {
-            "heatmap": heatmap_b64,
-            "stats": pred_data["stats"],
-            "metrics": pred_data["metrics"],
-            "processing_time": pred_data["processing_time"],
-            "backbone": pred_data["backbone"]
-        }
-    
-    # Store result
-    stored_result = {
-        "id": result_id,
-        "chip_id": results["chip_id"],
-        "timestamp": timestamp,
-        "models": processed_predictions,
-        "ground_truth_available": results["ground_truth_available"],
-        "predictions_raw": {
-            name: data["prediction"].tolist()
-            for name, data in results["predictions"].items()
-        }
-    }
-    results_storage[result_id] = stored_result
-    
-    response = {
-        "id": result_id,
-        "chip_id": results["chip_id"],
-        "timestamp": timestamp,
-        "models": processed_predictions,
-        "ground_truth_available": results["ground_truth_available"]
-    }
-    
-    return response
+    return await store_prediction_results(results)
 
 
 @app.get("/api/results")
 async def get_all_results():
     """Get all prediction results."""
-    results_list = []
-    for result_id, result in results_storage.items():
-        results_list.append({
-            "id": result["id"],
-            "chip_id": result["chip_id"],
-            "timestamp": result["timestamp"],
-            "models": list(result["models"].keys()),
-            "ground_truth_available": result["ground_truth_available"]
-        })
+    results_list = [
+        {k: v for k, v in summary.items() if k not in ("bytes", "created")}
+        for summary in result_store.list()
+    ]
+    
+    return {"results": results_list}
+
+
+@app.get("/api/results/stats")
+async def get_result_store_stats():
+    """Result store size, retention limits and eviction counters."""
+    return result_store.get_stats()
+
+
+def load_result_response(result_id: str) -> Optional[Dict]:
+    """Rebuild a stored result's API response from its metadata."""
+    meta = result_store.get(result_id)
+    if meta is None:
+        return None
+    
+    models = {}
+    for model_name, fields in meta["models"].items():
+        kinds = [key[:-len("_heatmap")] for key in fields["files"] if key.endswith("_heatmap")]
+        models[model_name] = result_model_response(
+            result_id,
+            model_name,
+            {k: v for k, v in fields.items() if k not in ("files", "etags")},
+            kinds
+        )
     
-    return {"results": sorted(results_list, key=lambda x: x["timestamp"], reverse=True)}
+    return {
+        "id": meta["id"],
+        "chip_id": meta["chip_id"],
+        "timestamp": meta["timestamp"],
+        "models": models,
+        "ground_truth_available": meta["ground_truth_available"]
+    }
 
 
 @app.get("/api/results/{result_id}")
 async def get_result(result_id: str):
     """Get a specific prediction result."""
-    if result_id not in results_storage:
+    if result_id not in result_store:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    result = results_storage[result_id]
-    return {
-        "id": result["id"],
-        "chip_id": result["chip_id"],
-        "timestamp": result["timestamp"],
-        "models": result["models"],
-        "ground_truth_available": result["ground_truth_available"]
-    }
+    result = await asyncio.to_thread(load_result_response, result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return result
+
+
+@app.get("/api/results/{result_id}/heatmap/{model_name}")
+async def get_result_heatmap(request: Request, result_id: str, model_name: str, kind: str = Query("prediction")):
+    """Heatmap PNG of one model in a result (kind=uncertainty for ensemble spread), with ETag revalidation."""
+    found = await asyncio.to_thread(result_store.heatmap_file, result_id, model_name, kind)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Heatmap not found")
+    
+    path, etag = found
+    if if_none_match(request, etag):
+        return heatmap_response(etag, RESULT_HEATMAP_CACHE_CONTROL, None)
+    try:
+        content = await asyncio.to_thread(path.read_bytes)
+    except FileNotFoundError:
+        # Evicted or deleted since the lookup
+        raise HTTPException(status_code=404, detail="Heatmap not found")
+    return heatmap_response(etag, RESULT_HEATMAP_CACHE_CONTROL, content)
+
+
+def load_prediction_map(result_id: str, model_name: str) -> Optional[np.ndarray]:
+    """Read a stored prediction map from its memory map into a float32 array."""
+    pred_array = result_store.load_map(result_id, model_name)
+    return None if pred_array is None else np.asarray(pred_array, dtype=np.float32)
 
 
 @app.get("/api/results/{result_id}/download/{model_name}")
 async def download_prediction(result_id: str, model_name: str):
     """Download prediction as TIFF file."""
-    if result_id not in results_storage:
+    meta = await asyncio.to_thread(result_store.get, result_id)
+    if meta is None:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    result = results_storage[result_id]
-    
-    if model_name not in result.get("predictions_raw", {}):
+    pred_array = await asyncio.to_thread(load_prediction_map, result_id, model_name)
+    if pred_array is None:
         raise HTTPException(status_code=404, detail=f"Model {model_name} not found in result")
     
-    # Convert list back to numpy array
-    pred_array = np.array(result["predictions_raw"][model_name], dtype=np.float32)
-    
     # Create TIFF
-    tiff_bytes = predictor.prediction_to_tiff(pred_array)
+    tiff_bytes = await io_executor.run(BiomassPredictor.prediction_to_tiff, pred_array)
     
-    filename = f"{result['chip_id']}_{model_name.replace(' ', '_')}_prediction.tif"
+    filename = f"{meta['chip_id']}_{model_name.replace(' ', '_')}_prediction.tif"
     
     return StreamingResponse(
         io.BytesIO(tiff_bytes),
@@ -472,42 +1161,49 @@ async def download_prediction(result_id: str, model_name: str):
 
 @app.get("/api/ground-truth/{chip_id}")
 async def get_ground_truth(chip_id: str):
-    """Get ground truth heatmap for a chip."""
-    gt_path = TEST_DATA_PATH / "test_agbm" / f"{chip_id}_agbm.tif"
-    
-    if not gt_path.exists():
+    """Get ground truth stats and heatmap URL for a chip (decoded once, then cached)."""
+    gt = await io_executor.run_shared(gt_cache.get, chip_id)
+    if gt is None:
         raise HTTPException(status_code=404, detail="Ground truth not found")
     
-    gt_img = skio.imread(gt_path).astype(np.float32)
-    if gt_img.ndim == 3:
-        gt_img = gt_img[..., 0]
-    
-    # Create heatmap
-    heatmap_bytes = predictor.prediction_to_heatmap(gt_img, vmin=0, vmax=400, colormap="viridis")
-    heatmap_b64 = base64.b64encode(heatmap_bytes).decode()
-    
-    stats = {
-        "min": float(np.min(gt_img)),
-        "max": float(np.max(gt_img)),
-        "mean": float(np.mean(gt_img)),
-        "std": float(np.std(gt_img)),
-        "median": float(np.median(gt_img))
-    }
-    
     return {
         "chip_id": chip_id,
-        "heatmap": heatmap_b64,
-        "stats": stats
+        "heatmap_url": f"/api/ground-truth/{quote(chip_id)}/heatmap",
+        "stats": gt.stats
     }
 
 
+@app.get("/api/ground-truth/{chip_id}/heatmap")
+async def get_ground_truth_heatmap(request: Request, chip_id: str):
+    """Ground truth heatmap PNG (rendered once, then cached), with ETag revalidation."""
+    gt = await io_executor.run_shared(gt_cache.get, chip_id, True)
+    if gt is None:
+        raise HTTPException(status_code=404, detail="Ground truth not found")
+    
+    if if_none_match(request, gt.heatmap_etag):
+        return heatmap_response(gt.heatmap_etag, GT_HEATMAP_CACHE_CONTROL, None)
+    return heatmap_response(gt.heatmap_etag, GT_HEATMAP_CACHE_CONTROL, gt.heatmap)
+
+
+@app.get("/api/cache/ground-truth")
+async def get_ground_truth_cache_stats():
+    """Get ground truth cache occupancy, hit/miss counters and warm-up progress."""
+    return gt_cache.get_stats()
+
+
+@app.delete("/api/cache/ground-truth")
+async def invalidate_ground_truth_cache(chip_id: Optional[str] = Query(None)):
+    """Drop one chip (chip_id) or every chip from the ground truth cache."""
+    removed = gt_cache.invalidate(chip_id)
+    return {"message": "Ground truth cache invalidated", "chip_id": chip_id, "removed": removed}
+
+
 @app.delete("/api/results/{result_id}")
 async def delete_result(result_id: str):
     """Delete a prediction result."""
-    if result_id not in results_storage:
+    if not await asyncio.to_thread(result_store.delete, result_id):
         raise HTTPException(status_code=404, detail="Result not found")
     
-    del results_storage[result_id]
     return {"message": "Result deleted", "id": result_id}
 
 
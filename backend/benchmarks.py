@@ -0,0 +1,182 @@
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import tifffile
+from PIL import Image
+
+import dataset
+import rendering
+
+
+def _chip_ids_in(data_dir: Path) -> List[str]:
+    return sorted({f.name.split("_S")[0] for f in data_dir.glob("*_S[12]_*.tif")})
+
+
+def bench_decode(data_dir: Path, chip_ids: List[str], threads: List[int], repeats: int = 3) -> List[Dict]:
+    """
+    Per-chip read_imgs latency for each decode pool size.
+
+    Every chip is read once before timing so all runs see a warm page cache
+    and measure decoding and normalisation rather than disk reads.
+    """
+    for chip_id in chip_ids:
+        dataset.read_imgs(chip_id, data_dir)
+
+    rows = []
+    reference = None
+    for n in threads:
+        dataset.set_decode_threads(n)
+        dataset.read_imgs(chip_ids[0], data_dir)  # start the pool outside the timed region
+        times = []
+        for _ in range(repeats):
+            for chip_id in chip_ids:
+                start = time.perf_counter()
+                imgs, _ = dataset.read_imgs(chip_id, data_dir)
+                times.append(time.perf_counter() - start)
+        if reference is None:
+            reference = imgs
+        elif not np.array_equal(imgs, reference):
+            raise AssertionError(f"read_imgs with {n} threads differs from {threads[0]} threads")
+        rows.append({
+            "threads": n,
+            "median_ms": statistics.median(times) * 1000,
+            "p90_ms": float(np.percentile(times, 90)) * 1000,
+            "chips_per_s": len(times) / sum(times)
+        })
+    return rows
+
+
+def bench_preprocess(data_dir: Path, chip_ids: List[str]) -> List[Dict]:
+    """
+    Peak traced allocation and latency of preprocessing one chip from disk
+    (read_imgs) and from already decoded uploads (read_imgs_from_files).
+    Decoding runs on the calling thread so every allocation is attributed.
+    """
+    dataset.set_decode_threads(1)
+    rows = []
+    for chip_id in chip_ids:
+        files = {f.name: tifffile.imread(f) for f in sorted(data_dir.glob(f"{chip_id}_S[12]_*.tif"))}
+        for name, fn in (("read_imgs", lambda: dataset.read_imgs(chip_id, data_dir)),
+                         ("read_imgs_from_files", lambda: dataset.read_imgs_from_files(files))):
+            fn()
+            tracemalloc.start()
+            start = time.perf_counter()
+            imgs, _ = fn()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append({
+                "chip_id": chip_id,
+                "path": name,
+                "ms": elapsed * 1000,
+                "peak_mb": peak / 1024 / 1024,
+                "output_mb": imgs.nbytes / 1024 / 1024
+            })
+    return rows
+
+
+def _matplotlib_heatmap(array: np.ndarray, vmin: float, vmax: float, colormap: str) -> bytes:
+    """The renderer prediction_to_heatmap used before rendering.py, for comparison."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    normalized = np.clip((array - vmin) / (vmax - vmin), 0, 1)
+    colored = plt.get_cmap(colormap)(normalized)
+    buffer = io.BytesIO()
+    Image.fromarray((colored[:, :, :3] * 255).astype(np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def bench_heatmap(maps: List[np.ndarray], repeats: int = 5, vmax: float = 400) -> List[Dict]:
+    """
+    Per-heatmap render latency and payload size of the matplotlib renderer
+    against rendering.render_heatmap at a few encoder settings. Every
+    candidate must decode to the same pixels as the matplotlib output.
+    """
+    candidates = [("matplotlib png", lambda a: _matplotlib_heatmap(a, 0, vmax, "viridis"))]
+    for fmt, level in (("png", 1), ("png", 6), ("webp", 0), ("webp", 9)):
+        candidates.append((f"lut {fmt} level {level}",
+                           lambda a, fmt=fmt, level=level: rendering.render_heatmap(a, 0, vmax, "viridis", fmt, level)))
+
+    references = [np.asarray(Image.open(io.BytesIO(_matplotlib_heatmap(a, 0, vmax, "viridis"))).convert("RGB")) for a in maps]
+    rows = []
+    for name, render in candidates:
+        render(maps[0])  # colour tables and encoders are set up outside the timed region
+        times, sizes = [], []
+        for _ in range(repeats):
+            for array, reference in zip(maps, references):
+                start = time.perf_counter()
+                data = render(array)
+                times.append(time.perf_counter() - start)
+                sizes.append(len(data))
+        decoded = np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+        if not np.array_equal(decoded, reference):
+            raise AssertionError(f"{name} renders different pixels than matplotlib")
+        rows.append({
+            "renderer": name,
+            "median_ms": statistics.median(times) * 1000,
+            "p90_ms": float(np.percentile(times, 90)) * 1000,
+            "mean_kb": statistics.mean(sizes) / 1024
+        })
+    return rows
+
+
+def parse_args(args=None):
+    p = argparse.ArgumentParser(description="Micro-benchmarks for the serving data path")
+    sub = p.add_subparsers(dest="bench", required=True)
+
+    decode = sub.add_parser("decode", help="chip load latency against decode threads")
+    decode.add_argument("--data-dir", type=str, default="../test_subset100chip/test_features")
+    decode.add_argument("--chips", type=int, default=8, help="number of chips to read")
+    decode.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    decode.add_argument("--repeats", type=int, default=3)
+
+    preprocess = sub.add_parser("preprocess", help="peak memory of chip preprocessing")
+    preprocess.add_argument("--data-dir", type=str, default="../test_subset100chip/test_features")
+    preprocess.add_argument("--chips", type=int, default=3)
+
+    heatmap = sub.add_parser("heatmap", help="heatmap render time and payload size")
+    heatmap.add_argument("--agbm-dir", type=str, default="../test_subset100chip/test_agbm")
+    heatmap.add_argument("--chips", type=int, default=8, help="number of AGBM maps to render")
+    heatmap.add_argument("--repeats", type=int, default=5)
+    return p.parse_args(args=args)
+
+
+def main():
+    args = parse_args()
+    if args.bench == "heatmap":
+        paths = sorted(Path(args.agbm_dir).glob("*_agbm.tif"))[:args.chips]
+        if not paths:
+            raise SystemExit(f"No AGBM maps found in {args.agbm_dir}")
+        maps = [tifffile.imread(path).astype(np.float32) for path in paths]
+        print(f"{len(maps)} heatmaps x {args.repeats} repeats")
+        print(f"{'renderer':>20} {'median ms':>10} {'p90 ms':>10} {'mean KB':>9}")
+        for row in bench_heatmap(maps, args.repeats):
+            print(f"{row['renderer']:>20} {row['median_ms']:>10.2f} {row['p90_ms']:>10.2f} {row['mean_kb']:>9.1f}")
+        return
+
+    data_dir = Path(args.data_dir)
+    chip_ids = _chip_ids_in(data_dir)[:args.chips]
+    if not chip_ids:
+        raise SystemExit(f"No chips found in {data_dir}")
+
+    if args.bench == "decode":
+        print(f"read_imgs over {len(chip_ids)} chips x {args.repeats} repeats")
+        print(f"{'threads':>8} {'median ms':>10} {'p90 ms':>10} {'chips/s':>9}")
+        for row in bench_decode(data_dir, chip_ids, args.threads, args.repeats):
+            print(f"{row['threads']:>8} {row['median_ms']:>10.1f} {row['p90_ms']:>10.1f} {row['chips_per_s']:>9.1f}")
+    elif args.bench == "preprocess":
+        print(f"{'chip':>10} {'path':>22} {'ms':>8} {'peak MB':>9} {'output MB':>10}")
+        for row in bench_preprocess(data_dir, chip_ids):
+            print(f"{row['chip_id']:>10} {row['path']:>22} {row['ms']:>8.1f} {row['peak_mb']:>9.1f} {row['output_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def chip_files_signature(chip_id: str, data_dir: Path) -> Tuple:
+    """(filename, mtime_ns, size) of every S1/S2 file of a chip; changes when any file does."""
+    signature = []
+    for month in range(12):
+        for sensor in ("S1", "S2"):
+            name = f"{chip_id}_{sensor}_{month:0>2}.tif"
+            try:
+                stat = os.stat(Path(data_dir) / name)
+            except FileNotFoundError:
+                continue
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+@dataclass
+class _CacheEntry:
+    signature: Tuple
+    imgs: np.ndarray
+    mask: np.ndarray
+    nbytes: int
+
+
+class ChipCache:
+    """
+    Byte-budgeted LRU cache of preprocessed chip stacks.
+
+    Entries are keyed by (data_dir, chip_id) and validated against the chip's
+    file mtimes and sizes, so a rewritten TIFF is re-read on the next request.
+    With dtype="float16" stacks are stored at half the memory; they are cast
+    back to float32 when converted to tensors. Raw int16 stacks are stored
+    as is. Returned arrays are shared with the cache and must not be modified.
+    """
+
+    def __init__(self, budget_bytes: int, dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported chip cache dtype: {dtype}")
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.dtype = np.dtype(dtype)
+
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    @staticmethod
+    def _key(chip_id: str, data_dir: Path) -> Tuple[str, str]:
+        return str(Path(data_dir).resolve()), chip_id
+
+    def get(self, chip_id: str, data_dir: Path, signature: Optional[Tuple] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Cached (imgs, mask) for a chip, or None on a miss or when its files changed."""
+        if not self.enabled:
+            return None
+        if signature is None:
+            signature = chip_files_signature(chip_id, data_dir)
+        key = self._key(chip_id, data_dir)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature != signature:
+                self._remove(key)
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.imgs, entry.mask
+
+    def put(self, chip_id: str, data_dir: Path, imgs: np.ndarray, mask: np.ndarray, signature: Optional[Tuple] = None):
+        """Store a preprocessed chip, evicting least recently used chips beyond the budget."""
+        if not self.enabled:
+            return
+        if signature is None:
+            signature = chip_files_signature(chip_id, data_dir)
+        imgs = np.ascontiguousarray(imgs, dtype=self.dtype if imgs.dtype.kind == "f" else imgs.dtype)
+        nbytes = imgs.nbytes + mask.nbytes
+        if nbytes > self.budget_bytes:
+            return
+
+        key = self._key(chip_id, data_dir)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(signature=signature, imgs=imgs, mask=mask, nbytes=nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.budget_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def invalidate(self, chip_id: Optional[str] = None) -> int:
+        """Drop one chip (in every data directory) or, with no chip_id, everything; returns the count."""
+        with self._lock:
+            keys = [k for k in self._entries if chip_id is None or k[1] == chip_id]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def get_stats(self) -> Dict:
+        """Budget, occupancy and hit/miss/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "dtype": self.dtype.name,
+            "budget_bytes": self.budget_bytes,
+            "cached_bytes": self._bytes,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,310 @@
+import bisect
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ALL_MONTHS = (1 << 12) - 1
+
+_FEATURE_RE = re.compile(r"^(?P<chip_id>.+)_(?P<sensor>S[12])_(?P<month>\d{2})\.tif$")
+_GT_SUFFIX = "_agbm.tif"
+
+
+@dataclass
+class ChipEntry:
+    """Availability of one chip; bit m of s1_months/s2_months is set when month m exists."""
+    chip_id: str
+    s1_months: int = 0
+    s2_months: int = 0
+    has_ground_truth: bool = False
+    feature_bytes: int = 0
+    ground_truth_bytes: int = 0
+    in_store: bool = False
+
+    @property
+    def months(self) -> int:
+        """Bitmap of months with S1 or S2 data."""
+        return self.s1_months | self.s2_months
+
+    @property
+    def n_months(self) -> int:
+        return bin(self.months).count("1")
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        d["s1_months"] = [m for m in range(12) if self.s1_months >> m & 1]
+        d["s2_months"] = [m for m in range(12) if self.s2_months >> m & 1]
+        d["n_months"] = self.n_months
+        return d
+
+
+def _list_names(path: Optional[Path]) -> Set[str]:
+    """Names in a directory from one os.scandir pass, without stat-ing them; empty if it is missing."""
+    if path is None:
+        return set()
+    try:
+        with os.scandir(path) as it:
+            return {f.name for f in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+def _feature_chip(name: str) -> Optional[str]:
+    """Chip ID of an S1/S2 feature file name, or None for anything else."""
+    match = _FEATURE_RE.match(name)
+    if match is None or int(match["month"]) >= 12:
+        return None
+    return match["chip_id"]
+
+
+def _dir_mtime(path: Optional[Path]) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path is not None else None
+    except FileNotFoundError:
+        return None
+
+
+class ChipCatalog:
+    """
+    In-memory index of the chips in a features directory.
+
+    Built once from a directory listing; afterwards `refresh` relists only
+    when the feature or ground-truth directory mtime changed, diffs the names
+    against the files it knows, and re-stats just the chips whose files were
+    added or removed, so an unchanged tree costs two stat calls and a new
+    chip costs its own. Each chip keeps the (name, mtime, size) signature of
+    its files; `lookup` re-stats one chip and compares, which picks up files
+    rewritten in place (those leave the directory mtime alone). Chip IDs are
+    kept sorted, so pages are list slices rather than directory walks. Chips
+    in a ChipStore are included even when their TIFFs are not on disk.
+    """
+
+    def __init__(self, features_dir: Path, gt_dir: Optional[Path] = None, store=None):
+        self.features_dir = Path(features_dir)
+        self.gt_dir = Path(gt_dir) if gt_dir is not None else None
+        self.store = store
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ChipEntry] = {}
+        self._ids: List[str] = []
+        self._filtered: Dict[Tuple, List[str]] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        self._feature_names: Set[str] = set()
+        self._gt_names: Set[str] = set()
+        self._mtimes: Tuple = (None, None)
+
+        # Statistics
+        self.scans = 0
+        self.chips_checked = 0
+        self.last_scan_time = 0.0
+        self.last_refresh: Optional[float] = None
+
+        self.refresh(force=True)
+
+    def _store_entry(self, chip_id: str) -> ChipEntry:
+        _, _, s1_present, s2_present = self.store.raw(chip_id)
+        return ChipEntry(
+            chip_id,
+            s1_months=sum(1 << m for m in range(12) if s1_present[m]),
+            s2_months=sum(1 << m for m in range(12) if s2_present[m]),
+            has_ground_truth=self.store.agbm(chip_id) is not None,
+            in_store=True
+        )
+
+    @staticmethod
+    def _merge_store(entry: ChipEntry, stored: ChipEntry):
+        entry.in_store = True
+        entry.s1_months |= stored.s1_months
+        entry.s2_months |= stored.s2_months
+        entry.has_ground_truth = entry.has_ground_truth or stored.has_ground_truth
+
+    def _build(self, chip_id: str, feature_names: Iterable[str], check_gt: bool) -> Tuple[Optional[ChipEntry], Tuple]:
+        """
+        Entry and file signature of one chip from stat-ing the given feature
+        files (missing ones are skipped) and its ground truth; the entry is
+        None if the chip has no data.
+        """
+        entry = ChipEntry(chip_id)
+        signature = []
+        for name in sorted(feature_names):
+            try:
+                stat = os.stat(self.features_dir / name)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            match = _FEATURE_RE.match(name)
+            if match["sensor"] == "S1":
+                entry.s1_months |= 1 << int(match["month"])
+            else:
+                entry.s2_months |= 1 << int(match["month"])
+            entry.feature_bytes += stat.st_size
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        if check_gt and self.gt_dir is not None:
+            try:
+                stat = os.stat(self.gt_dir / f"{chip_id}{_GT_SUFFIX}")
+                entry.has_ground_truth = True
+                entry.ground_truth_bytes = stat.st_size
+                signature.append((_GT_SUFFIX, stat.st_mtime_ns, stat.st_size))
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        if self.store is not None and chip_id in self.store:
+            self._merge_store(entry, self._store_entry(chip_id))
+        exists = entry.months != 0 or entry.in_store
+        return (entry if exists else None), tuple(signature)
+
+    def _publish(self, built: Dict[str, Tuple[Optional[ChipEntry], Tuple]]) -> Tuple[int, int, int]:
+        """Apply rebuilt chips; readers hold on to the published dict and list, so swap in copies."""
+        added = removed = updated = 0
+        with self._lock:
+            entries = dict(self._entries)
+            for chip_id, (entry, signature) in built.items():
+                old = entries.get(chip_id)
+                if entry is None:
+                    self._signatures.pop(chip_id, None)
+                    if old is not None:
+                        del entries[chip_id]
+                        removed += 1
+                    continue
+                self._signatures[chip_id] = signature
+                if old is None:
+                    added += 1
+                elif old == entry:
+                    continue
+                else:
+                    updated += 1
+                entries[chip_id] = entry
+            if added or removed or updated:
+                ids = sorted(entries) if added or removed else self._ids
+                self._entries, self._ids, self._filtered = entries, ids, {}
+        return added, removed, updated
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Relist the directories if either changed since the last refresh and
+        re-stat only the chips whose file names changed (every chip with
+        force=True); returns what changed.
+        """
+        mtimes = (_dir_mtime(self.features_dir), _dir_mtime(self.gt_dir))
+        self.last_refresh = time.time()
+        if not force and mtimes == self._mtimes:
+            return {"scanned": False, "checked": 0, "added": 0, "removed": 0, "updated": 0}
+
+        start_time = time.time()
+        feature_names = {name for name in _list_names(self.features_dir) if _feature_chip(name) is not None}
+        gt_names = {name for name in _list_names(self.gt_dir) if name.endswith(_GT_SUFFIX)}
+        if force:
+            changed = {_feature_chip(name) for name in feature_names} | set(self._entries)
+            if self.store is not None:
+                changed |= set(self.store.chip_ids)
+        else:
+            changed = {_feature_chip(name) for name in feature_names ^ self._feature_names}
+            changed |= {name[:-len(_GT_SUFFIX)] for name in gt_names ^ self._gt_names}
+
+        names_by_chip: Dict[str, List[str]] = {}
+        for name in feature_names:
+            chip_id = _feature_chip(name)
+            if chip_id in changed:
+                names_by_chip.setdefault(chip_id, []).append(name)
+        built = {
+            chip_id: self._build(chip_id, names_by_chip.get(chip_id, ()), f"{chip_id}{_GT_SUFFIX}" in gt_names)
+            for chip_id in changed
+        }
+        added, removed, updated = self._publish(built)
+        self._feature_names, self._gt_names, self._mtimes = feature_names, gt_names, mtimes
+
+        self.scans += 1
+        self.chips_checked += len(changed)
+        self.last_scan_time = time.time() - start_time
+        if added or removed or updated:
+            print(f"Chip catalog: {len(self._entries)} chips (+{added} -{removed} ~{updated}) "
+                  f"in {self.last_scan_time:.2f}s")
+        return {"scanned": True, "checked": len(changed), "added": added, "removed": removed, "updated": updated}
+
+    def refresh_chip(self, chip_id: str) -> Optional[ChipEntry]:
+        """
+        Re-stat one chip's files (cheap) and update its entry if their
+        signature changed; None if it has no data.
+        """
+        if not chip_id or "/" in chip_id or "\\" in chip_id:
+            return None
+        names = [f"{chip_id}_{sensor}_{month:0>2}.tif" for month in range(12) for sensor in ("S1", "S2")]
+        entry, signature = self._build(chip_id, names, check_gt=True)
+        current = self._entries.get(chip_id)
+        if current is None and entry is None:
+            return None
+        if current is not None and entry is not None and self._signatures.get(chip_id) == signature:
+            return current
+        self._publish({chip_id: (entry, signature)})
+        return entry
+
+    def get(self, chip_id: str) -> Optional[ChipEntry]:
+        return self._entries.get(chip_id)
+
+    def lookup(self, chip_id: str) -> Optional[ChipEntry]:
+        """Entry for a chip, re-checked against its files: new, removed and rewritten chips are picked up."""
+        return self.refresh_chip(chip_id)
+
+    def __contains__(self, chip_id: str) -> bool:
+        return chip_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _matching(self, has_ground_truth: Optional[bool], min_months: int, complete: bool) -> Tuple[List[str], Dict[str, ChipEntry]]:
+        """
+        Sorted chip IDs passing the attribute filters, memoised until the
+        catalog changes, with the entries they were taken from.
+        """
+        key = (has_ground_truth, min_months, complete)
+        with self._lock:
+            entries = self._entries
+            if key == (None, 0, False):
+                return self._ids, entries
+            ids = self._filtered.get(key)
+            if ids is None:
+                ids = [
+                    chip_id for chip_id in self._ids
+                    if (has_ground_truth is None or entries[chip_id].has_ground_truth == has_ground_truth)
+                    and entries[chip_id].n_months >= min_months
+                    and (not complete or (entries[chip_id].s1_months & entries[chip_id].s2_months) == ALL_MONTHS)
+                ]
+                self._filtered[key] = ids
+            return ids, entries
+
+    def list(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        prefix: Optional[str] = None,
+        has_ground_truth: Optional[bool] = None,
+        min_months: int = 0,
+        complete: bool = False
+    ) -> Tuple[List[ChipEntry], int]:
+        """
+        One page of chips in ID order and the total number matching.
+
+        `prefix` narrows the sorted ID list by binary search; `complete` keeps
+        chips with both S1 and S2 for all 12 months.
+        """
+        ids, entries = self._matching(has_ground_truth, min_months, complete)
+        start, end = 0, len(ids)
+        if prefix:
+            start = bisect.bisect_left(ids, prefix)
+            end = bisect.bisect_left(ids, prefix + "\U0010ffff")
+        total = end - start
+        page_start = min(start + max(0, offset), end)
+        page_end = end if limit is None else min(page_start + max(0, limit), end)
+        return [entries[chip_id] for chip_id in ids[page_start:page_end]], total
+
+    def get_stats(self) -> Dict:
+        return {
+            "chips": len(self._entries),
+            "with_ground_truth": sum(1 for e in self._entries.values() if e.has_ground_truth),
+            "features_dir": str(self.features_dir),
+            "scans": self.scans,
+            "chips_checked": self.chips_checked,
+            "last_scan_time": self.last_scan_time,
+            "last_refresh": self.last_refresh
+        }
@@ -1,7 +1,13 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import torch
 import tifffile
 from pathlib import Path
+from typing import Optional
 
 
 s1_min = np.array([-25, -62, -25, -60], dtype="float32")
@@ -15,53 +21,214 @@ s2_max = np.array(
 
 IMG_SIZE = (256, 256)
 
+# Shared pool for per-month TIFF decoding; tifffile releases the GIL while
+# decompressing, so the 24 reads of a chip overlap across cores.
+_decode_threads = min(8, os.cpu_count() or 1)
+_decode_pool: Optional[ThreadPoolExecutor] = None
+_decode_pool_pid = None
+_decode_pool_lock = threading.Lock()
 
-def read_imgs(chip_id: str, data_dir: Path):
-    """Read 12 months of S1 and S2 satellite imagery for a chip."""
-    imgs, mask = [], []
-    
+
+def set_decode_threads(n: int):
+    """Size of the shared decode pool used by read_imgs (<= 1 decodes sequentially)."""
+    global _decode_threads, _decode_pool
+    with _decode_pool_lock:
+        _decode_threads = max(1, int(n))
+        if _decode_pool is not None:
+            _decode_pool.shutdown(wait=False)
+            _decode_pool = None
+
+
+def _get_decode_pool() -> Optional[ThreadPoolExecutor]:
+    global _decode_pool, _decode_pool_pid
+    if _decode_threads <= 1:
+        return None
+    with _decode_pool_lock:
+        # A pool inherited through fork has no threads; start a fresh one
+        if _decode_pool is None or _decode_pool_pid != os.getpid():
+            _decode_pool = ThreadPoolExecutor(max_workers=_decode_threads, thread_name_prefix="decode")
+            _decode_pool_pid = os.getpid()
+        return _decode_pool
+
+
+# Band-first views of the normalisation constants for [C, H, W] outputs
+_s1_min_chw = s1_min[:, None, None]
+_s1_mm_chw = s1_mm[:, None, None]
+_s2_max_chw = s2_max[:, None, None]
+
+
+def normalize_s1(img_s1: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Scale raw S1 backscatter [H, W, 4] to ~[0, 1] into `out` [4, H, W] in place;
+    -9999 no-data becomes 0. The transpose is folded into the arithmetic, so
+    no intermediate float copies of the image are made.
+    """
+    raw = img_s1.transpose(2, 0, 1)
+    np.subtract(raw, _s1_min_chw, out=out)
+    np.divide(out, _s1_mm_chw, out=out)
+    np.copyto(out, 0, where=raw == -9999)
+    return out
+
+
+def normalize_s2(img_s2: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Scale raw S2 reflectances [H, W, 11] by the per-band maxima into `out` [11, H, W]."""
+    return np.divide(img_s2.transpose(2, 0, 1), _s2_max_chw, out=out)
+
+
+# Raw transport layout: channel-last [T, H, W, RAW_CHANNELS] int16, holding the
+# S1 float32 dB values bit for bit (two int16 words per band) followed by the
+# S2 uint16 reflectances. 38 bytes per pixel instead of 60 for float32.
+RAW_CHANNELS = 2 * 4 + 11
+_RAW_S1_NODATA = np.full(4, -9999, dtype="float32").view("int16")
+
+
+def empty_stack(pin_memory: bool = False, raw: bool = False) -> np.ndarray:
+    """
+    Uninitialised [T, C, H, W] float32 chip stack, or with raw=True an
+    [T, H, W, RAW_CHANNELS] int16 raw stack. With pin_memory=True it is backed
+    by page-locked memory, so the tensor made from it can be copied to the GPU
+    asynchronously.
+    """
+    shape = (12,) + IMG_SIZE + (RAW_CHANNELS,) if raw else (12, 4 + 11) + IMG_SIZE
+    if pin_memory:
+        return torch.empty(shape, dtype=torch.int16 if raw else torch.float32, pin_memory=True).numpy()
+    return np.empty(shape, dtype="int16" if raw else "float32")
+
+
+def _fill_month(out: np.ndarray, img_s1: Optional[np.ndarray], img_s2: Optional[np.ndarray]):
+    """Normalise one month into `out` [15, H, W]; missing sensors become zeros."""
+    if img_s1 is not None:
+        normalize_s1(img_s1, out[:4])
+    else:
+        out[:4] = 0
+    if img_s2 is not None:
+        normalize_s2(img_s2, out[4:])
+    else:
+        out[4:] = 0
+
+
+def _fill_raw_month(out: np.ndarray, img_s1: Optional[np.ndarray], img_s2: Optional[np.ndarray]):
+    """Copy one month's native values into `out` [H, W, RAW_CHANNELS]; missing S1 is no-data."""
+    if img_s1 is not None:
+        out[..., :8] = np.ascontiguousarray(img_s1, dtype="float32").view("int16")
+    else:
+        out[..., :8] = _RAW_S1_NODATA
+    if img_s2 is not None:
+        out[..., 8:] = np.ascontiguousarray(img_s2, dtype="uint16").view("int16")
+    else:
+        out[..., 8:] = 0
+
+
+def normalize_raw(raw: torch.Tensor) -> torch.Tensor:
+    """
+    Normalise raw stacks [..., T, H, W, RAW_CHANNELS] into float32
+    [..., T, C, H, W] on their device, with the same arithmetic as
+    normalize_s1/normalize_s2.
+    """
+    s1 = raw[..., :8].contiguous().view(torch.float32)
+    s2 = (raw[..., 8:].to(torch.int32) & 0xFFFF).to(torch.float32)
+    s1_norm = (s1 - torch.from_numpy(s1_min).to(raw.device)) / torch.from_numpy(s1_mm).to(raw.device)
+    s1_norm = torch.where(s1 == -9999, torch.zeros_like(s1_norm), s1_norm)
+    s2_norm = s2 / torch.from_numpy(s2_max).to(raw.device)
+    return torch.cat([s1_norm, s2_norm], dim=-1).movedim(-1, -3).contiguous()
+
+
+def _valid_mask(mask) -> np.ndarray:
+    """
+    Months with neither S1 nor S2 are masked out (True), as word dropout did in
+    training. If every month is missing nothing is masked, since attention
+    pooling needs at least one unmasked timestep.
+    """
+    mask = np.array(mask, dtype=bool)
+    if mask.all():
+        mask[:] = False
+    return mask
+
+
+def read_imgs_from_store(chip_id: str, store, out: Optional[np.ndarray] = None, raw: bool = False):
+    """Normalized [T, C, H, W] (or raw) stack and mask of a chip read from a ChipStore."""
+    s1, s2, s1_present, s2_present = store.raw(chip_id)
+    imgs = out if out is not None else empty_stack(raw=raw)
+    fill = _fill_raw_month if raw else _fill_month
     for month in range(12):
-        # Read S1 (Sentinel-1) data
+        fill(imgs[month], s1[month] if s1_present[month] else None, s2[month] if s2_present[month] else None)
+    return imgs, _valid_mask(~(s1_present | s2_present))
+
+
+def read_imgs(
+    chip_id: str,
+    data_dir: Path,
+    store=None,
+    out: Optional[np.ndarray] = None,
+    pin_memory: bool = False,
+    raw: bool = False
+):
+    """
+    Read 12 months of S1 and S2 satellite imagery for a chip (from `store` when it has it).
+
+    Bands are normalised straight into `out` (or a new, optionally pinned,
+    stack from empty_stack) so the only full-size allocation is the result.
+    With raw=True the native values are stacked instead and normalised later
+    by normalize_raw, right before the forward pass.
+    """
+    if out is None:
+        out = empty_stack(pin_memory, raw=raw)
+    if store is not None and chip_id in store:
+        return read_imgs_from_store(chip_id, store, out, raw=raw)
+    
+    imgs = out
+    mask = np.zeros(12, dtype=bool)
+    fill = _fill_raw_month if raw else _fill_month
+
+    def read_month(month: int):
+        # Read S1 (Sentinel-1) and S2 (Sentinel-2) data
         s1_path = data_dir / f"{chip_id}_S1_{month:0>2}.tif"
-        if s1_path.is_file():
-            img_s1 = tifffile.imread(s1_path)
-            m = img_s1 == -9999
-            img_s1 = img_s1.astype("float32")
-            img_s1 = (img_s1 - s1_min) / s1_mm
-            img_s1 = np.where(m, 0, img_s1)
-        else:
-            img_s1 = np.zeros(IMG_SIZE + (4,), dtype="float32")
-        
-        # Read S2 (Sentinel-2) data
         s2_path = data_dir / f"{chip_id}_S2_{month:0>2}.tif"
-        if s2_path.is_file():
-            img_s2 = tifffile.imread(s2_path)
-            img_s2 = img_s2.astype("float32")
-            img_s2 = img_s2 / s2_max
-        else:
-            img_s2 = np.zeros(IMG_SIZE + (11,), dtype="float32")
+        img_s1 = tifffile.imread(s1_path) if s1_path.is_file() else None
+        img_s2 = tifffile.imread(s2_path) if s2_path.is_file() else None
+        fill(imgs[month], img_s1, img_s2)
+        mask[month] = img_s1 is None and img_s2 is None
+
+    pool = _get_decode_pool()
+    if pool is None:
+        for month in range(12):
+            read_month(month)
+    else:
+        # Months write disjoint slices of imgs, so they can be decoded concurrently
+        for future in [pool.submit(read_month, month) for month in range(12)]:
+            future.result()
+
+    return imgs, _valid_mask(mask)
+
 
-        # Concatenate S1 and S2
-        img = np.concatenate([img_s1, img_s2], axis=2)
-        img = np.transpose(img, (2, 0, 1))  # [C, H, W]
-        imgs.append(img)
-        mask.append(False)
+def decode_tiff_bytes(content: bytes) -> np.ndarray:
+    """Decode an in-memory (multi-band) TIFF."""
+    return tifffile.imread(io.BytesIO(content))
 
-    mask = np.array(mask)
-    imgs = np.stack(imgs, axis=0)  # [T, C, H, W]
 
-    return imgs, mask
+def _load_upload(value) -> Optional[np.ndarray]:
+    """An uploaded image as an array; paths and open files are decoded on demand."""
+    if isinstance(value, (str, Path)):
+        return tifffile.imread(value)
+    if hasattr(value, "read"):
+        # Spooled temporary files have no usable name for tifffile
+        value.seek(0)
+        return tifffile.imread(value, name="upload.tif")
+    return value
 
 
-def read_imgs_from_files(file_dict: dict):
+def read_imgs_from_files(file_dict: dict, out: Optional[np.ndarray] = None, pin_memory: bool = False, raw: bool = False):
     """
     Read satellite imagery from a dictionary of uploaded files.
-    file_dict: {filename: numpy_array} mapping
+    file_dict: {filename: numpy_array, path or binary file} mapping. Files are
+    decoded one month at a time and released once written into the stack.
     """
-    imgs, mask = [], []
+    imgs = out if out is not None else empty_stack(pin_memory, raw=raw)
+    mask = np.zeros(12, dtype=bool)
+    fill = _fill_raw_month if raw else _fill_month
     
     for month in range(12):
-        # Find S1 file for this month
+        # Find S1 and S2 files for this month
         s1_key = None
         s2_key = None
         
@@ -71,62 +238,79 @@ def read_imgs_from_files(file_dict: dict):
             if f"_S2_{month:0>2}.tif" in filename:
                 s2_key = filename
         
-        # Process S1
-        if s1_key and file_dict[s1_key] is not None:
-            img_s1 = file_dict[s1_key]
-            m = img_s1 == -9999
-            img_s1 = img_s1.astype("float32")
-            img_s1 = (img_s1 - s1_min) / s1_mm
-            img_s1 = np.where(m, 0, img_s1)
-        else:
-            img_s1 = np.zeros(IMG_SIZE + (4,), dtype="float32")
-        
-        # Process S2
-        if s2_key and file_dict[s2_key] is not None:
-            img_s2 = file_dict[s2_key]
-            img_s2 = img_s2.astype("float32")
-            img_s2 = img_s2 / s2_max
-        else:
-            img_s2 = np.zeros(IMG_SIZE + (11,), dtype="float32")
+        fill(
+            imgs[month],
+            _load_upload(file_dict[s1_key]) if s1_key else None,
+            _load_upload(file_dict[s2_key]) if s2_key else None
+        )
+        mask[month] = s1_key is None and s2_key is None
+
+    return imgs, _valid_mask(mask)
+
+
+# Dihedral TTA transforms as (forward, inverse) pairs acting on the last two
+# (H, W) dims. The first four are the flips used by the sequential path, the
+# remaining four complete the 8-way dihedral group and need square inputs.
+TTA_TRANSFORMS = [
+    (lambda x: x, lambda x: x),
+    (lambda x: torch.flip(x, dims=[-1]), lambda x: torch.flip(x, dims=[-1])),
+    (lambda x: torch.flip(x, dims=[-2]), lambda x: torch.flip(x, dims=[-2])),
+    (lambda x: torch.flip(x, dims=[-2, -1]), lambda x: torch.flip(x, dims=[-2, -1])),
+    (lambda x: torch.rot90(x, 1, dims=(-2, -1)), lambda x: torch.rot90(x, -1, dims=(-2, -1))),
+    (lambda x: torch.rot90(x, -1, dims=(-2, -1)), lambda x: torch.rot90(x, 1, dims=(-2, -1))),
+    (lambda x: x.transpose(-2, -1), lambda x: x.transpose(-2, -1)),
+    (lambda x: torch.rot90(x, 2, dims=(-2, -1)).transpose(-2, -1),
+     lambda x: torch.rot90(x.transpose(-2, -1), -2, dims=(-2, -1))),
+]
 
-        img = np.concatenate([img_s1, img_s2], axis=2)
-        img = np.transpose(img, (2, 0, 1))
-        imgs.append(img)
-        mask.append(False)
+MAX_TTA = len(TTA_TRANSFORMS)
 
-    mask = np.array(mask)
-    imgs = np.stack(imgs, axis=0)
 
-    return imgs, mask
+def predict_tta(models, images, masks, ntta=1, batched=False):
+    """
+    Test-time augmentation prediction.
+
+    ntta 1-4 uses identity, hflip, vflip and hvflip; 5-8 add the rotations and
+    transposes of the dihedral group. With batched=True all augmented views are
+    stacked along the batch axis so each model runs a single forward pass.
+    Raw int16 stacks (see empty_stack) are normalised here first.
+    """
+    if not images.is_floating_point():
+        images = normalize_raw(images)
+    ntta = max(1, min(int(ntta), MAX_TTA))
+    if ntta > 4 and images.shape[-2] != images.shape[-1]:
+        raise ValueError(f"ntta={ntta} requires square inputs, got {tuple(images.shape[-2:])}")
 
+    if batched:
+        return _predict_tta_batched(models, images, masks, ntta)
 
-def predict_tta(models, images, masks, ntta=1):
-    """Test-time augmentation prediction."""
     result = images.new_zeros((images.shape[0], 1, images.shape[-2], images.shape[-1]))
     n = 0
     
     for model in models:
-        logits = model(images, masks)
-        result += logits
-        n += 1
-
-        if ntta >= 2:
-            # horizontal flip
-            logits = model(torch.flip(images, dims=[-1]), masks)
-            result += torch.flip(logits, dims=[-1])
+        for forward, inverse in TTA_TRANSFORMS[:ntta]:
+            logits = model(forward(images), masks)
+            result += inverse(logits)
             n += 1
 
-        if ntta >= 3:
-            # vertical flip
-            logits = model(torch.flip(images, dims=[-2]), masks)
-            result += torch.flip(logits, dims=[-2])
-            n += 1
+    result /= n
+    return result
 
-        if ntta >= 4:
-            # horizontal + vertical flip
-            logits = model(torch.flip(images, dims=[-2, -1]), masks)
-            result += torch.flip(logits, dims=[-2, -1])
-            n += 1
 
-    result /= n * len(models)
+def _predict_tta_batched(models, images, masks, ntta):
+    """Run all TTA views of a [B, T, C, H, W] batch in one forward pass per model."""
+    bs = images.shape[0]
+    transforms = TTA_TRANSFORMS[:ntta]
+
+    # [ntta * B, T, C, H, W], view-major so each view is a contiguous slice
+    stacked = torch.cat([forward(images) for forward, _ in transforms], dim=0)
+    stacked_masks = masks.repeat(ntta, 1) if masks is not None else None
+
+    result = images.new_zeros((bs, 1, images.shape[-2], images.shape[-1]))
+    for model in models:
+        logits = model(stacked, stacked_masks)
+        for i, (_, inverse) in enumerate(transforms):
+            result += inverse(logits[i * bs:(i + 1) * bs])
+
+    result /= ntta * len(models)
     return result
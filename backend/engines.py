@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+from dataset import IMG_SIZE
+
+ENGINES = ("eager", "torchscript", "compile", "onnx")
+
+# Example input used for tracing/export: [B, T, C, H, W] and [B, T]
+EXAMPLE_SHAPE = (1, 12, 15) + IMG_SIZE
+
+
+def example_inputs(batch_size: int = 1, shape: Tuple[int, ...] = EXAMPLE_SHAPE, seed: int = 0, device="cpu"):
+    """Deterministic random images and masks for tracing and verification."""
+    generator = torch.Generator().manual_seed(seed)
+    images = torch.rand((batch_size,) + tuple(shape[1:]), generator=generator)
+    masks = torch.zeros((batch_size, shape[1]), dtype=torch.bool)
+    return images.to(device), masks.to(device)
+
+
+def _model_device(model: torch.nn.Module) -> torch.device:
+    return next(model.parameters()).device
+
+
+def cache_key(checkpoint_path: str, engine: str, shape: Tuple[int, ...] = EXAMPLE_SHAPE) -> str:
+    """Key compiled artifacts on the checkpoint file, engine, input shape and torch version."""
+    stat = os.stat(checkpoint_path)
+    raw = f"{os.path.abspath(checkpoint_path)}|{stat.st_size}|{stat.st_mtime_ns}|{engine}|{shape}|{torch.__version__}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class OnnxEngine:
+    """Runs an exported UnetVFLOW graph with ONNX Runtime on CPU."""
+
+    def __init__(self, onnx_path: Path, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = Path(onnx_path)
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, images: torch.Tensor, masks: torch.Tensor) -> torch.Tensor:
+        logits = self.session.run(
+            ["logits"],
+            {
+                "images": images.detach().cpu().numpy().astype(np.float32, copy=False),
+                "masks": masks.detach().cpu().numpy().astype(bool, copy=False)
+            }
+        )[0]
+        return torch.from_numpy(logits).to(images.device)
+
+    def eval(self):
+        return self
+
+
+def _build_torchscript(model: torch.nn.Module, path: Path) -> torch.nn.Module:
+    if path.exists():
+        print(f"Loading cached TorchScript engine: {path}")
+        return torch.jit.load(str(path), map_location=_model_device(model)).eval()
+
+    images, masks = example_inputs(device=_model_device(model))
+    with torch.no_grad():
+        traced = torch.jit.trace(model, (images, masks), check_trace=False)
+    traced = torch.jit.freeze(traced.eval())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    traced.save(str(tmp_path))
+    os.replace(tmp_path, path)
+    print(f"Saved TorchScript engine: {path}")
+    return traced
+
+
+def _build_onnx(model: torch.nn.Module, path: Path) -> OnnxEngine:
+    if not path.exists():
+        images, masks = example_inputs(device=_model_device(model))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (images, masks),
+                str(tmp_path),
+                input_names=["images", "masks"],
+                output_names=["logits"],
+                dynamic_axes={"images": {0: "batch"}, "masks": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17,
+                dynamo=False
+            )
+        os.replace(tmp_path, path)
+        print(f"Saved ONNX engine: {path}")
+    else:
+        print(f"Loading cached ONNX engine: {path}")
+    return OnnxEngine(path, num_threads=torch.get_num_threads())
+
+
+def _build_compiled(model: torch.nn.Module, cache_dir: Path) -> Callable:
+    # Inductor keeps compiled kernels in its own on-disk cache; point it at ours
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(cache_dir / "inductor"))
+    return torch.compile(model, dynamic=True)
+
+
+def build_engine(
+    engine: str,
+    model: torch.nn.Module,
+    checkpoint_path: str,
+    cache_dir: Path
+):
+    """
+    Wrap an eager UnetVFLOW in the requested engine.
+
+    Returns a callable with the module's `(images, masks) -> logits` signature.
+    TorchScript and ONNX artifacts are written to `cache_dir` and reused on
+    later startups as long as the checkpoint file is unchanged.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    if engine == "eager":
+        return model
+
+    cache_dir = Path(cache_dir)
+    stem = f"{Path(checkpoint_path).parent.name}-{cache_key(checkpoint_path, engine)}"
+    if engine == "torchscript":
+        return _build_torchscript(model, cache_dir / f"{stem}.ts.pt")
+    if engine == "onnx":
+        return _build_onnx(model, cache_dir / f"{stem}.onnx")
+    return _build_compiled(model, cache_dir)
+
+
+@torch.no_grad()
+def verify_engine(
+    engine_model: Callable,
+    eager_model: torch.nn.Module,
+    batch_size: int = 2,
+    atol: float = 1e-3,
+    rtol: float = 1e-3
+) -> Dict:
+    """Compare an engine's output against eager on a random batch with one masked month."""
+    images, masks = example_inputs(batch_size=batch_size, seed=1, device=_model_device(eager_model))
+    masks[0, -1] = True
+
+    start_time = time.time()
+    expected = eager_model(images, masks)
+    eager_time = time.time() - start_time
+
+    start_time = time.time()
+    actual = engine_model(images, masks)
+    engine_time = time.time() - start_time
+
+    max_abs_diff = float((actual - expected).abs().max())
+    return {
+        "ok": bool(torch.allclose(actual, expected, atol=atol, rtol=rtol)),
+        "max_abs_diff": max_abs_diff,
+        "atol": atol,
+        "rtol": rtol,
+        "eager_time": eager_time,
+        "engine_time": engine_time
+    }
+
+
+def parse_args(args=None):
+    p = argparse.ArgumentParser(description="Build and verify UnetVFLOW inference engines")
+    p.add_argument("--model-path", type=str, required=True, help="path to model checkpoint")
+    p.add_argument("--engine", type=str, nargs="+", default=list(ENGINES[1:]), choices=ENGINES)
+    p.add_argument("--cache-dir", type=str, default="engine_cache", help="directory for compiled artifacts")
+    p.add_argument("--atol", type=float, default=1e-3)
+    p.add_argument("--rtol", type=float, default=1e-3)
+    return p.parse_args(args=args)
+
+
+def main():
+    from checkpoints import load_checkpoint, resolve_checkpoint
+    from models import load_from_checkpoint
+
+    args = parse_args()
+    model_path = str(resolve_checkpoint(args.model_path))
+    model = load_from_checkpoint(load_checkpoint(model_path))
+
+    failed = False
+    for engine in args.engine:
+        start_time = time.time()
+        engine_model = build_engine(engine, model, model_path, Path(args.cache_dir))
+        build_time = time.time() - start_time
+        report = verify_engine(engine_model, model, atol=args.atol, rtol=args.rtol)
+        failed |= not report["ok"]
+        print(f"{engine:12s} build {build_time:.2f}s  eager {report['eager_time']:.3f}s  "
+              f"engine {report['engine_time']:.3f}s  max|diff| {report['max_abs_diff']:.2e}  "
+              f"{'OK' if report['ok'] else 'MISMATCH'}")
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when an executor already has `max_pending` tasks queued or running."""
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with explicit concurrency and backlog limits.
+
+    At most `max_workers` tasks run at once; up to `max_pending` tasks (running
+    plus waiting) are admitted before `run` raises ExecutorSaturated, so a burst
+    of requests cannot pile unbounded work behind the pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        max_workers: int = 2,
+        max_pending: int = 32
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+
+        self._pool: Optional[Executor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Statistics
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_run_time = 0.0
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker"
+                )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the pool without blocking the event loop."""
+        self._ensure_pool()
+        return await self._run(self._pool, fn, *args, **kwargs)
+
+    async def run_shared(self, fn: Callable, *args, **kwargs):
+        """
+        Like `run`, for calls on in-process state (caches, the catalog) that
+        cannot be pickled to a worker process: a process executor runs them
+        on a thread instead, under the same concurrency and backlog limits.
+        """
+        self._ensure_pool()
+        if self.kind == "process" and self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-shared")
+        return await self._run(self._threads if self.kind == "process" else self._pool, fn, *args, **kwargs)
+
+    async def _run(self, pool: Executor, fn: Callable, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.name} executor is busy ({self.pending} tasks pending)")
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs) if kwargs else fn
+
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                self.active += 1
+                start_time = time.perf_counter()
+                try:
+                    if kwargs:
+                        result = await loop.run_in_executor(pool, call)
+                    else:
+                        result = await loop.run_in_executor(pool, call, *args)
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self.active -= 1
+                    self.total_run_time += time.perf_counter() - start_time
+                self.completed += 1
+                return result
+        finally:
+            self.pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the underlying pool; it is recreated on the next `run`."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=wait)
+            self._threads = None
+
+    def get_stats(self) -> Dict:
+        """Configuration and current occupancy."""
+        finished = self.completed + self.failed
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "active": self.active,
+            "queued": self.pending - self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "mean_run_time_ms": 1000.0 * self.total_run_time / finished if finished else 0.0
+        }
@@ -0,0 +1,216 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import tifffile
+
+from inference import BiomassPredictor
+from rendering import content_etag
+
+GT_SUFFIX = "_agbm.tif"
+
+
+@dataclass
+class GroundTruth:
+    """A decoded ground-truth raster with its precomputed stats and heatmap PNG."""
+    chip_id: str
+    array: np.ndarray  # float32 [H, W], read-only
+    stats: Dict
+    heatmap: Optional[bytes]
+    signature: Tuple
+    heatmap_etag: Optional[str] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes + (len(self.heatmap) if self.heatmap is not None else 0)
+
+
+def ground_truth_stats(gt: np.ndarray) -> Dict:
+    return {
+        "min": float(np.min(gt)),
+        "max": float(np.max(gt)),
+        "mean": float(np.mean(gt)),
+        "std": float(np.std(gt)),
+        "median": float(np.median(gt))
+    }
+
+
+class GroundTruthCache:
+    """
+    Byte-budgeted LRU cache of decoded AGBM ground truth.
+
+    Each raster is decoded once; its stats (including the median, which needs
+    a sort) are computed at the same time and the heatmap and its content
+    ETag on first request, or up front by `warm`. Entries are validated
+    against the file's mtime and size, so a rewritten raster is decoded
+    again (with a new ETag if its pixels changed). Chips whose
+    ground truth is in the ChipStore are served from it. Cached arrays are
+    read-only.
+    """
+
+    def __init__(
+        self,
+        gt_dir: Path,
+        budget_bytes: int,
+        store=None,
+        vmin: float = 0,
+        vmax: float = 400,
+        colormap: str = "viridis"
+    ):
+        self.gt_dir = Path(gt_dir)
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.store = store
+        self.vmin = vmin
+        self.vmax = vmax
+        self.colormap = colormap
+
+        self._entries: "OrderedDict[str, GroundTruth]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.renders = 0
+        self.warmed = 0
+        self.warming = False
+
+    def path(self, chip_id: str) -> Path:
+        return self.gt_dir / f"{chip_id}{GT_SUFFIX}"
+
+    def _signature(self, chip_id: str) -> Optional[Tuple]:
+        """Identity of the chip's ground truth source, or None if it has none."""
+        if "/" in chip_id or "\\" in chip_id:
+            return None
+        try:
+            stat = self.path(chip_id).stat()
+            return ("file", stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        if self.store is not None and self.store.agbm(chip_id) is not None:
+            return ("store", str(self.store.path))
+        return None
+
+    def _load(self, chip_id: str, signature: Tuple) -> np.ndarray:
+        if signature[0] == "store":
+            gt = np.array(self.store.agbm(chip_id), dtype=np.float32)
+        else:
+            gt = tifffile.imread(self.path(chip_id)).astype(np.float32)
+            if gt.ndim == 3:
+                gt = gt[..., 0]
+        gt.setflags(write=False)
+        return gt
+
+    def render(self, gt: np.ndarray) -> bytes:
+        return BiomassPredictor.prediction_to_heatmap(gt, vmin=self.vmin, vmax=self.vmax, colormap=self.colormap)
+
+    def get(self, chip_id: str, heatmap: bool = False) -> Optional[GroundTruth]:
+        """
+        Ground truth of a chip, decoding it on a miss; None if the chip has none.
+        With heatmap=True the heatmap PNG is rendered if it is not cached yet.
+        """
+        entry = self._fetch(chip_id, heatmap)
+        if entry is not None:
+            self._put(entry)
+        return entry
+
+    def _fetch(self, chip_id: str, heatmap: bool) -> Optional[GroundTruth]:
+        """The cached or freshly decoded entry for a chip, without caching it."""
+        signature = self._signature(chip_id)
+        if signature is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(chip_id)
+            if entry is not None and entry.signature != signature:
+                self._remove(chip_id)
+                self.stale += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(chip_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            gt = self._load(chip_id, signature)
+            entry = GroundTruth(chip_id, gt, ground_truth_stats(gt), None, signature)
+        if heatmap and entry.heatmap is None:
+            png = self.render(entry.array)
+            entry = GroundTruth(entry.chip_id, entry.array, entry.stats, png, signature, content_etag(png))
+            self.renders += 1
+        return entry
+
+    def _put(self, entry: GroundTruth):
+        if self.budget_bytes <= 0 or entry.nbytes > self.budget_bytes:
+            return
+        with self._lock:
+            if entry.chip_id in self._entries:
+                self._remove(entry.chip_id)
+            self._entries[entry.chip_id] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.budget_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, chip_id: str):
+        entry = self._entries.pop(chip_id)
+        self._bytes -= entry.nbytes
+
+    def warm(self, chip_ids: Iterable[str]) -> int:
+        """
+        Decode and render ground truth ahead of requests, stopping before the
+        budget would start evicting warmed entries; returns how many were added.
+        """
+        self.warming = True
+        added = 0
+        start_time = time.time()
+        try:
+            for chip_id in chip_ids:
+                if chip_id in self._entries and self._entries[chip_id].heatmap is not None:
+                    continue
+                entry = self._fetch(chip_id, heatmap=True)
+                if entry is None:
+                    continue
+                cached = self._entries.get(chip_id)
+                if self._bytes - (cached.nbytes if cached else 0) + entry.nbytes > self.budget_bytes:
+                    break
+                self._put(entry)
+                added += 1
+                self.warmed += 1
+        finally:
+            self.warming = False
+        print(f"Ground truth cache warmed with {added} chips in {time.time() - start_time:.1f}s")
+        return added
+
+    def invalidate(self, chip_id: Optional[str] = None) -> int:
+        """Drop one chip or, with no chip_id, everything; returns the count."""
+        with self._lock:
+            keys = [k for k in self._entries if chip_id is None or k == chip_id]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def get_stats(self) -> Dict:
+        """Budget, occupancy and hit/miss/render counters."""
+        lookups = self.hits + self.misses
+        return {
+            "budget_bytes": self.budget_bytes,
+            "cached_bytes": self._bytes,
+            "entries": len(self._entries),
+            "with_heatmap": sum(1 for e in self._entries.values() if e.heatmap is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "renders": self.renders,
+            "warmed": self.warmed,
+            "warming": self.warming,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -1,7 +1,9 @@
 import os
+import threading
 import time
 import uuid
 import io
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
@@ -11,8 +13,13 @@ import torch
 from PIL import Image
 from skimage import io as skio
 
-from models import UnetVFLOW
+from models import load_from_checkpoint
+from checkpoints import checkpoint_digest, load_checkpoint, resolve_checkpoint
 from dataset import read_imgs, read_imgs_from_files, predict_tta
+from engines import build_engine, verify_engine
+from quantization import QUANT_MODES, calibration_batches, quantize_model
+from registry import ModelRegistry
+from rendering import render_heatmap
 
 
 @dataclass
@@ -21,51 +28,191 @@ class ModelInfo:
     path: str
     backbone: str
     loaded: bool = False
+    engine: str = "eager"
+    verify_engine: bool = True
+    engine_check: Optional[Dict] = None
+    quantize: Optional[str] = None  # "static" int8
+    calibration_dir: Optional[str] = None
+    calibration_chips: int = 8
+    calibrated_chips: Optional[int] = None  # chips the int8 model was calibrated on
+    load_timings: Optional[Dict[str, float]] = None  # cold-start breakdown in seconds
+    members: Optional[List[str]] = None  # set for ensemble entries
+    member_weights: Optional[List[float]] = None
+
+
+@dataclass
+class PredictionJob:
+    """A single chip's prepared input plus the models and TTA to run on it."""
+    chip_id: str
+    images: torch.Tensor  # [1, T, C, H, W]
+    masks: torch.Tensor   # [1, T]
+    model_names: Optional[List[str]] = None
+    ntta: int = 1
+    ground_truth: Optional[np.ndarray] = None
 
 
 class BiomassPredictor:
     """Handles biomass prediction using multiple deep learning models."""
     
-    def __init__(self, model_configs: List[Dict]):
-        self.models: Dict[str, torch.nn.Module] = {}
+    def __init__(
+        self,
+        model_configs: List[Dict],
+        batched_tta: bool = True,
+        engine_cache_dir: Optional[Path] = None,
+        memory_budget_bytes: Optional[int] = None,
+        model_parallelism: Optional[int] = None
+    ):
+        # Models are loaded on first use and evicted LRU beyond the memory budget
+        self.models = ModelRegistry(
+            loader=self._load_model_object,
+            budget_bytes=memory_budget_bytes,
+            on_evict=self._on_evict,
+            estimate=self._estimate_footprint
+        )
         self.model_infos: Dict[str, ModelInfo] = {}
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        
+        # Stack TTA views along the batch axis instead of one pass per view
+        self.batched_tta = batched_tta
+        # Optional InferenceWorkerPool; when set, forward passes run in its processes
+        self.worker_pool = None
+        # Optional GroundTruthCache; when set, ground truth in its directory is read through it
+        self.ground_truth_cache = None
+        # Checkpoint digests per model, revalidated against the file's mtime and size
+        self._fingerprints: Dict[str, Tuple[Tuple, str]] = {}
+        self._fingerprint_lock = threading.Lock()
+        # Where TorchScript / ONNX / inductor artifacts are cached between startups
+        self.engine_cache_dir = Path(engine_cache_dir) if engine_cache_dir else Path("engine_cache")
         for config in model_configs:
             self.model_infos[config["name"]] = ModelInfo(
                 name=config["name"],
                 path=config["path"],
-                backbone=config.get("backbone", "unknown")
+                backbone=config.get("backbone", "unknown"),
+                engine=config.get("engine", "eager"),
+                verify_engine=config.get("verify_engine", True),
+                quantize=config.get("quantize"),
+                calibration_dir=config.get("calibration_dir"),
+                calibration_chips=config.get("calibration_chips", 8),
+                members=config.get("members"),
+                member_weights=config.get("member_weights")
+            )
+        
+        for info in self.model_infos.values():
+            if info.members is None:
+                continue
+            unknown = [m for m in info.members if m not in self.model_infos or self.model_infos[m].members]
+            if unknown:
+                raise ValueError(f"Ensemble {info.name} has unknown or nested members: {unknown}")
+            if info.member_weights is None:
+                info.member_weights = [1.0] * len(info.members)
+            if len(info.member_weights) != len(info.members):
+                raise ValueError(f"Ensemble {info.name} needs one weight per member")
+        
+        # Models of a batch (e.g. ensemble members) run side by side, by
+        # default as many as the largest ensemble has members. Each model
+        # thread gets an equal share of torch's intra-op threads, so together
+        # they use the cores one model would rather than oversubscribing them.
+        if model_parallelism is None:
+            model_parallelism = max((len(i.members) for i in self.model_infos.values() if i.members), default=1)
+        self.model_parallelism = max(1, int(model_parallelism))
+        self.threads_per_model = max(1, torch.get_num_threads() // self.model_parallelism)
+        self._model_executor = None
+        if self.model_parallelism > 1:
+            self._model_executor = ThreadPoolExecutor(
+                self.model_parallelism,
+                thread_name_prefix="model",
+                initializer=torch.set_num_threads,
+                initargs=(self.threads_per_model,)
             )
     
     def load_model(self, model_name: str) -> bool:
-        """Load a specific model by name."""
-        if model_name in self.models:
-            return True
-        
+        """Load a specific model by name (a no-op if it is already resident)."""
+        info = self.model_infos.get(model_name)
+        if info is not None and info.members:
+            return all([self.load_model(m) for m in info.members])
+        return self.models.get(model_name) is not None
+    
+    def _load_model_object(self, model_name: str):
+        """Build a model from its checkpoint; used by the registry on a miss."""
         info = self.model_infos.get(model_name)
         if not info:
-            return False
+            return None
         
-        if not os.path.exists(info.path):
+        checkpoint_path = resolve_checkpoint(info.path)
+        if not checkpoint_path.exists():
             print(f"Model file not found: {info.path}")
-            return False
+            return None
         
         try:
-            checkpoint = torch.load(info.path, weights_only=False, map_location=self.device)
-            model = UnetVFLOW(checkpoint['args'])
-            model.load_state_dict(checkpoint['state_dict'])
-            model = model.to(self.device)
-            model.eval()
+            start_time = time.perf_counter()
+            # Converted weights are memory-mapped rather than read into memory
+            checkpoint = load_checkpoint(checkpoint_path, self.device)
+            read_time = time.perf_counter()
+            model = load_from_checkpoint(checkpoint, self.device)
+            build_time = time.perf_counter()
             
-            self.models[model_name] = model
+            if info.quantize:
+                # int8 kernels are CPU-only and replace the engine layer
+                batches = None
+                if info.quantize == "static":
+                    batches = calibration_batches(info.calibration_dir, num_chips=info.calibration_chips)
+                model, info.calibrated_chips = quantize_model(model, info.quantize, batches)
+                info.engine = "eager"
+            else:
+                model = self._build_engine(info, model)
+            end_time = time.perf_counter()
             info.loaded = True
             info.backbone = checkpoint['args'].backbone
-            print(f"Loaded model: {model_name} ({info.backbone})")
-            return True
+            info.load_timings = {
+                "checkpoint_read": read_time - start_time,
+                "build": build_time - read_time,
+                "engine": end_time - build_time,
+                "total": end_time - start_time
+            }
+            print(f"Loaded model: {model_name} ({info.backbone}, {info.engine}) in {end_time - start_time:.2f}s")
+            return model
         except Exception as e:
             print(f"Error loading model {model_name}: {e}")
-            return False
+            return None
+    
+    def _estimate_footprint(self, model_name: str) -> int:
+        """Expected weight memory of a model not loaded yet: its weight file size."""
+        info = self.model_infos.get(model_name)
+        if info is None:
+            return 0
+        checkpoint_path = resolve_checkpoint(info.path)
+        return checkpoint_path.stat().st_size if checkpoint_path.exists() else 0
+    
+    def _on_evict(self, model_name: str):
+        self.model_infos[model_name].loaded = False
+        if self.worker_pool is not None:
+            self.worker_pool.drop_model(model_name)
+    
+    def available_models(self) -> List[str]:
+        """Configured models whose checkpoint exists, loaded or not."""
+        def available(info):
+            if info.members:
+                return all(available(self.model_infos[m]) for m in info.members)
+            return resolve_checkpoint(info.path).exists()
+        return [name for name, info in self.model_infos.items() if available(info)]
+    
+    def _build_engine(self, info: ModelInfo, model: torch.nn.Module):
+        """Wrap an eager model in its configured engine, falling back to eager on failure."""
+        if info.engine == "eager":
+            return model
+        
+        try:
+            engine_model = build_engine(info.engine, model, str(resolve_checkpoint(info.path)), self.engine_cache_dir)
+            if info.verify_engine:
+                info.engine_check = verify_engine(engine_model, model)
+                if not info.engine_check["ok"]:
+                    raise RuntimeError(
+                        f"output differs from eager by {info.engine_check['max_abs_diff']:.2e}"
+                    )
+            return engine_model
+        except Exception as e:
+            print(f"Engine {info.engine} unavailable for {info.name}, using eager: {e}")
+            info.engine = "eager"
+            return model
     
     def load_all_models(self) -> Dict[str, bool]:
         """Load all configured models."""
@@ -76,16 +223,158 @@ class BiomassPredictor:
     
     def get_model_info(self) -> List[Dict]:
         """Get information about all models."""
+        def loaded(info):
+            if info.members:
+                return all(self.model_infos[m].loaded for m in info.members)
+            return info.loaded
+        
         return [
             {
                 "name": info.name,
                 "backbone": info.backbone,
-                "loaded": info.loaded,
-                "path": info.path
+                "loaded": loaded(info),
+                "path": info.path,
+                "engine": info.engine,
+                "engine_check": info.engine_check,
+                "quantize": info.quantize,
+                "calibrated_chips": info.calibrated_chips,
+                "load_timings": info.load_timings,
+                "registry": self.models.entry_info(info.name),
+                "members": info.members,
+                "member_weights": info.member_weights
             }
             for info in self.model_infos.values()
         ]
     
+    def to_tensors(self, imgs: np.ndarray, mask: np.ndarray) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Convert a [T, C, H, W] stack and [T] mask into batched tensors on the device.
+
+        A float32 stack on the CPU is shared, not copied; a pinned stack (see
+        `pin_inputs`) is copied to the GPU asynchronously. Raw int16 stacks keep
+        their dtype and are normalised by predict_tta on the device.
+        """
+        images = torch.from_numpy(imgs).unsqueeze(0)
+        if images.is_floating_point():
+            images = images.float()
+        images = images.to(self.device, non_blocking=self.pin_inputs)
+        masks = torch.from_numpy(mask).unsqueeze(0).to(self.device)
+        return images, masks
+    
+    @property
+    def pin_inputs(self) -> bool:
+        """Whether chip stacks should be read into page-locked memory (GPU inference only)."""
+        return self.device.type == "cuda"
+    
+    def prepare_chip(self, chip_id: str, data_dir: Path) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Read a chip from disk into [1, T, C, H, W] images and [1, T] masks."""
+        imgs, mask = read_imgs(chip_id, data_dir, pin_memory=self.pin_inputs)
+        return self.to_tensors(imgs, mask)
+    
+    @staticmethod
+    def chip_id_from_files(file_dict: Dict) -> str:
+        """Guess the chip_id from uploaded filenames, falling back to 'uploaded'."""
+        for filename in file_dict.keys():
+            if "_S1_" in filename or "_S2_" in filename:
+                return filename.split("_S")[0]
+        return "uploaded"
+    
+    def prepare_files(self, file_dict: Dict[str, np.ndarray]) -> Tuple[str, torch.Tensor, torch.Tensor]:
+        """Stack uploaded file arrays into tensors; also returns the chip_id guessed from filenames."""
+        imgs, mask = read_imgs_from_files(file_dict, pin_memory=self.pin_inputs)
+        images, masks = self.to_tensors(imgs, mask)
+        return self.chip_id_from_files(file_dict), images, masks
+    
+    def weights_file(self, model_name: str) -> Optional[str]:
+        """The safetensors file a model was memory-mapped from, if any."""
+        checkpoint_path = resolve_checkpoint(self.model_infos[model_name].path)
+        return str(checkpoint_path) if checkpoint_path.suffix == ".safetensors" else None
+    
+    def model_fingerprint(self, model_name: str) -> Optional[str]:
+        """
+        Identity of what a model computes: the digest of the checkpoint it
+        loads plus its engine and quantisation (for ensembles, the members'
+        fingerprints and weights). None if the checkpoint is missing. The
+        digest is computed once and reused while the file is unchanged.
+        """
+        info = self.model_infos[model_name]
+        if info.members:
+            members = [self.model_fingerprint(m) for m in info.members]
+            if any(m is None for m in members):
+                return None
+            return f"ensemble:{members}:{info.member_weights}"
+        
+        path = resolve_checkpoint(info.path)
+        try:
+            stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        signature = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._fingerprint_lock:
+            cached = self._fingerprints.get(model_name)
+            if cached is None or cached[0] != signature:
+                cached = (signature, checkpoint_digest(path))
+                self._fingerprints[model_name] = cached
+        return f"{cached[1]}:{info.engine}:{info.quantize}"
+    
+    def _pool_serves(self, model_name: str) -> bool:
+        """Only float eager modules can be shared with worker processes."""
+        info = self.model_infos[model_name]
+        return self.worker_pool is not None and info.engine == "eager" and not info.quantize
+    
+    @torch.no_grad()
+    def run_model(self, model_name: str, images: torch.Tensor, masks: torch.Tensor, ntta: int = 1) -> np.ndarray:
+        """Run one model over a [B, T, C, H, W] batch and return [B, H, W] predictions."""
+        info = self.model_infos[model_name]
+        if info.members:
+            if self._model_executor is not None:
+                futures = [self._model_executor.submit(self.run_model, m, images, masks, ntta) for m in info.members]
+                preds = [future.result() for future in futures]
+            else:
+                preds = [self.run_model(m, images, masks, ntta=ntta) for m in info.members]
+            return self._combine_members(info, preds)[0]
+        
+        model = self.models.acquire(model_name)
+        if model is None:
+            raise KeyError(model_name)
+        try:
+            if self._pool_serves(model_name):
+                self.worker_pool.ensure_model(model_name, model, self.weights_file(model_name))
+                return self.worker_pool.run_model(model_name, images, masks, ntta=ntta)
+            return self._run_local(model_name, model, images, masks, ntta)
+        finally:
+            self.models.release(model_name)
+    
+    def _run_timed(self, model_name: str, model, images: torch.Tensor, masks: torch.Tensor, ntta: int):
+        """_run_local plus the start and end time of the forward pass."""
+        start_time = time.time()
+        preds = self._run_local(model_name, model, images, masks, ntta)
+        return preds, start_time, time.time()
+    
+    @torch.no_grad()
+    def _run_local(self, model_name: str, model, images: torch.Tensor, masks: torch.Tensor, ntta: int) -> np.ndarray:
+        if self.model_infos[model_name].quantize:
+            images, masks = images.cpu(), masks.cpu()
+        
+        pred = predict_tta([model], images, masks, ntta=ntta, batched=self.batched_tta)
+        
+        if pred.ndim == 4 and pred.shape[1] == 1:
+            pred = pred[:, 0, ...]
+        
+        return pred.cpu().numpy()
+    
+    @staticmethod
+    def _combine_members(info: ModelInfo, preds: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Weighted mean and weighted per-pixel standard deviation of all member predictions."""
+        if len(preds) != len(info.members) or any(p is None for p in preds):
+            raise ValueError(f"Ensemble {info.name} needs a prediction from every member")
+        stacked = np.stack(preds).astype(np.float32)
+        weights = np.array(info.member_weights, dtype=np.float32)[:, None, None]
+        weights = weights / weights.sum()
+        mean = (weights * stacked).sum(axis=0)
+        std = np.sqrt((weights * (stacked - mean) ** 2).sum(axis=0))
+        return mean, std
+    
     @torch.no_grad()
     def predict(
         self, 
@@ -100,61 +389,26 @@ class BiomassPredictor:
         
         Returns dict with predictions and metrics for each model.
         """
-        if model_names is None:
-            model_names = list(self.models.keys())
-        
-        # Load images
-        imgs, mask = read_imgs(chip_id, data_dir)
-        
-        # Convert to tensors
-        images = torch.from_numpy(imgs).unsqueeze(0).float().to(self.device)
-        masks = torch.from_numpy(mask).unsqueeze(0).to(self.device)
+        images, masks = self.prepare_chip(chip_id, data_dir)
         
         # Load ground truth if available
         gt_map = None
-        if ground_truth_path and ground_truth_path.exists():
-            gt_map = self._load_ground_truth(ground_truth_path)
-        
-        results = {
-            "chip_id": chip_id,
-            "predictions": {},
-            "ground_truth_available": gt_map is not None
-        }
+        cache = self.ground_truth_cache
+        if ground_truth_path and cache is not None and Path(ground_truth_path).parent == cache.gt_dir:
+            gt = cache.get(chip_id)
+            gt_map = gt.array if gt is not None else None
+        elif ground_truth_path and ground_truth_path.exists():
+            gt_map = self.load_ground_truth(ground_truth_path)
         
-        for model_name in model_names:
-            if model_name not in self.models:
-                if not self.load_model(model_name):
-                    continue
-            
-            model = self.models[model_name]
-            start_time = time.time()
-            
-            # Run prediction
-            pred = predict_tta([model], images, masks, ntta=ntta)
-            
-            if pred.ndim == 4 and pred.shape[1] == 1:
-                pred = pred[:, 0, ...]
-            
-            pred_np = pred.cpu().numpy()[0]  # [H, W]
-            processing_time = time.time() - start_time
-            
-            # Calculate statistics
-            stats = self._calculate_stats(pred_np)
-            
-            # Calculate metrics if ground truth available
-            metrics = None
-            if gt_map is not None:
-                metrics = self._calculate_metrics(gt_map, pred_np)
-            
-            results["predictions"][model_name] = {
-                "prediction": pred_np,
-                "stats": stats,
-                "metrics": metrics,
-                "processing_time": processing_time,
-                "backbone": self.model_infos[model_name].backbone
-            }
-        
-        return results
+        job = PredictionJob(
+            chip_id=chip_id,
+            images=images,
+            masks=masks,
+            model_names=model_names,
+            ntta=ntta,
+            ground_truth=gt_map
+        )
+        return self.predict_batch([job])[0]
     
     @torch.no_grad()
     def predict_from_files(
@@ -167,62 +421,185 @@ class BiomassPredictor:
         """
         Run prediction from uploaded file arrays.
         """
-        if model_names is None:
-            model_names = list(self.models.keys())
+        chip_id, images, masks = self.prepare_files(file_dict)
         
-        # Extract chip_id from filenames
-        chip_id = "uploaded"
-        for filename in file_dict.keys():
-            if "_S1_" in filename or "_S2_" in filename:
-                chip_id = filename.split("_S")[0]
-                break
+        job = PredictionJob(
+            chip_id=chip_id,
+            images=images,
+            masks=masks,
+            model_names=model_names,
+            ntta=ntta,
+            ground_truth=ground_truth
+        )
+        return self.predict_batch([job])[0]
+    
+    @torch.no_grad()
+    def predict_batch(self, jobs: List[PredictionJob]) -> List[Dict]:
+        """
+        Run several prediction jobs with one forward pass per (model, ntta) group.
         
-        # Load images from file dict
-        imgs, mask = read_imgs_from_files(file_dict)
+        Jobs asking for the same model and TTA setting are concatenated along the
+        batch axis; each job gets back the same result dict as predict().
+        """
+        results = []
+        groups: Dict[Tuple, List[int]] = {}
         
-        # Convert to tensors
-        images = torch.from_numpy(imgs).unsqueeze(0).float().to(self.device)
-        masks = torch.from_numpy(mask).unsqueeze(0).to(self.device)
+        for idx, job in enumerate(jobs):
+            model_names = job.model_names
+            if model_names is None:
+                model_names = self.available_models()
+            
+            results.append({
+                "chip_id": job.chip_id,
+                "predictions": {},
+                "failed_models": {},
+                "ground_truth_available": job.ground_truth is not None
+            })
+            
+            for model_name in model_names:
+                if model_name not in self.model_infos:
+                    continue
+                # Shapes must match to share a batch (uploads may differ)
+                key = (model_name, job.ntta, tuple(job.images.shape[1:]))
+                groups.setdefault(key, []).append(idx)
         
-        results = {
-            "chip_id": chip_id,
-            "predictions": {},
-            "ground_truth_available": ground_truth is not None
-        }
+        # Ensembles reuse their members' groups, so a member that was also
+        # requested directly still runs only once
+        ensembles = {}
+        for key in list(groups):
+            info = self.model_infos[key[0]]
+            if not info.members:
+                continue
+            ensembles[key] = groups.pop(key)
+            for member in info.members:
+                member_key = (member,) + key[1:]
+                groups[member_key] = sorted(set(groups.get(member_key, [])) | set(ensembles[key]))
+        
+        outputs: Dict[Tuple[str, int], np.ndarray] = {}
+        uncertainties: Dict[Tuple[str, int], np.ndarray] = {}
+        # (start, end) of each model's forward pass, taken after it was
+        # acquired (and loaded), so load time is not reported as inference
+        spans: Dict[Tuple[str, int], Tuple[float, float]] = {}
         
-        for model_name in model_names:
-            if model_name not in self.models:
-                if not self.load_model(model_name):
+        def record(model_name, indices, preds, start_time, end_time):
+            for pred_np, i in zip(preds, indices):
+                outputs[(model_name, i)] = pred_np
+                spans[(model_name, i)] = (start_time, end_time)
+        
+        # Models served by the worker pool are submitted up front so they run
+        # in parallel; the rest run here while the pool is busy, side by side
+        # on the model executor
+        pending = []
+        local = []
+        pinned = []
+        try:
+            for (model_name, ntta, _), indices in groups.items():
+                # Resolved per batch: loads on a miss, may evict the least recently
+                # used model, and stays pinned until the batch is done with it
+                model = self.models.acquire(model_name)
+                if model is None:
                     continue
+                pinned.append(model_name)
+                
+                if len(indices) == 1:
+                    # A lone chip goes to the model as is rather than through a copy
+                    images, masks = jobs[indices[0]].images, jobs[indices[0]].masks
+                else:
+                    images = torch.cat([jobs[i].images for i in indices], dim=0)
+                    masks = torch.cat([jobs[i].masks for i in indices], dim=0)
+                if self._pool_serves(model_name):
+                    self.worker_pool.ensure_model(model_name, model, self.weights_file(model_name))
+                    start_time = time.time()
+                    future = self.worker_pool.submit(model_name, images, masks, ntta=ntta)
+                    pending.append((model_name, indices, start_time, future))
+                    continue
+                local.append((model_name, model, images, masks, ntta, indices))
             
-            model = self.models[model_name]
-            start_time = time.time()
-            
-            pred = predict_tta([model], images, masks, ntta=ntta)
-            
-            if pred.ndim == 4 and pred.shape[1] == 1:
-                pred = pred[:, 0, ...]
-            
-            pred_np = pred.cpu().numpy()[0]
-            processing_time = time.time() - start_time
-            
-            stats = self._calculate_stats(pred_np)
+            if self._model_executor is not None and len(local) > 1:
+                for model_name, model, images, masks, ntta, indices in local:
+                    future = self._model_executor.submit(self._run_timed, model_name, model, images, masks, ntta)
+                    pending.append((model_name, indices, None, future))
+            else:
+                for model_name, model, images, masks, ntta, indices in local:
+                    record(model_name, indices, *self._run_timed(model_name, model, images, masks, ntta))
             
-            metrics = None
-            if ground_truth is not None:
-                metrics = self._calculate_metrics(ground_truth, pred_np)
+            for model_name, indices, start_time, future in pending:
+                if start_time is None:
+                    record(model_name, indices, *future.result())
+                else:
+                    preds = future.result()
+                    record(model_name, indices, preds, start_time, time.time())
+        finally:
+            for model_name in pinned:
+                self.models.release(model_name)
+        
+        timings = {key: end_time - start_time for key, (start_time, end_time) in spans.items()}
+        
+        # An ensemble missing a member is not reported as the ensemble
+        failures: Dict[Tuple[str, int], str] = {}
+        for (model_name, _, _), indices in ensembles.items():
+            info = self.model_infos[model_name]
+            for i in indices:
+                missing = [m for m in info.members if (m, i) not in outputs]
+                if missing:
+                    failures[(model_name, i)] = f"ensemble members unavailable: {', '.join(missing)}"
+                    continue
+                preds = [outputs[(m, i)] for m in info.members]
+                outputs[(model_name, i)], uncertainties[(model_name, i)] = self._combine_members(info, preds)
+                # From the first member starting to the last one finishing
+                member_spans = [spans[(m, i)] for m in info.members]
+                timings[(model_name, i)] = max(end for _, end in member_spans) - min(start for start, _ in member_spans)
+        
+        # Fill results in each job's requested model order
+        for idx, job in enumerate(jobs):
+            model_names = job.model_names
+            if model_names is None:
+                model_names = self.available_models()
             
-            results["predictions"][model_name] = {
-                "prediction": pred_np,
-                "stats": stats,
-                "metrics": metrics,
-                "processing_time": processing_time,
-                "backbone": self.model_infos[model_name].backbone
-            }
+            for model_name in model_names:
+                if (model_name, idx) not in outputs:
+                    if model_name in self.model_infos:
+                        results[idx]["failed_models"][model_name] = failures.get(
+                            (model_name, idx), "model could not be loaded"
+                        )
+                    continue
+                results[idx]["predictions"][model_name] = self.build_prediction(
+                    model_name,
+                    outputs[(model_name, idx)],
+                    timings[(model_name, idx)],
+                    job.ground_truth,
+                    uncertainties.get((model_name, idx))
+                )
         
         return results
     
-    def _load_ground_truth(self, path: Path) -> np.ndarray:
+    def build_prediction(
+        self,
+        model_name: str,
+        pred_np: np.ndarray,
+        processing_time: float,
+        ground_truth: Optional[np.ndarray] = None,
+        uncertainty: Optional[np.ndarray] = None
+    ) -> Dict:
+        """Assemble the per-model result entry with stats, optional metrics and, for ensembles, the spread."""
+        stats = self._calculate_stats(pred_np)
+        
+        metrics = None
+        if ground_truth is not None:
+            metrics = self._calculate_metrics(ground_truth, pred_np)
+        
+        return {
+            "prediction": pred_np,
+            "stats": stats,
+            "metrics": metrics,
+            "processing_time": processing_time,
+            "backbone": self.model_infos[model_name].backbone,
+            "uncertainty": uncertainty,
+            "uncertainty_stats": self._calculate_stats(uncertainty) if uncertainty is not None else None
+        }
+    
+    @staticmethod
+    def load_ground_truth(path: Path) -> np.ndarray:
         """Load ground truth biomass map."""
         img = Image.open(path)
         arr = np.array(img).astype(np.float32)
@@ -286,37 +663,18 @@ class BiomassPredictor:
             "n_pixels": int(len(yt))
         }
     
+    @staticmethod
     def prediction_to_heatmap(
-        self, 
         prediction: np.ndarray, 
         vmin: float = 0, 
         vmax: float = 400,
         colormap: str = "viridis"
     ) -> bytes:
         """Convert prediction array to colored heatmap PNG bytes."""
-        import matplotlib
-        matplotlib.use('Agg')
-        import matplotlib.pyplot as plt
-        
-        # Normalize to [0, 1]
-        normalized = np.clip((prediction - vmin) / (vmax - vmin), 0, 1)
-        
-        # Apply colormap
-        cmap = plt.get_cmap(colormap)
-        colored = cmap(normalized)
-        
-        # Convert to uint8
-        img_array = (colored[:, :, :3] * 255).astype(np.uint8)
-        
-        # Create PNG
-        img = Image.fromarray(img_array)
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        return buffer.getvalue()
+        return render_heatmap(prediction, vmin=vmin, vmax=vmax, colormap=colormap)
     
-    def prediction_to_tiff(self, prediction: np.ndarray) -> bytes:
+    @staticmethod
+    def prediction_to_tiff(prediction: np.ndarray) -> bytes:
         """Convert prediction array to TIFF bytes."""
         img = Image.fromarray(prediction.astype(np.float32))
         buffer = io.BytesIO()
@@ -332,12 +690,53 @@ def create_predictor(base_path: Path) -> BiomassPredictor:
         {
             "name": "MobileNetV3-Large",
             "path": str(base_path / "logs" / "model_best.pth"),
-            "backbone": "mobilenetv3_large_100"
+            "backbone": "mobilenetv3_large_100",
+            "engine": os.environ.get("BIOMASS_ENGINE", "eager")
         },
         {
             "name": "EfficientNet-B5",
             "path": str(base_path / "efficientnet" / "model_best.pth"),
-            "backbone": "tf_efficientnet_b5"
+            "backbone": "tf_efficientnet_b5",
+            "engine": os.environ.get("BIOMASS_ENGINE", "eager")
         }
     ]
-    return BiomassPredictor(model_configs)
+    
+    # Optional int8 variants of each model (statically quantized)
+    quantize_mode = os.environ.get("BIOMASS_INT8_MODELS")
+    if quantize_mode and quantize_mode not in QUANT_MODES:
+        raise ValueError(f"BIOMASS_INT8_MODELS must be one of {QUANT_MODES}, got '{quantize_mode}'")
+    if quantize_mode:
+        for config in list(model_configs):
+            model_configs.append({
+                **config,
+                "name": f"{config['name']} (int8)",
+                "engine": "eager",
+                "quantize": quantize_mode,
+                "calibration_dir": str(base_path / "test_subset100chip" / "test_features")
+            })
+    
+    # Ensemble of the float models: weighted mean plus per-pixel spread
+    if os.environ.get("BIOMASS_ENSEMBLE", "1") == "1":
+        members = [c for c in model_configs if not c.get("quantize")]
+        weights = os.environ.get("BIOMASS_ENSEMBLE_WEIGHTS")
+        model_configs.append({
+            "name": "Ensemble",
+            "path": "",
+            "backbone": " + ".join(c["backbone"] for c in members),
+            "members": [c["name"] for c in members],
+            "member_weights": [float(w) for w in weights.split(",")] if weights else None
+        })
+    
+    # Resident-model budget; least recently used models are evicted beyond it (0 = unlimited)
+    budget_mb = float(os.environ.get("BIOMASS_MODEL_MEMORY_BUDGET_MB", "0"))
+    
+    # Models run side by side within a batch, splitting torch's threads
+    # (default: the ensemble's member count; 1 runs them one at a time)
+    model_parallelism = os.environ.get("BIOMASS_MODEL_PARALLELISM")
+    
+    return BiomassPredictor(
+        model_configs,
+        model_parallelism=int(model_parallelism) if model_parallelism else None,
+        engine_cache_dir=base_path / "engine_cache",
+        memory_budget_bytes=int(budget_mb * 1024 * 1024) or None
+    )
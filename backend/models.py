@@ -25,7 +25,8 @@ class AttentionPooling(nn.Module):
         # x:    [B, T, *, D]
         attn_logits = self.attn(x)  # [B, T, *, 1]
         if mask is not None:
-            attn_logits[mask] = -torch.inf
+            # Same as attn_logits[mask] = -inf, but shape-agnostic for tracing/export
+            attn_logits = attn_logits.masked_fill(mask[:, :, None, None, None], -torch.inf)
         attn_weights = attn_logits.softmax(dim=1)  # [B, T, *, 1]
         x = attn_weights * x  # [B, T, *, D]
         x = x.sum(dim=1)   # [B, *, D]
@@ -34,13 +35,13 @@ class AttentionPooling(nn.Module):
 
 
 class TimmEncoder(nn.Module):
-    def __init__(self, cfg, output_stride=32):
+    def __init__(self, cfg, output_stride=32, pretrained=True):
         super().__init__()
         depth = len(cfg.out_indices)
         self.model = timm.create_model(
             cfg.backbone,
             in_chans=cfg.in_channels,
-            pretrained=True,
+            pretrained=pretrained,
             num_classes=0,
             features_only=True,
             output_stride=output_stride if output_stride != 32 else None,
@@ -67,10 +68,10 @@ class TimmEncoder(nn.Module):
 
 
 class UnetVFLOW(nn.Module):
-    def __init__(self, args, decoder_use_batchnorm: bool = True):
+    def __init__(self, args, decoder_use_batchnorm: bool = True, pretrained: bool = True):
         super().__init__()
         encoder_name = args.backbone
-        self.encoder = TimmEncoder(args)
+        self.encoder = TimmEncoder(args, pretrained=pretrained)
         encoder_depth = len(self.encoder.out_channels) - 1
 
         self.attn = nn.ModuleList(
@@ -94,19 +95,40 @@ class UnetVFLOW(nn.Module):
         self.segmentation_head = nn.Conv2d(decoder_channels[-1], args.n_classes, kernel_size=3, padding=1)
 
         self.name = "u-{}".format(encoder_name)
+        # At inference, run the encoder only on unmasked timesteps
+        self.skip_masked_frames = True
         self.initialize()
 
     def initialize(self):
         init.initialize_decoder(self.decoder)
         init.initialize_head(self.segmentation_head)
 
+    def _encode_valid(self, x, mask):
+        """Encode only unmasked frames of x [B*T, C, H, W] and scatter features back.
+
+        Masked slots are left as zeros; attention pooling gives them -inf
+        logits, so the pooled features match encoding every frame.
+        """
+        valid = (~mask).reshape(-1).nonzero(as_tuple=True)[0]
+        valid_features = self.encoder(x.index_select(0, valid))
+
+        features = []
+        for f in valid_features:
+            full = f.new_zeros((x.shape[0],) + tuple(f.shape[1:]))
+            full.index_copy_(0, valid, f)
+            features.append(full)
+        return features
+
     def forward(self, x, mask):
         """Sequentially pass `x` trough model`s encoder, decoder and heads"""
         bs, _, d, h, w = x.size()
         x = x.view(-1, d, h, w)
         x = x.to(memory_format=torch.channels_last)
 
-        features = self.encoder(x)
+        if self.skip_masked_frames and not self.training and mask is not None and bool(mask.any()):
+            features = self._encode_valid(x, mask)
+        else:
+            features = self.encoder(x)
 
         features = [None] + [
             attn(f, bs, mask)[0]
@@ -118,3 +140,17 @@ class UnetVFLOW(nn.Module):
         masks = self.segmentation_head(decoder_output)
 
         return masks
+
+
+def load_from_checkpoint(checkpoint, device="cpu"):
+    """
+    Build a UnetVFLOW from a loaded checkpoint dict without pretrained weights.
+
+    The architecture is created on the meta device, so neither the ImageNet
+    download nor any weight initialisation happens; the checkpoint tensors are
+    then assigned in place of the empty parameters.
+    """
+    with torch.device("meta"):
+        model = UnetVFLOW(checkpoint['args'], pretrained=False)
+    model.load_state_dict(checkpoint['state_dict'], assign=True)
+    return model.to(device).eval()
@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CachedPrediction:
+    """One model's output for one input; arrays are read-only."""
+    prediction: np.ndarray
+    uncertainty: Optional[np.ndarray]
+    processing_time: float
+
+    @property
+    def nbytes(self) -> int:
+        return self.prediction.nbytes + (self.uncertainty.nbytes if self.uncertainty is not None else 0)
+
+
+def fingerprint(parts: Iterable) -> str:
+    """Stable hex digest of a sequence of reprs."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def upload_fingerprint(file_hashes: Dict[str, str]) -> str:
+    """
+    Fingerprint of uploaded S1/S2 files from their content hashes, keyed by
+    the month and sensor each file fills (as read_imgs_from_files picks
+    them), so renamed copies of the same TIFFs give the same fingerprint.
+    """
+    parts = ["upload"]
+    for month in range(12):
+        for sensor in ("S1", "S2"):
+            match = None
+            for filename in file_hashes:
+                if f"_{sensor}_{month:0>2}.tif" in filename:
+                    match = file_hashes[filename]
+            parts.append((month, sensor, match))
+    return fingerprint(parts)
+
+
+class PredictionCache:
+    """
+    Byte-budgeted LRU cache of model outputs.
+
+    Keyed by (input fingerprint, model fingerprint, ntta): the input
+    fingerprint identifies the chip's files or the uploaded bytes, the model
+    fingerprint the checkpoint contents and engine, so a changed input or a
+    retrained model is never served a stale map. Stats and metrics are not
+    cached; they are recomputed from the map, against the current ground truth.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = max(0, int(budget_bytes))
+
+        self._entries: "OrderedDict[Tuple, CachedPrediction]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def get(self, key: Tuple) -> Optional[CachedPrediction]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, prediction: np.ndarray, uncertainty: Optional[np.ndarray], processing_time: float):
+        """
+        Cache a read-only copy of a model output (outputs can be views into
+        a whole batch, which the cache should not keep alive).
+        """
+        if not self.enabled:
+            return
+        prediction = prediction.copy()
+        prediction.setflags(write=False)
+        if uncertainty is not None:
+            uncertainty = uncertainty.copy()
+            uncertainty.setflags(write=False)
+        entry = CachedPrediction(prediction, uncertainty, processing_time)
+        if entry.nbytes > self.budget_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.budget_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return removed
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "budget_bytes": self.budget_bytes,
+            "cached_bytes": self._bytes,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
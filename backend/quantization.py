@@ -0,0 +1,101 @@
+import copy
+import io
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+from dataset import read_imgs
+
+# Only static quantization: the encoder is convolutional, and dynamic int8
+# quantization covers Linear layers only, which leaves it in float
+QUANT_MODES = ("static",)
+
+
+def model_size_bytes(model: nn.Module) -> int:
+    """Serialized state_dict size; counts packed int8 weights that parameters() misses."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def calibration_chip_ids(data_dir: Path, exclude: Iterable[str] = ()) -> List[str]:
+    """Sorted IDs of the chips in `data_dir`, leaving out `exclude` (e.g. the evaluation split)."""
+    chip_ids = {f.name.split("_S")[0] for f in Path(data_dir).glob("*_S[12]_*.tif")}
+    return sorted(chip_ids - set(exclude))
+
+
+def calibration_batches(
+    data_dir: Path,
+    chip_ids: Optional[List[str]] = None,
+    num_chips: int = 8
+) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+    """Yield ([1, T, C, H, W], [1, T]) batches read from the chips in `data_dir`."""
+    data_dir = Path(data_dir)
+    if chip_ids is None:
+        chip_ids = calibration_chip_ids(data_dir)
+    for chip_id in chip_ids[:num_chips]:
+        imgs, mask = read_imgs(chip_id, data_dir)
+        yield torch.from_numpy(imgs).unsqueeze(0).float(), torch.from_numpy(mask).unsqueeze(0)
+
+
+def quantize_linear_layers(model: nn.Module) -> nn.Module:
+    """int8 dynamic quantization of the Linear layers (attention pooling)."""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+@torch.no_grad()
+def quantize_static_model(
+    model: nn.Module,
+    batches: Iterable[Tuple[torch.Tensor, torch.Tensor]],
+    backend: str = "x86"
+) -> Tuple[nn.Module, int]:
+    """
+    Post-training static int8 quantization of the timm encoder.
+
+    The encoder runs once per timestep and dominates the cost, so it is traced
+    with FX, calibrated by running the whole model over `batches`, and converted.
+    The attention pooling Linear layers are then quantized dynamically; the
+    decoder stays in float. Returns the model and the number of calibration batches.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = backend
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("Static quantization needs at least one calibration batch")
+
+    images, masks = first
+    example = images.view(-1, *images.shape[2:]).contiguous(memory_format=torch.channels_last)
+    encoder = model.encoder.model
+    prepared = prepare_fx(encoder, get_default_qconfig_mapping(backend), example_inputs=(example,))
+
+    model.encoder.model = prepared
+    model(images, masks)
+    n = 1
+    for images, masks in batches:
+        model(images, masks)
+        n += 1
+    model.encoder.model = convert_fx(prepared)
+
+    return quantize_linear_layers(model), n
+
+
+def quantize_model(
+    model: nn.Module,
+    mode: str,
+    batches: Optional[Iterable[Tuple[torch.Tensor, torch.Tensor]]] = None
+) -> Tuple[nn.Module, int]:
+    """
+    Return an int8 copy of a float UnetVFLOW on CPU and the number of
+    calibration batches it saw; the original is left untouched.
+    """
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANT_MODES}")
+
+    if batches is None:
+        raise ValueError("Static quantization needs calibration batches")
+    return quantize_static_model(copy.deepcopy(model).cpu().eval(), batches)
@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+
+def measure_footprint(model: Any) -> int:
+    """Bytes held by a model's parameters and buffers (including packed int8 weights)."""
+    if isinstance(model, torch.nn.Module):
+        seen = set()
+        total = 0
+
+        def add(value):
+            nonlocal total
+            if isinstance(value, torch.Tensor):
+                if value.is_quantized:
+                    total += value.numel() * value.element_size()
+                    return
+                key = (value.data_ptr(), value.dtype, tuple(value.shape))
+                if key not in seen:
+                    seen.add(key)
+                    total += value.numel() * value.element_size()
+            elif isinstance(value, (tuple, list)):
+                for item in value:
+                    add(item)
+
+        for value in model.state_dict().values():
+            add(value)
+        return total
+
+    # Non-module engines (e.g. ONNX Runtime sessions) are sized by their artifact
+    path = getattr(model, "path", None)
+    if path is not None and Path(path).exists():
+        return Path(path).stat().st_size
+    return 0
+
+
+@dataclass
+class RegistryEntry:
+    model: Any
+    footprint: int
+    loaded_at: float
+    last_used: float
+    load_time: float
+    uses: int = 0
+    pins: int = 0
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps them within a memory budget.
+
+    `loader(name)` builds a model (or returns None on failure). It runs
+    outside the registry lock, once per name: concurrent requests for a model
+    that is loading wait for that load instead of starting their own. Room is
+    made before loading, by evicting least-recently-used models until the
+    expected footprint fits: the footprint measured at an earlier load, else
+    `estimate(name)` (e.g. the weight file size). Models pinned with `acquire`
+    are never evicted until released, so a batch cannot lose its model
+    between lookup and forward pass. A model larger than the budget still
+    loads. A budget of None or 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Optional[Any]],
+        budget_bytes: Optional[int] = None,
+        on_evict: Optional[Callable[[str], None]] = None,
+        estimate: Optional[Callable[[str], int]] = None
+    ):
+        self.loader = loader
+        self.budget_bytes = budget_bytes or None
+        self.on_evict = on_evict
+        self.estimate = estimate
+
+        self._entries: "OrderedDict[str, RegistryEntry]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._reserved: Dict[str, int] = {}
+        self._footprints: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the model, loading it if needed; None if it cannot be loaded."""
+        return self._get(name, pin=False)
+
+    def acquire(self, name: str) -> Optional[Any]:
+        """Like `get`, but pins the model until `release(name)`."""
+        return self._get(name, pin=True)
+
+    def release(self, name: str):
+        """Unpin a model returned by `acquire`; evicts if pins held the registry over budget."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.pins == 0:
+                return
+            entry.pins -= 1
+            evicted = self._select_evictions(0) if entry.pins == 0 else []
+        self._dropped(evicted)
+
+    def _get(self, name: str, pin: bool) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self.hits += 1
+                self._touch(name, entry)
+                if pin:
+                    entry.pins += 1
+                return entry.model
+
+            loading = self._loading.get(name)
+            if loading is None:
+                self.misses += 1
+                loading = self._loading[name] = Future()
+                expected = self._footprints.get(name)
+                if expected is None and self.estimate is not None:
+                    expected = self.estimate(name)
+                self._reserved[name] = expected or 0
+                evicted = self._select_evictions(0)
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            if loading.result() is None:
+                return None
+            # Normally a hit now; loads again if it was evicted meanwhile
+            return self._get(name, pin)
+
+        self._dropped(evicted)
+        start_time = time.time()
+        model = None
+        try:
+            model = self.loader(name)
+        finally:
+            with self._lock:
+                del self._loading[name]
+                del self._reserved[name]
+                evicted = []
+                if model is None:
+                    self.load_failures += 1
+                else:
+                    now = time.time()
+                    entry = RegistryEntry(
+                        model=model,
+                        footprint=measure_footprint(model),
+                        loaded_at=now,
+                        last_used=now,
+                        load_time=now - start_time,
+                        pins=int(pin)
+                    )
+                    self._footprints[name] = entry.footprint
+                    self._entries[name] = entry
+                    self._touch(name, entry)
+                    evicted = self._select_evictions(0, keep=name)
+            loading.set_result(model)
+        self._dropped(evicted)
+        return model
+
+    def __getitem__(self, name: str) -> Any:
+        model = self.get(name)
+        if model is None:
+            raise KeyError(name)
+        return model
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def keys(self) -> List[str]:
+        """Names of the currently resident models, least recently used first."""
+        return list(self._entries.keys())
+
+    def resident(self) -> Dict[str, Any]:
+        """Snapshot of the loaded models without counting as a use."""
+        with self._lock:
+            return {name: entry.model for name, entry in self._entries.items()}
+
+    def _touch(self, name: str, entry: RegistryEntry):
+        entry.last_used = time.time()
+        entry.uses += 1
+        self._entries.move_to_end(name)
+
+    def evict(self, name: str) -> bool:
+        """Drop a model unless it is pinned; memory is released once in-flight batches finish with it."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.pins:
+                return False
+            del self._entries[name]
+            self.evictions += 1
+        self._dropped([name])
+        return True
+
+    def _select_evictions(self, incoming: int, keep: Optional[str] = None) -> List[str]:
+        """
+        Remove least-recently-used unpinned entries until the resident and
+        loading models fit the budget; returns their names. Called under the
+        lock; the caller reports them through `_dropped` after releasing it.
+        """
+        if self.budget_bytes is None:
+            return []
+        evicted = []
+        for name in list(self._entries.keys()):
+            if self.total_bytes() + sum(self._reserved.values()) + incoming <= self.budget_bytes:
+                break
+            entry = self._entries[name]
+            if name != keep and not entry.pins:
+                del self._entries[name]
+                self.evictions += 1
+                evicted.append(name)
+        return evicted
+
+    def _dropped(self, names: List[str]):
+        for name in names:
+            if self.on_evict is not None:
+                self.on_evict(name)
+            print(f"Evicted model: {name}")
+
+    def total_bytes(self) -> int:
+        return sum(entry.footprint for entry in self._entries.values())
+
+    def entry_info(self, name: str) -> Optional[Dict]:
+        """Resident footprint and usage of one model, or None if not loaded."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        return {
+            "footprint_bytes": entry.footprint,
+            "load_time": entry.load_time,
+            "loaded_at": entry.loaded_at,
+            "last_used": entry.last_used,
+            "uses": entry.uses,
+            "pins": entry.pins
+        }
+
+    def get_stats(self) -> Dict:
+        """Budget, residency and hit/miss/eviction counters."""
+        return {
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": self.total_bytes(),
+            "resident_models": self.keys(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loading_models": sorted(self._loading),
+            "load_failures": self.load_failures,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,91 @@
+import hashlib
+import io
+import threading
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+_luts: Dict[str, np.ndarray] = {}
+_luts_lock = threading.Lock()
+
+
+def get_lut(colormap: str) -> np.ndarray:
+    """
+    [256, 3] uint8 colour table of a matplotlib colormap, built once per
+    process. Entry i is what `cmap(x)` gives for x in [i/256, (i+1)/256),
+    so rendering through it matches matplotlib exactly.
+    """
+    lut = _luts.get(colormap)
+    if lut is None:
+        with _luts_lock:
+            lut = _luts.get(colormap)
+            if lut is None:
+                import matplotlib
+
+                cmap = matplotlib.colormaps[colormap].resampled(256)
+                lut = (cmap(np.arange(256))[:, :3] * 255).astype(np.uint8)
+                lut.setflags(write=False)
+                _luts[colormap] = lut
+    return lut
+
+
+def content_etag(data: bytes) -> str:
+    """Strong HTTP entity tag derived from the encoded image bytes."""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def colormap_indices(array: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+    """[H, W] uint8 colour table indices; indices of NaN pixels are undefined."""
+    scaled = (array - vmin) / (vmax - vmin)
+    np.clip(scaled, 0, 1, out=scaled)
+    scaled *= 256
+    np.minimum(scaled, 255, out=scaled)
+    with np.errstate(invalid="ignore"):
+        return scaled.astype(np.uint8)
+
+
+def encode_image(img: Image.Image, fmt: str = "png", compress_level: int = 1) -> bytes:
+    """
+    Encode as lossless PNG or WebP. PNG `compress_level` is the zlib level
+    (1 is fastest, and on palette heatmaps barely larger than 9); for WebP it
+    is scaled to the encoder's 0-6 effort range.
+    """
+    buffer = io.BytesIO()
+    if fmt == "png":
+        img.save(buffer, format="PNG", compress_level=compress_level)
+    elif fmt == "webp":
+        img.save(buffer, format="WEBP", lossless=True, method=min(6, compress_level * 6 // 9))
+    else:
+        raise ValueError(f"Unsupported heatmap format: {fmt}")
+    return buffer.getvalue()
+
+
+def render_heatmap(
+    array: np.ndarray,
+    vmin: float = 0,
+    vmax: float = 400,
+    colormap: str = "viridis",
+    fmt: str = "png",
+    compress_level: int = 1
+) -> bytes:
+    """
+    Colour a [H, W] map through the colormap's lookup table and encode it.
+
+    Values are scaled to table indices in one pass and written as a
+    palette image, so the encoder sees one byte per pixel instead of three.
+    NaN pixels render black, as matplotlib's default "bad" colour does.
+    """
+    lut = get_lut(colormap)
+    indices = colormap_indices(array, vmin, vmax)
+    bad = np.isnan(array) if np.issubdtype(np.asarray(array).dtype, np.floating) else None
+    if bad is not None and bad.any():
+        rgb = lut[indices]
+        rgb[bad] = 0
+        img = Image.fromarray(rgb)
+    else:
+        img = Image.fromarray(indices)
+        img.putpalette(lut.tobytes())  # "L" becomes "P"
+    return encode_image(img, fmt, compress_level)
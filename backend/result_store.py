@@ -0,0 +1,300 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rendering import content_etag
+
+META_FILE = "meta.json"
+
+
+class ResultStore:
+    """
+    Prediction results on disk under one directory per result.
+
+    Each result directory holds `meta.json` (chip, timestamp, per-model stats,
+    metrics and file names), the prediction (and uncertainty) maps as `.npy`
+    buffers in `dtype`, and the rendered heatmap PNGs with their content
+    hashes as ETags. Only a small summary
+    per result is kept in memory, so memory stays flat as results accumulate;
+    maps are read back memory-mapped. Results are written to a temporary
+    directory and renamed into place, and the index is rebuilt from disk at
+    startup, so they survive restarts.
+
+    Retention is bounded by age (`max_age_s`), result count (`max_results`)
+    and total bytes (`max_bytes`), each disabled when 0. `save` never evicts;
+    `evict` drops expired results and then the oldest ones until the store is
+    within its limits, and is meant to run off the request path.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        dtype: str = "float32",
+        max_age_s: float = 0,
+        max_results: int = 0,
+        max_bytes: int = 0
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported result dtype: {dtype}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.max_age_s = max(0.0, float(max_age_s))
+        self.max_results = max(0, int(max_results))
+        self.max_bytes = max(0, int(max_bytes))
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._bytes = 0
+
+        # Statistics
+        self.evicted_age = 0
+        self.evicted_count = 0
+        self.evicted_bytes = 0
+        self.orphans_removed = 0
+        self.sweeps = 0
+        self.last_sweep: Optional[float] = None
+
+        self._load_index()
+
+    def _load_index(self):
+        for path in self.root.iterdir():
+            if path.name.startswith("."):
+                # Leftover of a write interrupted by a crash
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            meta_path = path / META_FILE
+            if not meta_path.is_file():
+                continue
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable result {path.name}: {e}")
+                continue
+            summary = self._summary(meta, path)
+            self._index[meta["id"]] = summary
+            self._bytes += summary["bytes"]
+        if self._index:
+            print(f"Loaded {len(self._index)} stored results from {self.root}")
+
+    @staticmethod
+    def _summary(meta: Dict, path: Path) -> Dict:
+        return {
+            "id": meta["id"],
+            "chip_id": meta["chip_id"],
+            "timestamp": meta["timestamp"],
+            "models": list(meta["models"].keys()),
+            "ground_truth_available": meta["ground_truth_available"],
+            "bytes": sum(f.stat().st_size for f in path.iterdir()),
+            "created": meta.get("created", path.stat().st_mtime)
+        }
+
+    def _dir(self, result_id: str) -> Path:
+        return self.root / result_id
+
+    def save(
+        self,
+        result_id: str,
+        chip_id: str,
+        timestamp: str,
+        ground_truth_available: bool,
+        models: Dict[str, Dict],
+        maps: Dict[str, Dict[str, np.ndarray]],
+        heatmaps: Dict[str, Dict[str, bytes]]
+    ) -> Dict:
+        """
+        Write a result. `models` holds each model's JSON-serialisable fields,
+        `maps[model][kind]` its arrays and `heatmaps[model][kind]` its PNGs,
+        where kind is e.g. "prediction" or "uncertainty".
+        """
+        tmp_dir = self.root / f".{result_id}.tmp"
+        tmp_dir.mkdir(parents=True)
+        meta_models = {}
+        for i, (model_name, fields) in enumerate(models.items()):
+            files, etags = {}, {}
+            for kind, array in maps.get(model_name, {}).items():
+                files[f"{kind}_map"] = f"{i}_{kind}.npy"
+                np.save(tmp_dir / files[f"{kind}_map"], np.ascontiguousarray(array, dtype=self.dtype))
+            for kind, png in heatmaps.get(model_name, {}).items():
+                files[f"{kind}_heatmap"] = f"{i}_{kind}.png"
+                (tmp_dir / files[f"{kind}_heatmap"]).write_bytes(png)
+                etags[f"{kind}_heatmap"] = content_etag(png)
+            meta_models[model_name] = {**fields, "files": files, "etags": etags}
+
+        meta = {
+            "id": result_id,
+            "chip_id": chip_id,
+            "timestamp": timestamp,
+            "ground_truth_available": ground_truth_available,
+            "dtype": self.dtype.name,
+            "created": time.time(),
+            "models": meta_models
+        }
+        with open(tmp_dir / META_FILE, "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, self._dir(result_id))
+
+        summary = self._summary(meta, self._dir(result_id))
+        with self._lock:
+            self._index[result_id] = summary
+            self._bytes += summary["bytes"]
+        return summary
+
+    def __contains__(self, result_id: str) -> bool:
+        return result_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def list(self) -> List[Dict]:
+        """Summaries of all results, newest first."""
+        with self._lock:
+            summaries = list(self._index.values())
+        return sorted(summaries, key=lambda x: x["timestamp"], reverse=True)
+
+    def get(self, result_id: str) -> Optional[Dict]:
+        """A result's metadata, or None if it is not stored."""
+        if result_id not in self._index:
+            return None
+        try:
+            with open(self._dir(result_id) / META_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load_map(self, result_id: str, model_name: str, kind: str = "prediction") -> Optional[np.ndarray]:
+        """Memory-mapped [H, W] map of one model, or None if the result or map does not exist."""
+        meta = self.get(result_id)
+        if meta is None or model_name not in meta["models"]:
+            return None
+        name = meta["models"][model_name]["files"].get(f"{kind}_map")
+        return np.load(self._dir(result_id) / name, mmap_mode="r") if name else None
+
+    def load_heatmap(self, result_id: str, model_name: str, kind: str = "prediction") -> Optional[bytes]:
+        """Rendered heatmap PNG of one model, or None if it does not exist."""
+        found = self.heatmap_file(result_id, model_name, kind)
+        return found[0].read_bytes() if found is not None else None
+
+    def heatmap_file(self, result_id: str, model_name: str, kind: str = "prediction") -> Optional[Tuple[Path, str]]:
+        """Path and ETag of one model's heatmap PNG, or None if it does not exist."""
+        meta = self.get(result_id)
+        if meta is None or model_name not in meta["models"]:
+            return None
+        model = meta["models"][model_name]
+        name = model["files"].get(f"{kind}_heatmap")
+        if name is None:
+            return None
+        path = self._dir(result_id) / name
+        etag = model.get("etags", {}).get(f"{kind}_heatmap")
+        if etag is None:
+            # Stored before ETags were recorded
+            etag = content_etag(path.read_bytes())
+        return path, etag
+
+    def delete(self, result_id: str) -> bool:
+        with self._lock:
+            summary = self._index.pop(result_id, None)
+            if summary is None:
+                return False
+            self._bytes -= summary["bytes"]
+        shutil.rmtree(self._dir(result_id), ignore_errors=True)
+        return True
+
+    def over_limits(self, now: Optional[float] = None) -> bool:
+        """Whether `evict` would remove anything; cheap enough to call after every save."""
+        if self.max_results and len(self._index) > self.max_results:
+            return True
+        if self.max_bytes and self._bytes > self.max_bytes:
+            return True
+        if self.max_age_s:
+            now = time.time() if now is None else now
+            with self._lock:
+                oldest = min((s["created"] for s in self._index.values()), default=now)
+            return oldest < now - self.max_age_s
+        return False
+
+    def evict(self, now: Optional[float] = None) -> Dict:
+        """
+        Apply the retention limits, oldest results first, and remove leftover
+        directories the index does not know; returns what was removed.
+        Directories are deleted outside the lock.
+        """
+        now = time.time() if now is None else now
+        removed = {"age": 0, "count": 0, "bytes": 0}
+        victims = []
+        with self._lock:
+            oldest_first = sorted(self._index.values(), key=lambda s: s["created"])
+            for summary in oldest_first:
+                reason = None
+                if self.max_age_s and summary["created"] < now - self.max_age_s:
+                    reason = "age"
+                elif self.max_results and len(self._index) > self.max_results:
+                    reason = "count"
+                elif self.max_bytes and self._bytes > self.max_bytes:
+                    reason = "bytes"
+                if reason is None:
+                    continue
+                del self._index[summary["id"]]
+                self._bytes -= summary["bytes"]
+                removed[reason] += 1
+                victims.append(summary["id"])
+            self.evicted_age += removed["age"]
+            self.evicted_count += removed["count"]
+            self.evicted_bytes += removed["bytes"]
+
+        for result_id in victims:
+            shutil.rmtree(self._dir(result_id), ignore_errors=True)
+        orphans = self._remove_orphans(now)
+
+        self.sweeps += 1
+        self.last_sweep = now
+        if victims or orphans:
+            print(f"Result store: evicted {len(victims)} results ({removed}), "
+                  f"removed {orphans} orphaned directories")
+        return {**removed, "orphans": orphans}
+
+    def _remove_orphans(self, now: float, grace_s: float = 3600) -> int:
+        """Delete result directories not in the index, e.g. from a crashed write."""
+        removed = 0
+        for path in self.root.iterdir():
+            if not path.is_dir() or (path.name in self._index and not path.name.startswith(".")):
+                continue
+            try:
+                # Skip directories a concurrent save may still be writing or renaming
+                if path.stat().st_mtime > now - grace_s:
+                    continue
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        self.orphans_removed += removed
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Size, result count, retention limits and eviction counters."""
+        with self._lock:
+            oldest = min((s["created"] for s in self._index.values()), default=None)
+            return {
+                "path": str(self.root),
+                "dtype": self.dtype.name,
+                "results": len(self._index),
+                "bytes": self._bytes,
+                "oldest_age_s": time.time() - oldest if oldest is not None else None,
+                "max_age_s": self.max_age_s,
+                "max_results": self.max_results,
+                "max_bytes": self.max_bytes,
+                "evicted_age": self.evicted_age,
+                "evicted_count": self.evicted_count,
+                "evicted_bytes": self.evicted_bytes,
+                "orphans_removed": self.orphans_removed,
+                "sweeps": self.sweeps,
+                "last_sweep": self.last_sweep
+            }
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from executor import BoundedExecutor, ExecutorSaturated
+from inference import BiomassPredictor, PredictionJob
+
+
+@dataclass
+class _PendingJob:
+    job: PredictionJob
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatchScheduler:
+    """
+    Collects prediction jobs for a short window and runs them as one batch.
+
+    The first job of a batch opens a window of `max_wait_ms`; the batch is
+    dispatched when the window closes or `max_batch_size` jobs are waiting.
+    Each caller gets back exactly the result dict `predictor.predict` returns.
+    Batches run on `executor` when given, else on the loop's default executor;
+    up to `max_concurrent_batches` may be in flight at once. At most
+    `max_queue_size` jobs wait for a batch; `submit` raises ExecutorSaturated
+    beyond that, so overload is rejected rather than queued indefinitely.
+    """
+
+    def __init__(
+        self,
+        predictor: BiomassPredictor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        executor: Optional[BoundedExecutor] = None,
+        max_concurrent_batches: int = 1,
+        max_queue_size: int = 64
+    ):
+        self.predictor = predictor
+        self.executor = executor
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.max_queue_size = max(self.max_batch_size, int(max_queue_size))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = set()
+
+        # Statistics
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_errors = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.batch_sizes: Counter = Counter()
+        self.total_wait_time = 0.0
+        self.total_batch_time = 0.0
+        self.last_batch_size = 0
+        self.last_batch_time = 0.0
+
+    async def start(self):
+        """Start the background batching loop on the running event loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop and fail any jobs still waiting."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        for task in list(self._inflight):
+            task.cancel()
+
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Scheduler stopped"))
+
+    async def submit(self, job: PredictionJob) -> Dict:
+        """Queue a job and wait for its slice of the batched result."""
+        if self._worker is None:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_PendingJob(job=job, future=future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ExecutorSaturated(f"scheduler queue is full ({self.max_queue_size} jobs waiting)")
+        self.total_requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> List[_PendingJob]:
+        """Wait for one job, then gather more until the window or size limit is hit."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Drain anything that is already waiting without extending the window
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _run(self):
+        while True:
+            # Only collect the next batch once a slot is free, so jobs keep
+            # accumulating (and batching) while all slots are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._execute(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, batch: List[_PendingJob]):
+        dispatched_at = time.perf_counter()
+        jobs = [p.job for p in batch]
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(self.predictor.predict_batch, jobs)
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(None, self.predictor.predict_batch, jobs)
+        except BaseException as e:
+            self.total_errors += 1
+            error = e if isinstance(e, Exception) else RuntimeError("Batch cancelled")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(error)
+            if not isinstance(e, Exception):
+                raise
+            return
+        finally:
+            self._slots.release()
+
+        batch_time = time.perf_counter() - dispatched_at
+        self.total_batches += 1
+        self.batch_sizes[len(batch)] += 1
+        self.total_batch_time += batch_time
+        self.last_batch_size = len(batch)
+        self.last_batch_time = batch_time
+
+        for pending, result in zip(batch, results):
+            self.total_wait_time += dispatched_at - pending.enqueued_at
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def get_stats(self) -> Dict:
+        """Queue depth and batch-size statistics."""
+        batched_requests = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "running": self._worker is not None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "max_queue_size": self.max_queue_size,
+            "inflight_batches": len(self._inflight),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "total_errors": self.total_errors,
+            "rejected": self.rejected,
+            "mean_batch_size": batched_requests / self.total_batches if self.total_batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "mean_wait_ms": 1000.0 * self.total_wait_time / batched_requests if batched_requests else 0.0,
+            "mean_batch_time_ms": 1000.0 * self.total_batch_time / self.total_batches if self.total_batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_time_ms": 1000.0 * self.last_batch_time
+        }
@@ -0,0 +1,21 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported flat (`from dataset import ...`), as uvicorn runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def tiny_args():
+    """Checkpoint args of a small UnetVFLOW that builds offline and runs in milliseconds."""
+    return argparse.Namespace(
+        backbone="mobilenetv3_small_050",
+        in_channels=15,
+        out_indices=(0, 1, 2, 3, 4),
+        dec_channels=[32, 16, 8, 8, 8],
+        dec_attn_type=None,
+        n_classes=1
+    )
@@ -0,0 +1,53 @@
+import argparse
+import enum
+import json
+from pathlib import Path
+
+import pytest
+import torch
+
+from checkpoints import checkpoint_digest, convert_checkpoint, load_checkpoint, resolve_checkpoint
+
+
+class Mode(enum.Enum):
+    FAST = "fast"
+
+
+def save_pickle_checkpoint(path: Path, **args) -> dict:
+    shared = torch.randn(4, 3)
+    state_dict = {
+        "encoder.weight": shared,
+        "decoder.weight": shared,  # tied weights share storage
+        "decoder.bias": torch.arange(3, dtype=torch.float16),
+        "steps": torch.tensor(7, dtype=torch.int64),
+    }
+    torch.save({"state_dict": state_dict, "args": argparse.Namespace(**args), "optimizer": {}}, path)
+    return state_dict
+
+
+def test_converted_checkpoint_round_trips(tmp_path):
+    path = tmp_path / "model_best.pth"
+    state_dict = save_pickle_checkpoint(path, backbone="efficientnet_b0", lr=1e-3, data_dir=Path("/data"), size=(256, 256))
+    digest = checkpoint_digest(path)
+
+    assert resolve_checkpoint(path) == path
+    weights_path, config_path = convert_checkpoint(path)
+    assert resolve_checkpoint(path) == weights_path
+    assert checkpoint_digest(path) == digest
+
+    loaded = load_checkpoint(path)
+    assert vars(loaded["args"]) == {"backbone": "efficientnet_b0", "lr": 1e-3, "data_dir": "/data", "size": [256, 256]}
+    assert loaded["state_dict"].keys() == state_dict.keys()
+    for name, tensor in state_dict.items():
+        assert loaded["state_dict"][name].dtype == tensor.dtype
+        torch.testing.assert_close(loaded["state_dict"][name], tensor)
+    assert json.loads(config_path.read_text())["source"] == "model_best.pth"
+
+
+def test_conversion_rejects_args_json_cannot_carry(tmp_path):
+    path = tmp_path / "model_best.pth"
+    save_pickle_checkpoint(path, backbone="efficientnet_b0", mode=Mode.FAST)
+
+    with pytest.raises(TypeError, match="'mode'.*Mode"):
+        convert_checkpoint(path, tmp_path / "out")
+    assert not (tmp_path / "out" / "model_best.safetensors").exists()
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import app as app_module
+from chip_cache import ChipCache, chip_files_signature
+
+
+def touch_chip(data_dir, chip_id, content=b"tiff"):
+    for sensor in ("S1", "S2"):
+        (data_dir / f"{chip_id}_{sensor}_00.tif").write_bytes(content)
+
+
+def stack(value, nbytes=1024):
+    return np.full(nbytes // 4, value, dtype=np.float32), np.zeros(12, dtype=bool)
+
+
+def test_rewritten_files_are_read_again(tmp_path):
+    cache = ChipCache(1 << 20)
+    touch_chip(tmp_path, "a")
+    cache.put("a", tmp_path, *stack(1.0))
+    assert cache.get("a", tmp_path)[0][0] == 1.0
+
+    # Same size, new mtime
+    path = tmp_path / "a_S2_00.tif"
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get("a", tmp_path) is None
+
+    cache.put("a", tmp_path, *stack(2.0))
+    touch_chip(tmp_path, "a", b"longer tiff")
+    assert cache.get("a", tmp_path) is None
+
+    # A month appearing changes the signature too
+    cache.put("a", tmp_path, *stack(3.0))
+    (tmp_path / "a_S1_04.tif").write_bytes(b"tiff")
+    assert cache.get("a", tmp_path) is None
+    assert cache.get_stats()["stale"] == 3
+
+
+def test_least_recently_used_chip_is_evicted(tmp_path):
+    cache = ChipCache(3 * 1024 + 3 * 12)
+    for chip_id in "abc":
+        touch_chip(tmp_path, chip_id)
+        cache.put(chip_id, tmp_path, *stack(0.0))
+    cache.get("a", tmp_path)
+    touch_chip(tmp_path, "d")
+    cache.put("d", tmp_path, *stack(0.0))
+
+    assert cache.get("b", tmp_path) is None
+    assert all(cache.get(chip_id, tmp_path) is not None for chip_id in "acd")
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1
+    assert stats["cached_bytes"] <= stats["budget_bytes"]
+
+
+def test_float16_storage_and_invalidation(tmp_path):
+    cache = ChipCache(1 << 20, dtype="float16")
+    touch_chip(tmp_path, "a")
+    touch_chip(tmp_path, "b")
+    cache.put("a", tmp_path, *stack(0.5))
+    cache.put("b", tmp_path, np.arange(4, dtype=np.int16), np.zeros(12, dtype=bool))
+
+    assert cache.get("a", tmp_path)[0].dtype == np.float16
+    assert cache.get("b", tmp_path)[0].dtype == np.int16  # raw stacks are kept as is
+    assert cache.invalidate("a") == 1
+    assert cache.get("a", tmp_path) is None
+    assert cache.invalidate() == 1
+    assert cache.get_stats()["entries"] == 0
+
+    with pytest.raises(ValueError):
+        ChipCache(1, dtype="int8")
+
+
+def test_signature_lists_present_files_only(tmp_path):
+    touch_chip(tmp_path, "a")
+    assert [name for name, _, _ in chip_files_signature("a", tmp_path)] == ["a_S1_00.tif", "a_S2_00.tif"]
+    assert chip_files_signature("missing", tmp_path) == ()
+
+
+def test_chip_requests_do_cache_work_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    def record(fn):
+        def wrapper(*args, **kwargs):
+            threads.append((fn.__name__, threading.current_thread()))
+            return fn(*args, **kwargs)
+        return wrapper
+
+    class Predictor:
+        pin_inputs = False
+
+        def to_tensors(self, imgs, mask):
+            threads.append(("to_tensors", threading.current_thread()))
+            return imgs, mask
+
+    async def predict_with_cache(input_key, chip_id, model_names, ntta, ground_truth, make_inputs):
+        return await make_inputs()
+
+    cache = ChipCache(1 << 20)
+    cache.get, cache.put = record(cache.get), record(cache.put)
+    touch_chip(tmp_path, "a")
+    monkeypatch.setattr(app_module, "chip_cache", cache)
+    monkeypatch.setattr(app_module, "predictor", Predictor())
+    monkeypatch.setattr(app_module, "predict_with_cache", predict_with_cache)
+    monkeypatch.setattr(app_module, "chip_files_signature", record(chip_files_signature))
+    monkeypatch.setattr(app_module, "read_imgs", lambda *args, **kwargs: stack(1.0))
+
+    async def scenario():
+        miss = await app_module.run_chip_prediction("a", tmp_path, None, 1, include_ground_truth=False)
+        hit = await app_module.run_chip_prediction("a", tmp_path, None, 1, include_ground_truth=False)
+        return miss, hit, threading.current_thread()
+
+    miss, hit, loop_thread = asyncio.run(scenario())
+    np.testing.assert_array_equal(hit[0], miss[0])
+    assert sorted({name for name, _ in threads}) == ["chip_files_signature", "get", "put", "to_tensors"]
+    assert all(thread is not loop_thread for _, thread in threads)
+    assert cache.get_stats()["hits"] == 1
@@ -0,0 +1,112 @@
+import os
+
+from chip_catalog import ChipCatalog
+
+
+def touch_chip(features_dir, chip_id, months=range(12), sensors=("S1", "S2")):
+    for month in months:
+        for sensor in sensors:
+            (features_dir / f"{chip_id}_{sensor}_{month:0>2}.tif").write_bytes(b"\0" * 8)
+
+
+def make_catalog(tmp_path):
+    features_dir = tmp_path / "features"
+    gt_dir = tmp_path / "agbm"
+    features_dir.mkdir()
+    gt_dir.mkdir()
+    touch_chip(features_dir, "aa01")
+    touch_chip(features_dir, "aa02", months=range(3), sensors=("S2",))
+    touch_chip(features_dir, "bb01", months=range(6))
+    (gt_dir / "aa01_agbm.tif").write_bytes(b"\0" * 4)
+    return ChipCatalog(features_dir, gt_dir)
+
+
+def test_list_filters_and_pages(tmp_path):
+    catalog = make_catalog(tmp_path)
+
+    entries, total = catalog.list()
+    assert [e.chip_id for e in entries] == ["aa01", "aa02", "bb01"]
+    assert total == 3
+
+    assert [e.chip_id for e in catalog.list(prefix="aa")[0]] == ["aa01", "aa02"]
+    assert [e.chip_id for e in catalog.list(has_ground_truth=True)[0]] == ["aa01"]
+    assert [e.chip_id for e in catalog.list(min_months=6)[0]] == ["aa01", "bb01"]
+    assert [e.chip_id for e in catalog.list(complete=True)[0]] == ["aa01"]
+    assert [e.chip_id for e in catalog.list(offset=1, limit=1)[0]] == ["aa02"]
+
+    entry = catalog.get("aa02")
+    assert entry.s1_months == 0 and entry.s2_months == 0b111
+    assert entry.feature_bytes == 24
+
+
+def test_lookup_finds_new_chip_without_rescan(tmp_path):
+    catalog = make_catalog(tmp_path)
+    scans = catalog.scans
+
+    assert catalog.lookup("cc01") is None
+    touch_chip(tmp_path / "features", "cc01", months=[4])
+    assert catalog.lookup("cc01").s1_months == 1 << 4
+    assert catalog.scans == scans
+    assert [e.chip_id for e in catalog.list()[0]] == ["aa01", "aa02", "bb01", "cc01"]
+
+    assert catalog.lookup("../aa01") is None
+
+
+def test_refresh_chip_swaps_published_lists(tmp_path):
+    catalog = make_catalog(tmp_path)
+    ids, entries = catalog._matching(None, 0, False)
+    filtered, _ = catalog._matching(True, 0, False)
+
+    for path in (tmp_path / "features").glob("aa02_*"):
+        path.unlink()
+    touch_chip(tmp_path / "features", "ab01", months=[0])
+    assert catalog.refresh_chip("aa02") is None
+    assert catalog.refresh_chip("ab01") is not None
+
+    # Lists already handed to readers are never mutated
+    assert ids == ["aa01", "aa02", "bb01"]
+    assert "aa02" in entries and "ab01" not in entries
+    assert filtered == ["aa01"]
+    assert [e.chip_id for e in catalog.list()[0]] == ["aa01", "ab01", "bb01"]
+
+
+def test_refresh_rescans_only_on_directory_change(tmp_path):
+    catalog = make_catalog(tmp_path)
+    assert catalog.refresh()["scanned"] is False
+
+    touch_chip(tmp_path / "features", "dd01", months=[0])
+    changes = catalog.refresh(force=True)
+    assert changes["scanned"] and changes["added"] == 1
+
+
+def test_refresh_rebuilds_only_chips_whose_files_changed(tmp_path, monkeypatch):
+    catalog = make_catalog(tmp_path)
+    features_dir = tmp_path / "features"
+    touch_chip(features_dir, "dd01", months=[0])
+    for path in features_dir.glob("aa02_*"):
+        path.unlink()
+
+    stat_calls = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path, *a, **kw: stat_calls.append(str(path)) or real_stat(path, *a, **kw))
+    changes = catalog.refresh()
+    assert changes == {"scanned": True, "checked": 2, "added": 1, "removed": 1, "updated": 0}
+    # Two directory mtimes, dd01's two files and its ground truth; aa01 and bb01 are not touched
+    assert not any("aa01" in path or "bb01" in path for path in stat_calls)
+    assert [e.chip_id for e in catalog.list()[0]] == ["aa01", "bb01", "dd01"]
+
+    (tmp_path / "agbm" / "bb01_agbm.tif").write_bytes(b"\0" * 4)
+    assert catalog.refresh() == {"scanned": True, "checked": 1, "added": 0, "removed": 0, "updated": 1}
+    assert catalog.get("bb01").has_ground_truth
+
+
+def test_lookup_picks_up_files_rewritten_in_place(tmp_path):
+    catalog = make_catalog(tmp_path)
+    entry = catalog.lookup("aa02")
+    assert catalog.lookup("aa02") is entry
+
+    path = tmp_path / "features" / "aa02_S2_01.tif"
+    path.write_bytes(b"\0" * 20)
+    assert catalog.refresh()["scanned"] is False  # a rewrite leaves the directory mtime alone
+    assert catalog.lookup("aa02").feature_bytes == 36
+    assert catalog.get("aa02").feature_bytes == 36
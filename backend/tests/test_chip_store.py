@@ -0,0 +1,105 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+import tifffile
+
+import chip_store
+import dataset
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_root_module(name):
+    """The training-side copy of a module; it shares its name with the backend one."""
+    spec = importlib.util.spec_from_file_location(f"root_{name}", ROOT / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_tiff(path, array):
+    tifffile.imwrite(path, array, photometric="minisblack", planarconfig="contig")
+
+
+def write_chip(features_dir, chip_id, seed, s1_months=range(12), s2_months=range(12)):
+    rng = np.random.default_rng(seed)
+    for month in s1_months:
+        s1 = rng.uniform(-30, 20, (256, 256, 4)).astype(np.float32)
+        s1[:4, :4] = -9999
+        write_tiff(features_dir / f"{chip_id}_S1_{month:0>2}.tif", s1)
+    for month in s2_months:
+        s2 = rng.integers(0, 16000, (256, 256, 11), dtype=np.uint16)
+        write_tiff(features_dir / f"{chip_id}_S2_{month:0>2}.tif", s2)
+
+
+@pytest.fixture
+def chips(tmp_path):
+    features_dir = tmp_path / "features"
+    features_dir.mkdir()
+    write_chip(features_dir, "full", 0, s2_months=range(0, 12, 2))
+    write_chip(features_dir, "gap", 1, s1_months=[m for m in range(12) if m != 3])
+    return features_dir, tmp_path / "store"
+
+
+def test_store_matches_tiffs(chips):
+    features_dir, store_dir = chips
+    store = chip_store.ingest(features_dir, store_dir)
+
+    for chip_id in ("full", "gap"):
+        for raw in (False, True):
+            from_tiffs = dataset.read_imgs(chip_id, features_dir, raw=raw)
+            from_store = dataset.read_imgs(chip_id, features_dir, store=store, raw=raw)
+            np.testing.assert_array_equal(from_store[0], from_tiffs[0])
+            np.testing.assert_array_equal(from_store[1], from_tiffs[1])
+
+
+def test_root_store_matches_tiffs_and_rejects_missing_s1(chips):
+    root_dataset = load_root_module("dataset")
+    root_chip_store = load_root_module("chip_store")
+    features_dir, store_dir = chips
+    store = root_chip_store.ingest(features_dir, store_dir)
+
+    imgs, mask = root_dataset.read_imgs("full", features_dir, store=store)
+    expected_imgs, expected_mask = root_dataset.read_imgs("full", features_dir)
+    np.testing.assert_array_equal(imgs, expected_imgs)
+    np.testing.assert_array_equal(mask, expected_mask)
+
+    # The TIFF path cannot read a chip with a missing S1 month, nor can the store
+    with pytest.raises(FileNotFoundError):
+        root_dataset.read_imgs("gap", features_dir)
+    with pytest.raises(FileNotFoundError, match=r"months \[3\]"):
+        root_dataset.read_imgs("gap", features_dir, store=store)
+
+
+def test_rebuilt_store_changes_the_prediction_input_key(chips, monkeypatch):
+    import app as app_module
+
+    features_dir, store_dir = chips
+    monkeypatch.setattr(app_module, "chip_store", chip_store.ingest(features_dir, store_dir))
+    key = app_module.chip_input_key("full", features_dir, ())
+    assert app_module.chip_input_key("full", features_dir, ()) == key
+    assert app_module.chip_input_key("gap", features_dir, ()) != key
+
+    # Same chips and shapes, new pixels: cached predictions must not be served
+    write_chip(features_dir, "full", 2, s2_months=range(0, 12, 2))
+    monkeypatch.setattr(app_module, "chip_store", chip_store.ingest(features_dir, store_dir))
+    assert app_module.chip_input_key("full", features_dir, ()) != key
+
+
+def test_root_and_backend_readers_mask_months_alike(chips):
+    root_dataset = load_root_module("dataset")
+    features_dir, store_dir = chips
+    store = chip_store.ingest(features_dir, store_dir)
+
+    # "full" has S2 only in even months; S1 keeps every month unmasked in both readers
+    for from_store in (None, store):
+        np.testing.assert_array_equal(
+            root_dataset.read_imgs("full", features_dir, store=from_store)[1],
+            dataset.read_imgs("full", features_dir, store=from_store)[1]
+        )
+    for missing in ([False] * 12, [True, False] * 6, [True] * 12):
+        np.testing.assert_array_equal(root_dataset._valid_mask(missing), dataset._valid_mask(missing))
+    assert root_dataset._valid_mask([True, False] * 6).sum() == 6
+    assert not root_dataset._valid_mask([True] * 12).any()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+import tifffile
+import torch
+
+import dataset
+
+
+def write_tiff(path, array):
+    tifffile.imwrite(path, array, photometric="minisblack", planarconfig="contig")
+
+
+@pytest.fixture
+def chip_dir(tmp_path):
+    """Chip "c" with S1 missing in March, S2 missing in even months and nothing in December."""
+    rng = np.random.default_rng(0)
+    for month in range(11):
+        if month != 3:
+            s1 = rng.uniform(-30, 20, (256, 256, 4)).astype(np.float32)
+            s1[:8, :8, month % 4] = -9999
+            write_tiff(tmp_path / f"c_S1_{month:0>2}.tif", s1)
+        if month % 2:
+            s2 = rng.integers(0, 19000, (256, 256, 11), dtype=np.uint16)
+            write_tiff(tmp_path / f"c_S2_{month:0>2}.tif", s2)
+    return tmp_path
+
+
+@pytest.fixture
+def decode_threads():
+    default = dataset._decode_threads
+    yield dataset.set_decode_threads
+    dataset.set_decode_threads(default)
+
+
+def test_parallel_decode_matches_sequential(chip_dir, decode_threads):
+    decode_threads(1)
+    sequential = dataset.read_imgs("c", chip_dir)
+    decode_threads(4)
+    parallel = dataset.read_imgs("c", chip_dir)
+
+    np.testing.assert_array_equal(parallel[0], sequential[0])
+    np.testing.assert_array_equal(parallel[1], sequential[1])
+    assert parallel[1].tolist() == [month == 11 for month in range(12)]
+
+
+def reference_month(chip_dir, month):
+    """One month as the original read_imgs built it: per-sensor copies, concatenated and transposed."""
+    s1_path = chip_dir / f"c_S1_{month:0>2}.tif"
+    if s1_path.is_file():
+        img_s1 = tifffile.imread(s1_path)
+        img_s1 = np.where(img_s1 == -9999, 0, (img_s1.astype("float32") - dataset.s1_min) / dataset.s1_mm)
+    else:
+        img_s1 = np.zeros(dataset.IMG_SIZE + (4,), dtype="float32")
+    s2_path = chip_dir / f"c_S2_{month:0>2}.tif"
+    if s2_path.is_file():
+        img_s2 = tifffile.imread(s2_path).astype("float32") / dataset.s2_max
+    else:
+        img_s2 = np.zeros(dataset.IMG_SIZE + (11,), dtype="float32")
+    return np.transpose(np.concatenate([img_s1, img_s2], axis=2), (2, 0, 1))
+
+
+def test_preallocated_stack_matches_reference_normalisation(chip_dir):
+    out = dataset.empty_stack()
+    out.fill(np.nan)  # stale contents must be overwritten everywhere
+    imgs, _ = dataset.read_imgs("c", chip_dir, out=out)
+
+    assert imgs is out
+    assert imgs.shape == (12, 15) + dataset.IMG_SIZE and imgs.dtype == np.float32
+    for month in range(12):
+        np.testing.assert_array_equal(imgs[month], reference_month(chip_dir, month))
+
+
+def test_raw_transport_normalises_like_the_float_path(chip_dir):
+    floats, float_mask = dataset.read_imgs("c", chip_dir)
+    raw, raw_mask = dataset.read_imgs("c", chip_dir, raw=True)
+
+    assert raw.dtype == np.int16 and raw.shape == (12,) + dataset.IMG_SIZE + (dataset.RAW_CHANNELS,)
+    assert raw.nbytes < floats.nbytes
+    np.testing.assert_array_equal(raw_mask, float_mask)
+    torch.testing.assert_close(dataset.normalize_raw(torch.from_numpy(raw)), torch.from_numpy(floats), rtol=0, atol=0)
+
+    # Batched stacks normalise the same, and uploads take the same route
+    batch = torch.from_numpy(np.stack([raw, raw]))
+    assert torch.equal(dataset.normalize_raw(batch)[1], torch.from_numpy(floats))
+    files = {p.name: tifffile.imread(p) for p in chip_dir.glob("c_S*.tif")}
+    uploaded, _ = dataset.read_imgs_from_files(files, raw=True)
+    np.testing.assert_array_equal(uploaded, raw)
+
+    # Reflectances above the int16 range survive the int16 view
+    s2 = np.full((256, 256, 11), 40000, dtype=np.uint16)
+    raw, _ = dataset.read_imgs_from_files({"x_S2_00.tif": s2}, raw=True)
+    floats, _ = dataset.read_imgs_from_files({"x_S2_00.tif": s2})
+    assert torch.equal(dataset.normalize_raw(torch.from_numpy(raw)), torch.from_numpy(floats))
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+import torch
+
+from engines import build_engine, cache_key, verify_engine
+from models import UnetVFLOW
+
+
+@pytest.fixture
+def model(tiny_args, tmp_path):
+    torch.manual_seed(0)
+    model = UnetVFLOW(tiny_args, pretrained=False).eval()
+    checkpoint_path = tmp_path / "tiny" / "model.pt"
+    checkpoint_path.parent.mkdir()
+    torch.save({"state_dict": model.state_dict(), "args": tiny_args}, checkpoint_path)
+    return model, str(checkpoint_path)
+
+
+@pytest.mark.parametrize("engine", ["torchscript", "onnx"])
+def test_engine_matches_eager_and_is_reused(model, tmp_path, engine):
+    if engine == "onnx":
+        pytest.importorskip("onnxruntime")
+    eager, checkpoint_path = model
+    cache_dir = tmp_path / "engine_cache"
+
+    check = verify_engine(build_engine(engine, eager, checkpoint_path, cache_dir), eager)
+    assert check["ok"], check
+    artifacts = sorted(os.listdir(cache_dir))
+    assert len(artifacts) == 1
+
+    # A second build loads the cached artifact instead of exporting again
+    mtime = os.stat(cache_dir / artifacts[0]).st_mtime_ns
+    check = verify_engine(build_engine(engine, eager, checkpoint_path, cache_dir), eager)
+    assert check["ok"], check
+    assert sorted(os.listdir(cache_dir)) == artifacts
+    assert os.stat(cache_dir / artifacts[0]).st_mtime_ns == mtime
+
+
+def test_cache_key_follows_checkpoint_and_engine(model):
+    eager, checkpoint_path = model
+    key = cache_key(checkpoint_path, "onnx")
+    assert cache_key(checkpoint_path, "onnx") == key
+    assert cache_key(checkpoint_path, "torchscript") != key
+    assert cache_key(checkpoint_path, "onnx", shape=(1, 12, 15, 128, 128)) != key
+
+    torch.save({"state_dict": eager.state_dict(), "args": None, "retrained": True}, checkpoint_path)
+    assert cache_key(checkpoint_path, "onnx") != key
+
+
+def test_eager_is_the_model_and_unknown_engines_are_rejected(model, tmp_path):
+    eager, checkpoint_path = model
+    assert build_engine("eager", eager, checkpoint_path, tmp_path) is eager
+    with pytest.raises(ValueError, match="Unknown engine"):
+        build_engine("tensorrt", eager, checkpoint_path, tmp_path)
+
+
+def test_interrupted_torchscript_save_is_not_reused(model, tmp_path, monkeypatch):
+    eager, checkpoint_path = model
+    cache_dir = tmp_path / "engine_cache"
+
+    def crash(self, path, *args, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(torch.jit.RecursiveScriptModule, "save", crash)
+        with pytest.raises(KeyboardInterrupt):
+            build_engine("torchscript", eager, checkpoint_path, cache_dir)
+    assert not any(name.endswith(".pt") for name in os.listdir(cache_dir))
+
+    check = verify_engine(build_engine("torchscript", eager, checkpoint_path, cache_dir), eager)
+    assert check["ok"], check
+    assert [name for name in os.listdir(cache_dir) if name.endswith(".pt")]
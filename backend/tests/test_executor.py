@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, ExecutorSaturated
+
+
+def test_saturated_executor_rejects():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_pending=1)
+        release = threading.Event()
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(lambda: None)
+        release.set()
+        await running
+        executor.shutdown()
+        return executor.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 1
+
+
+def test_process_executor_runs_shared_calls_in_process():
+    lock = threading.Lock()  # unpicklable, as cache state is
+
+    def touch():
+        with lock:
+            return threading.current_thread().name
+
+    async def scenario():
+        executor = BoundedExecutor("test", kind="process", max_workers=1)
+        try:
+            return await executor.run_shared(touch)
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(scenario()).startswith("test-shared")
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import tifffile
+
+from gt_cache import GroundTruthCache
+
+
+def write_gt(gt_dir, chip_id, value, size=16):
+    path = gt_dir / f"{chip_id}_agbm.tif"
+    tifffile.imwrite(path, np.full((size, size), value, dtype=np.float32))
+    return path
+
+
+def test_rewritten_raster_is_decoded_again(tmp_path):
+    cache = GroundTruthCache(tmp_path, budget_bytes=1 << 20)
+    path = write_gt(tmp_path, "a", 10.0)
+
+    first = cache.get("a", heatmap=True)
+    assert cache.get("a").stats["mean"] == 10.0
+    assert cache.hits == 1
+
+    write_gt(tmp_path, "a", 20.0)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = cache.get("a", heatmap=True)
+    assert cache.stale == 1
+    assert second.stats["mean"] == 20.0
+    assert second.heatmap_etag != first.heatmap_etag
+    assert not second.array.flags.writeable
+
+
+def test_missing_chip_has_no_ground_truth(tmp_path):
+    cache = GroundTruthCache(tmp_path, budget_bytes=1 << 20)
+    assert cache.get("missing") is None
+    assert cache.get("../a") is None
+
+
+def test_warm_stops_before_evicting(tmp_path):
+    for chip_id in ("a", "b", "c"):
+        write_gt(tmp_path, chip_id, 5.0)
+    probe = GroundTruthCache(tmp_path, budget_bytes=1 << 20)
+    entry_bytes = probe.get("a", heatmap=True).nbytes
+
+    cache = GroundTruthCache(tmp_path, budget_bytes=2 * entry_bytes + entry_bytes // 2)
+    added = cache.warm(["a", "b", "c"])
+
+    assert added == 2
+    assert cache.evictions == 0
+    assert cache.get_stats()["with_heatmap"] == 2
+    assert cache._bytes <= cache.budget_bytes
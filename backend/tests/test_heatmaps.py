@@ -0,0 +1,88 @@
+import asyncio
+import io
+import threading
+
+import numpy as np
+import pytest
+import tifffile
+from fastapi.testclient import TestClient
+
+import app as app_module
+from gt_cache import GroundTruthCache
+from rendering import content_etag
+from result_store import ResultStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ResultStore(tmp_path / "results")
+    store.save(
+        "r1", "chip", "2026-01-01T00:00:00", ground_truth_available=False,
+        models={"m": {}}, maps={}, heatmaps={"m": {"prediction": b"png-bytes"}}
+    )
+    gt_dir = tmp_path / "agbm"
+    gt_dir.mkdir()
+    tifffile.imwrite(gt_dir / "chip_agbm.tif", np.full((16, 16), 100, dtype=np.float32))
+    monkeypatch.setattr(app_module, "result_store", store)
+    monkeypatch.setattr(app_module, "gt_cache", GroundTruthCache(gt_dir, budget_bytes=1 << 20))
+    return TestClient(app_module.app)
+
+
+def test_result_heatmap_is_immutable_and_revalidates(client):
+    r = client.get("/api/results/r1/heatmap/m")
+    assert r.status_code == 200
+    assert r.content == b"png-bytes"
+    assert r.headers["content-type"] == "image/png"
+    assert r.headers["etag"] == content_etag(b"png-bytes")
+    assert "immutable" in r.headers["cache-control"]
+
+    etag = r.headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        r = client.get("/api/results/r1/heatmap/m", headers={"If-None-Match": header})
+        assert r.status_code == 304 and r.content == b""
+        assert r.headers["etag"] == etag
+    assert client.get("/api/results/r1/heatmap/m", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    assert client.get("/api/results/r1/heatmap/m?kind=uncertainty").status_code == 404
+    assert client.get("/api/results/missing/heatmap/m").status_code == 404
+
+
+def test_ground_truth_heatmap_is_revalidated_every_time(client):
+    info = client.get("/api/ground-truth/chip").json()
+    assert info["stats"]["mean"] == 100
+    assert "heatmap" not in info
+
+    r = client.get(info["heatmap_url"])
+    assert r.status_code == 200 and r.content.startswith(b"\x89PNG")
+    assert r.headers["cache-control"] == "no-cache"
+    r = client.get(info["heatmap_url"], headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+    assert client.get("/api/ground-truth/missing/heatmap").status_code == 404
+
+
+def test_prediction_download_reads_the_store_off_the_event_loop(tmp_path, monkeypatch):
+    store = ResultStore(tmp_path / "results", dtype="float16")
+    prediction = np.arange(256, dtype=np.float32).reshape(16, 16)
+    store.save(
+        "r1", "chip", "2026-01-01T00:00:00", ground_truth_available=False,
+        models={"m": {}}, maps={"m": {"prediction": prediction}}, heatmaps={}
+    )
+    threads = []
+    for name in ("get", "load_map"):
+        method = getattr(store, name)
+        monkeypatch.setattr(store, name, lambda *args, _method=method: threads.append(threading.current_thread()) or _method(*args))
+    monkeypatch.setattr(app_module, "result_store", store)
+
+    async def scenario():
+        response = await app_module.download_prediction("r1", "m")
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return response, body, threading.current_thread()
+
+    response, body, loop_thread = asyncio.run(scenario())
+    assert response.headers["content-disposition"] == "attachment; filename=chip_m_prediction.tif"
+    np.testing.assert_array_equal(tifffile.imread(io.BytesIO(body)), prediction)
+    assert threads and loop_thread not in threads
+
+    client = TestClient(app_module.app)
+    assert client.get("/api/results/r1/download/other").status_code == 404
+    assert client.get("/api/results/missing/download/m").status_code == 404
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from inference import BiomassPredictor, PredictionJob
+
+
+class ConstantModel(torch.nn.Module):
+    def __init__(self, value: float):
+        super().__init__()
+        self.value = torch.nn.Parameter(torch.tensor(value))
+
+    def forward(self, x, masks):
+        return self.value.expand(x.shape[0], 1, x.shape[-2], x.shape[-1])
+
+
+def make_predictor(values, weights=None, model_parallelism=None):
+    """Predictor with constant-output members "a", "b" and an ensemble of both."""
+    predictor = BiomassPredictor([
+        {"name": "a", "path": "a.pth"},
+        {"name": "b", "path": "b.pth"},
+        {"name": "Ensemble", "path": "", "members": ["a", "b"], "member_weights": weights},
+    ], model_parallelism=model_parallelism)
+    predictor.models.loader = lambda name: ConstantModel(values[name]) if values.get(name) is not None else None
+    return predictor
+
+
+def job(model_names):
+    return PredictionJob(
+        chip_id="chip",
+        images=torch.zeros(1, 12, 15, 8, 8),
+        masks=torch.zeros(1, 12, dtype=torch.bool),
+        model_names=model_names
+    )
+
+
+def test_ensemble_is_weighted_mean_with_spread():
+    predictor = make_predictor({"a": 10.0, "b": 30.0}, weights=[3.0, 1.0])
+    result = predictor.predict_batch([job(["Ensemble", "a"])])[0]
+
+    ensemble = result["predictions"]["Ensemble"]
+    np.testing.assert_allclose(ensemble["prediction"], 15.0)
+    np.testing.assert_allclose(ensemble["uncertainty"], np.sqrt(0.75 * 25 + 0.25 * 225), rtol=1e-6)
+    np.testing.assert_allclose(result["predictions"]["a"]["prediction"], 10.0)
+    assert result["failed_models"] == {}
+
+
+def test_ensemble_with_missing_member_is_flagged_not_served():
+    predictor = make_predictor({"a": 10.0, "b": None})
+    result = predictor.predict_batch([job(["a", "b", "Ensemble"])])[0]
+
+    assert list(result["predictions"]) == ["a"]
+    assert result["failed_models"] == {
+        "b": "model could not be loaded",
+        "Ensemble": "ensemble members unavailable: b",
+    }
+    with pytest.raises(KeyError):
+        predictor.run_model("Ensemble", job(None).images, job(None).masks)
+
+
+class SlowModel(ConstantModel):
+    """Records when each forward pass runs; sleeping releases the GIL like torch kernels do."""
+
+    def __init__(self, value: float, spans: list):
+        super().__init__(value)
+        self.spans = spans
+
+    def forward(self, x, masks):
+        start = time.time()
+        time.sleep(0.2)
+        self.spans.append((start, time.time()))
+        return super().forward(x, masks)
+
+
+def test_ensemble_members_run_concurrently_and_load_time_is_not_inference_time():
+    spans = []
+
+    def slow_loader(name):
+        time.sleep(0.3)
+        return SlowModel({"a": 10.0, "b": 20.0}[name], spans)
+
+    predictor = make_predictor({})
+    predictor.models.loader = slow_loader
+    assert predictor.model_parallelism == 2
+    assert predictor.threads_per_model == max(1, torch.get_num_threads() // 2)
+
+    result = predictor.predict_batch([job(["Ensemble"])])[0]
+
+    (start_a, end_a), (start_b, end_b) = spans
+    assert max(start_a, start_b) < min(end_a, end_b)
+    elapsed = result["predictions"]["Ensemble"]["processing_time"]
+    assert 0.2 <= elapsed < 0.35
+    np.testing.assert_allclose(result["predictions"]["Ensemble"]["prediction"], 15.0)
+
+    # Serial when asked to
+    assert make_predictor({}, model_parallelism=1)._model_executor is None
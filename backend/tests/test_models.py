@@ -0,0 +1,56 @@
+import numpy as np
+import timm
+import torch
+
+from dataset import read_imgs_from_files
+from models import UnetVFLOW, load_from_checkpoint
+
+
+def test_skipping_masked_frames_matches_full_encode(tiny_args):
+    torch.manual_seed(0)
+    model = UnetVFLOW(tiny_args, pretrained=False).eval()
+    images = torch.rand(2, 4, 15, 64, 64)
+    masks = torch.tensor([[False, True, False, True], [True, False, False, False]])
+
+    with torch.no_grad():
+        skipped = model(images, masks)
+        model.skip_masked_frames = False
+        full = model(images, masks)
+    torch.testing.assert_close(skipped, full, atol=1e-4, rtol=1e-4)
+
+
+def test_months_without_files_are_masked():
+    s1 = np.zeros((256, 256, 4), dtype=np.float32)
+    s2 = np.zeros((256, 256, 11), dtype=np.uint16)
+    files = {"c_S1_00.tif": s1, "c_S2_00.tif": s2, "c_S2_05.tif": s2}
+    _, mask = read_imgs_from_files(files)
+    assert mask.tolist() == [month not in (0, 5) for month in range(12)]
+
+    # With every month missing nothing is masked, so attention pooling stays defined
+    _, mask = read_imgs_from_files({})
+    assert not mask.any()
+
+
+def test_checkpoint_builds_without_pretrained_weights(tiny_args, monkeypatch):
+    torch.manual_seed(0)
+    trained = UnetVFLOW(tiny_args, pretrained=False).eval()
+    checkpoint = {"state_dict": trained.state_dict(), "args": tiny_args}
+
+    create_model = timm.create_model
+    calls = []
+
+    def offline_create_model(*args, **kwargs):
+        calls.append(kwargs["pretrained"])
+        return create_model(*args, **kwargs)
+
+    monkeypatch.setattr(timm, "create_model", offline_create_model)
+    model = load_from_checkpoint(checkpoint)
+    assert calls == [False]
+    assert not model.training
+    assert all(not p.is_meta for p in model.parameters())
+    assert all(not b.is_meta for b in model.buffers())
+
+    images = torch.rand(1, 3, 15, 64, 64)
+    masks = torch.zeros(1, 3, dtype=torch.bool)
+    with torch.no_grad():
+        torch.testing.assert_close(model(images, masks), trained(images, masks))
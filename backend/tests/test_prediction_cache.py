@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+
+from inference import BiomassPredictor
+from prediction_cache import PredictionCache, upload_fingerprint
+
+
+def prediction(value, size=16):
+    return np.full((size, size), value, dtype=np.float32)
+
+
+def test_least_recently_used_output_is_evicted_within_budget():
+    cache = PredictionCache(2 * prediction(0).nbytes)
+    cache.put(("a", "m", 1), prediction(1), None, 0.1)
+    cache.put(("b", "m", 1), prediction(2), None, 0.1)
+    assert cache.get(("a", "m", 1)) is not None
+    cache.put(("c", "m", 1), prediction(3), None, 0.1)
+
+    assert cache.get(("b", "m", 1)) is None
+    assert cache.get(("a", "m", 1)).prediction[0, 0] == 1
+    assert cache.get(("a", "m", 2)) is None  # a different ntta is a different output
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert stats["cached_bytes"] <= stats["budget_bytes"]
+
+    # Too large for the whole budget: not cached, nothing evicted
+    cache.put(("d", "m", 1), prediction(4, size=64), None, 0.1)
+    assert cache.get(("d", "m", 1)) is None and cache.get_stats()["entries"] == 2
+
+
+def test_cached_outputs_are_read_only_copies():
+    cache = PredictionCache(1 << 20)
+    batch = np.stack([prediction(1), prediction(2)])
+    cache.put(("a", "m", 1), batch[1], batch[0], 0.1)
+    batch[:] = 0
+
+    entry = cache.get(("a", "m", 1))
+    assert entry.prediction[0, 0] == 2 and entry.uncertainty[0, 0] == 1
+    assert not entry.prediction.flags.writeable and not entry.uncertainty.flags.writeable
+
+    disabled = PredictionCache(0)
+    disabled.put(("a", "m", 1), prediction(1), None, 0.1)
+    assert not disabled.enabled and disabled.get(("a", "m", 1)) is None
+
+
+def test_upload_fingerprint_follows_content_and_months_not_names():
+    hashes = {"x_S1_00.tif": "h1", "x_S2_00.tif": "h2", "x_S2_05.tif": "h3"}
+    renamed = {"upload_S1_00.tif": "h1", "other_S2_05.tif": "h3", "other_S2_00.tif": "h2"}
+    assert upload_fingerprint(renamed) == upload_fingerprint(hashes)
+
+    assert upload_fingerprint({**hashes, "x_S2_05.tif": "changed"}) != upload_fingerprint(hashes)
+    assert upload_fingerprint({"x_S1_00.tif": "h1", "x_S2_00.tif": "h2", "x_S2_06.tif": "h3"}) != \
+        upload_fingerprint(hashes)
+    # Files that fill no month do not change what is predicted
+    assert upload_fingerprint({**hashes, "x_agbm.tif": "gt"}) == upload_fingerprint(hashes)
+
+
+def test_model_fingerprint_follows_checkpoint_contents(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.pth").write_bytes(name.encode())
+    predictor = BiomassPredictor([
+        {"name": "a", "path": str(tmp_path / "a.pth")},
+        {"name": "b", "path": str(tmp_path / "b.pth")},
+        {"name": "missing", "path": str(tmp_path / "missing.pth")},
+        {"name": "Ensemble", "path": "", "members": ["a", "b"]},
+        {"name": "Broken", "path": "", "members": ["a", "missing"]},
+    ])
+    first = predictor.model_fingerprint("a")
+    ensemble = predictor.model_fingerprint("Ensemble")
+    assert first != predictor.model_fingerprint("b")
+    assert predictor.model_fingerprint("missing") is None
+    assert predictor.model_fingerprint("Broken") is None
+
+    path = tmp_path / "a.pth"
+    path.write_bytes(b"retrained")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert predictor.model_fingerprint("a") != first
+    assert predictor.model_fingerprint("Ensemble") != ensemble
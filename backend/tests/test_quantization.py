@@ -0,0 +1,57 @@
+import pytest
+import torch
+
+from models import UnetVFLOW
+from quantization import QUANT_MODES, calibration_chip_ids, model_size_bytes, quantize_model
+
+
+def test_calibration_chips_exclude_the_evaluation_split(tmp_path):
+    for chip_id in ("c1", "c2", "t1", "t2"):
+        (tmp_path / f"{chip_id}_S1_00.tif").write_bytes(b"")
+        (tmp_path / f"{chip_id}_S2_05.tif").write_bytes(b"")
+    (tmp_path / "c3_agbm.tif").write_bytes(b"")
+
+    assert calibration_chip_ids(tmp_path) == ["c1", "c2", "t1", "t2"]
+    assert calibration_chip_ids(tmp_path, exclude=["t1", "t2", "other"]) == ["c1", "c2"]
+
+
+def test_only_static_quantization_is_offered():
+    assert QUANT_MODES == ("static",)
+    model = torch.nn.Linear(4, 4)
+    with pytest.raises(ValueError, match="Unknown quantization mode"):
+        quantize_model(model, "dynamic")
+    with pytest.raises(ValueError, match="calibration batches"):
+        quantize_model(model, "static")
+
+
+def synthetic_batch(seed):
+    generator = torch.Generator().manual_seed(seed)
+    images = torch.rand(1, 4, 15, 64, 64, generator=generator)
+    return images, torch.tensor([[False, True, False, False]])
+
+
+@torch.no_grad()
+def test_static_quantization_converts_the_encoder_and_tracks_the_float_model(tiny_args):
+    torch.manual_seed(0)
+    model = UnetVFLOW(tiny_args, pretrained=False).eval()
+    int8_model, calibrated = quantize_model(model, "static", [synthetic_batch(1), synthetic_batch(2)])
+
+    assert calibrated == 2
+    encoder_modules = list(int8_model.encoder.model.modules())
+    assert any(isinstance(m, torch.ao.nn.quantized.Conv2d) for m in encoder_modules)
+    assert not any(type(m) is torch.nn.Conv2d for m in encoder_modules)
+    assert any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in int8_model.attn.modules())
+    # The float model is left as it was
+    assert any(type(m) is torch.nn.Conv2d for m in model.encoder.model.modules())
+    assert model_size_bytes(int8_model) < 0.75 * model_size_bytes(model)
+
+    images, masks = synthetic_batch(3)
+    expected = model(images, masks)
+    actual = int8_model(images, masks)
+    assert actual.shape == expected.shape
+    assert (actual - expected).abs().mean() < 0.05 * expected.abs().mean()
+    assert (actual - expected).abs().max() < 0.1
+
+    # A masked month still contributes nothing
+    images[:, 1] = torch.rand_like(images[:, 1])
+    torch.testing.assert_close(int8_model(images, masks), actual)
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import torch
+
+from registry import ModelRegistry
+
+
+class Blob(torch.nn.Module):
+    """A model whose footprint is exactly `nbytes`."""
+
+    def __init__(self, nbytes: int):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.zeros(nbytes // 4))
+
+
+def test_concurrent_gets_load_once_outside_the_lock():
+    release = threading.Event()
+    calls = []
+
+    def loader(name):
+        calls.append(name)
+        if name == "slow":
+            release.wait(5)
+        return Blob(400)
+
+    registry = ModelRegistry(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("slow"))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+
+    # Another model loads while "slow" is still loading
+    assert registry.get("fast") is not None
+    assert registry.get_stats()["loading_models"] == ["slow"]
+
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls.count("slow") == 1
+    assert len(results) == 3 and all(r is results[0] for r in results)
+
+
+def test_room_is_made_before_loading():
+    registry = None
+    resident_during_load = {}
+
+    def loader(name):
+        resident_during_load[name] = registry.keys()
+        return Blob(600)
+
+    registry = ModelRegistry(loader, budget_bytes=1000, estimate=lambda name: 600)
+    registry.get("a")
+    registry.get("b")
+
+    assert resident_during_load["b"] == []
+    assert registry.keys() == ["b"]
+    assert registry.total_bytes() <= 1000
+
+
+def test_pinned_models_are_not_evicted():
+    evicted = []
+    registry = ModelRegistry(lambda name: Blob(600), budget_bytes=1000, on_evict=evicted.append)
+
+    a = registry.acquire("a")
+    registry.get("b")
+    assert "a" in registry and evicted == []
+    assert not registry.evict("a")
+
+    registry.release("a")
+    assert evicted == ["a"]
+    assert registry.keys() == ["b"]
+    assert registry.acquire("a") is not a
+
+
+def test_failed_load_is_reported_and_retried():
+    attempts = []
+
+    def loader(name):
+        attempts.append(name)
+        return None if len(attempts) == 1 else Blob(4)
+
+    registry = ModelRegistry(loader)
+    assert registry.get("a") is None
+    assert registry.get("a") is not None
+    assert registry.load_failures == 1 and registry.misses == 2
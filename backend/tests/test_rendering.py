@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks import _matplotlib_heatmap
+from rendering import content_etag, render_heatmap
+
+
+def decode(data):
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+def biomass_map(seed=0):
+    """AGBM-like values, every colour table boundary, and values outside [vmin, vmax]."""
+    rng = np.random.default_rng(seed)
+    array = rng.gamma(2.0, 60.0, (64, 64)).astype(np.float32)
+    array.flat[:257] = np.arange(257, dtype=np.float32) * 400 / 256
+    array[-1, :4] = [-50, 0, 400, 1000]
+    return array
+
+
+@pytest.mark.parametrize("colormap,vmax", [("viridis", 400), ("magma", 50)])
+def test_lut_matches_matplotlib_pixels(colormap, vmax):
+    array = biomass_map()
+    np.testing.assert_array_equal(
+        decode(render_heatmap(array, 0, vmax, colormap)),
+        decode(_matplotlib_heatmap(array, 0, vmax, colormap))
+    )
+
+
+def test_nan_pixels_render_like_matplotlib():
+    array = biomass_map(1)
+    array[10:20, 5:9] = np.nan
+    rendered = decode(render_heatmap(array))
+    np.testing.assert_array_equal(rendered, decode(_matplotlib_heatmap(array, 0, 400, "viridis")))
+    assert not rendered[10:20, 5:9].any()
+
+
+def test_webp_is_lossless_and_etags_follow_content():
+    array = biomass_map(2)
+    png = render_heatmap(array)
+    np.testing.assert_array_equal(decode(render_heatmap(array, fmt="webp")), decode(png))
+    assert content_etag(png) == content_etag(render_heatmap(array))
+    assert content_etag(png) != content_etag(render_heatmap(array + 1))
+    with pytest.raises(ValueError):
+        render_heatmap(array, fmt="gif")
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from rendering import content_etag
+from result_store import ResultStore
+
+
+def save(store, result_id, chip_id="chip", timestamp="2026-01-01T00:00:00", size=16):
+    prediction = np.arange(size * size, dtype=np.float32).reshape(size, size)
+    return store.save(
+        result_id,
+        chip_id,
+        timestamp,
+        ground_truth_available=False,
+        models={"m": {"stats": {"mean": float(prediction.mean())}}},
+        maps={"m": {"prediction": prediction, "uncertainty": prediction / 10}},
+        heatmaps={"m": {"prediction": b"png:" + result_id.encode()}}
+    )
+
+
+def test_result_round_trips_and_survives_restart(tmp_path):
+    store = ResultStore(tmp_path)
+    save(store, "r1", timestamp="2026-01-01T00:00:00")
+    save(store, "r2", timestamp="2026-01-02T00:00:00")
+
+    prediction = store.load_map("r1", "m")
+    assert isinstance(prediction, np.memmap) and not prediction.flags.writeable
+    np.testing.assert_array_equal(prediction, np.arange(256, dtype=np.float32).reshape(16, 16))
+    assert store.get("r1")["models"]["m"]["stats"]["mean"] == pytest.approx(127.5)
+    assert store.load_heatmap("r1", "m") == b"png:r1"
+    assert store.heatmap_file("r1", "m")[1] == content_etag(b"png:r1")
+    assert store.load_map("r1", "m", "missing") is None and store.load_map("r1", "other") is None
+
+    # An interrupted write is cleaned up and the index is rebuilt from disk
+    (tmp_path / ".r3.tmp").mkdir()
+    reopened = ResultStore(tmp_path)
+    assert [s["id"] for s in reopened.list()] == ["r2", "r1"]
+    assert reopened.get_stats()["bytes"] == store.get_stats()["bytes"]
+    assert not (tmp_path / ".r3.tmp").exists()
+
+    assert reopened.delete("r1") and not reopened.delete("r1")
+    assert "r1" not in reopened and not (tmp_path / "r1").exists()
+
+
+def test_float16_results_take_half_the_space(tmp_path):
+    full = ResultStore(tmp_path / "full")
+    half = ResultStore(tmp_path / "half", dtype="float16")
+    save(full, "r", size=64)
+    save(half, "r", size=64)
+
+    assert half.load_map("r", "m").dtype == np.float16
+    np.testing.assert_allclose(half.load_map("r", "m"), full.load_map("r", "m"), rtol=1e-3)
+    assert half.get_stats()["bytes"] < 0.6 * full.get_stats()["bytes"]
+
+
+def test_expired_results_are_evicted(tmp_path):
+    store = ResultStore(tmp_path, max_age_s=100)
+    created = save(store, "r1")["created"]
+
+    assert not store.over_limits(now=created + 50)
+    assert store.evict(now=created + 50)["age"] == 0
+    assert store.over_limits(now=created + 200)
+    assert store.evict(now=created + 200)["age"] == 1
+    assert "r1" not in store and not (tmp_path / "r1").exists()
+
+
+def test_oldest_results_go_first_beyond_count_and_size(tmp_path):
+    store = ResultStore(tmp_path / "counted", max_results=2)
+    for result_id in ("r1", "r2", "r3"):
+        save(store, result_id)
+    assert store.over_limits()
+    assert store.evict()["count"] == 1
+    assert sorted(s["id"] for s in store.list()) == ["r2", "r3"]
+
+    one = store.get_stats()["bytes"] // 2
+    sized = ResultStore(tmp_path / "sized", max_bytes=2 * one + one // 2)
+    for result_id in ("r1", "r2", "r3", "r4"):
+        save(sized, result_id)
+    assert sized.evict()["bytes"] == 2
+    assert sorted(s["id"] for s in sized.list()) == ["r3", "r4"]
+    assert sized.get_stats()["bytes"] <= sized.max_bytes and not sized.over_limits()
+
+
+def test_saves_never_evict_and_orphans_wait_for_a_grace_period(tmp_path):
+    store = ResultStore(tmp_path, max_results=1)
+    save(store, "r1")
+    save(store, "r2")
+    assert len(store) == 2
+
+    (tmp_path / "stray").mkdir()
+    now = store.list()[0]["created"]
+    assert store.evict(now=now)["orphans"] == 0
+    assert (tmp_path / "stray").exists()
+    assert store.evict(now=now + 7200)["orphans"] == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["r2"]
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+@pytest.fixture
+def scene_app(tmp_path, monkeypatch):
+    scenes = tmp_path / "scenes"
+    scenes.mkdir()
+    (scenes / "tile_S2_00.tif").write_bytes(b"")
+    monkeypatch.setattr(app_module, "SCENES_PATH", scenes)
+    monkeypatch.setattr(app_module, "RESULTS_PATH", tmp_path / "results")
+    monkeypatch.setattr(app_module, "scene_jobs", {})
+    monkeypatch.setattr(app_module, "predictor", object())
+    return app_module
+
+
+def test_finished_jobs_expire_with_their_outputs(scene_app, monkeypatch):
+    monkeypatch.setattr(scene_app, "SCENE_JOB_TTL_S", 60)
+    now = time.time()
+    for job_id, job in {
+        "old": {"status": "completed", "finished_at": now - 120},
+        "recent": {"status": "failed", "finished_at": now - 10},
+        "running": {"status": "running"},
+    }.items():
+        scene_app.scene_jobs[job_id] = {"id": job_id, **job}
+        (scene_app.RESULTS_PATH / "scenes" / job_id).mkdir(parents=True)
+
+    asyncio.run(scene_app.expire_scene_jobs())
+
+    assert sorted(scene_app.scene_jobs) == ["recent", "running"]
+    assert sorted(p.name for p in (scene_app.RESULTS_PATH / "scenes").iterdir()) == ["recent", "running"]
+
+
+def test_scene_jobs_are_admitted_up_to_the_executor_backlog(scene_app):
+    for i in range(scene_app.scene_executor.max_pending):
+        scene_app.scene_jobs[f"job{i}"] = {"id": f"job{i}", "status": "queued" if i % 2 else "running"}
+
+    client = TestClient(scene_app.app)
+    r = client.post("/api/predict/scene", json={"scene_id": "tile"})
+    assert r.status_code == 503
+    assert len(scene_app.scene_jobs) == scene_app.scene_executor.max_pending
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import ExecutorSaturated
+from inference import PredictionJob
+from scheduler import MicroBatchScheduler
+
+
+class BlockingPredictor:
+    """Records batches; each batch waits until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches = []
+
+    def predict_batch(self, jobs):
+        self.release.wait(timeout=10)
+        self.batches.append([job.chip_id for job in jobs])
+        return [{"chip_id": job.chip_id} for job in jobs]
+
+
+def job(chip_id):
+    return PredictionJob(chip_id=chip_id, images=None, masks=None)
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    async def scenario():
+        predictor = BlockingPredictor()
+        scheduler = MicroBatchScheduler(predictor, max_batch_size=1, max_wait_ms=0, max_queue_size=2)
+        await scheduler.start()
+        # The first job occupies the only batch slot; the next two fill the queue
+        running = [asyncio.create_task(scheduler.submit(job("c0")))]
+        await asyncio.sleep(0.05)
+        running += [asyncio.create_task(scheduler.submit(job(f"c{i}"))) for i in (1, 2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await scheduler.submit(job("overflow"))
+        predictor.release.set()
+        results = await asyncio.gather(*running)
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert [r["chip_id"] for r in results] == ["c0", "c1", "c2"]
+    assert stats["rejected"] == 1
+    assert stats["max_queue_size"] == 2
+
+
+class RecordingPredictor:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def predict_batch(self, jobs):
+        self.batches.append([job.chip_id for job in jobs])
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return [{"chip_id": job.chip_id} for job in jobs]
+
+
+def test_concurrent_jobs_share_a_batch_and_get_their_own_result():
+    async def scenario():
+        predictor = RecordingPredictor()
+        scheduler = MicroBatchScheduler(predictor, max_batch_size=4, max_wait_ms=200)
+        results = await asyncio.gather(*[scheduler.submit(job(f"c{i}")) for i in range(6)])
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return predictor.batches, results, stats
+
+    batches, results, stats = asyncio.run(scenario())
+    assert batches == [["c0", "c1", "c2", "c3"], ["c4", "c5"]]
+    assert [r["chip_id"] for r in results] == [f"c{i}" for i in range(6)]
+    assert stats["total_batches"] == 2
+    assert stats["batch_size_histogram"] == {"2": 1, "4": 1}
+
+
+def test_batch_failure_reaches_every_caller():
+    async def scenario():
+        scheduler = MicroBatchScheduler(RecordingPredictor(fail=True), max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*[scheduler.submit(job(f"c{i}")) for i in range(3)], return_exceptions=True)
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) and "exploded" in str(r) for r in results)
+    assert stats["total_errors"] == 1
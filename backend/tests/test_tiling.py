@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import tifffile
+
+from dataset import IMG_SIZE
+from tiling import blend_window, predict_scene, window_positions
+
+
+class BandPredictor:
+    """Predicts the first month's first S2 band, so every window agrees on every pixel."""
+
+    device = "cpu"
+
+    def available_models(self):
+        return ["band"]
+
+    def run_model(self, name, images, masks, ntta=1):
+        return images[:, 0, 4].numpy() * 100
+
+
+def write_scene(scene_dir, height, width):
+    rng = np.random.default_rng(0)
+    s2 = rng.integers(0, 16000, (height, width, 11), dtype=np.uint16)
+    for month in (0, 6):
+        tifffile.imwrite(scene_dir / f"scene_S2_{month:0>2}.tif", s2, photometric="minisblack", planarconfig="contig")
+    return s2[..., 0].astype(np.float32) / 19616. * 100
+
+
+@pytest.mark.parametrize("length", [100, 256, 300, 700])
+def test_windows_cover_the_scene(length):
+    tile, stride = IMG_SIZE[0], IMG_SIZE[0] - 64
+    positions = window_positions(length, tile, stride)
+    assert positions[0] == 0
+    assert positions[-1] == max(0, length - tile)
+    assert all(b - a <= stride for a, b in zip(positions, positions[1:]))
+
+
+def test_blend_weights_are_positive_and_peak_in_the_centre():
+    weight = blend_window(IMG_SIZE[0])
+    assert weight.min() > 0
+    centre = IMG_SIZE[0] // 2
+    assert weight[centre, centre] == pytest.approx(weight.max())
+    assert weight[0, 0] < weight[0, centre] < weight[centre, centre]
+
+
+def test_blended_scene_reproduces_a_consistent_model(tmp_path):
+    scene_dir = tmp_path / "scene"
+    scene_dir.mkdir()
+    expected = write_scene(scene_dir, 300, 420)
+
+    result = predict_scene(BandPredictor(), scene_dir, "scene", tmp_path / "out", overlap=64, batch_size=3)
+    prediction = tifffile.imread(result["outputs"]["band"]["path"])
+
+    assert result["shape"] == [300, 420] and result["windows"] == 4
+    np.testing.assert_allclose(prediction, expected, rtol=1e-5, atol=1e-3)
+    stats = result["outputs"]["band"]["stats"]
+    assert stats["mean"] == pytest.approx(float(expected.mean()), rel=1e-5)
+    assert stats["max"] == pytest.approx(float(expected.max()), rel=1e-5)
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["scene_band_prediction.tif"]
@@ -0,0 +1,65 @@
+import pytest
+import torch
+
+from dataset import MAX_TTA, TTA_TRANSFORMS, predict_tta
+
+
+class PixelModel(torch.nn.Module):
+    """Per-pixel model, so it commutes with every flip and rotation."""
+
+    def forward(self, x, masks):
+        return x[:, :, :1].mean(dim=1)
+
+
+class ConvModel(torch.nn.Module):
+    """Asymmetric convolution; its output changes under every transform."""
+
+    def __init__(self, channels):
+        super().__init__()
+        torch.manual_seed(0)
+        self.conv = torch.nn.Conv2d(channels, 1, 3, padding=1)
+
+    def forward(self, x, masks):
+        b, t = x.shape[:2]
+        out = self.conv(x.flatten(0, 1)).view(b, t, 1, *x.shape[-2:])
+        weights = (~masks).float().view(b, t, 1, 1, 1)
+        return (out * weights).sum(dim=1) / weights.sum(dim=1)
+
+
+def batch(h=8, w=8):
+    torch.manual_seed(1)
+    images = torch.rand(2, 3, 4, h, w)
+    masks = torch.tensor([[False, False, True], [False, True, False]])
+    return images, masks
+
+
+@pytest.mark.parametrize("index", range(MAX_TTA))
+def test_inverse_undoes_forward(index):
+    forward, inverse = TTA_TRANSFORMS[index]
+    x = torch.arange(2 * 5 * 5, dtype=torch.float32).view(2, 1, 5, 5)
+    assert torch.equal(inverse(forward(x)), x)
+
+
+@pytest.mark.parametrize("ntta", range(1, MAX_TTA + 1))
+def test_equivariant_model_is_unchanged_by_tta(ntta):
+    images, masks = batch()
+    model = PixelModel()
+    expected = model(images, masks)
+    for batched in (False, True):
+        torch.testing.assert_close(predict_tta([model], images, masks, ntta, batched=batched), expected)
+
+
+@pytest.mark.parametrize("ntta", [1, 3, 4, 8])
+def test_batched_matches_sequential(ntta):
+    images, masks = batch()
+    models = [ConvModel(4), PixelModel()]
+    sequential = predict_tta(models, images, masks, ntta)
+    batched = predict_tta(models, images, masks, ntta, batched=True)
+    torch.testing.assert_close(batched, sequential)
+
+
+def test_rotations_need_square_inputs():
+    images, masks = batch(8, 6)
+    predict_tta([PixelModel()], images, masks, 4)
+    with pytest.raises(ValueError, match="square"):
+        predict_tta([PixelModel()], images, masks, 5)
@@ -0,0 +1,89 @@
+import io
+import tempfile
+
+import numpy as np
+import tifffile
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app import UploadLimitMiddleware, check_uploads, hash_uploads
+from dataset import read_imgs_from_files
+from prediction_cache import upload_fingerprint
+
+
+def spooled_tiff(array) -> tempfile.SpooledTemporaryFile:
+    """A TIFF in a spooled file, as the form parser hands uploads over."""
+    buffer = io.BytesIO()
+    tifffile.imwrite(buffer, array)
+    f = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    f.write(buffer.getvalue())
+    f.seek(0)
+    return f
+
+
+def limited_app(max_bytes):
+    app = FastAPI()
+    received = {}
+
+    @app.post("/upload")
+    async def upload(files: list[UploadFile] = File(...)):
+        received["files"] = len(files)
+        return {"files": len(files)}
+
+    app.add_middleware(UploadLimitMiddleware, path="/upload", max_bytes=max_bytes)
+    return TestClient(app), received
+
+
+def test_declared_length_over_limit_is_rejected():
+    client, received = limited_app(1024)
+    r = client.post("/upload", files=[("files", ("a.tif", b"\0" * 4096))])
+    assert r.status_code == 413
+    assert "files" not in received
+
+
+def test_streamed_body_is_cut_off_at_limit():
+    client, received = limited_app(64 * 1024)
+    boundary = "b0undary"
+    chunks_read = []
+
+    def body():
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="files"; '
+               f'filename="a.tif"\r\n\r\n').encode()
+        for i in range(16):
+            chunks_read.append(i)
+            yield b"\0" * 16 * 1024
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    r = client.post("/upload", content=body(), headers={"content-type": f"multipart/form-data; boundary={boundary}"})
+    assert r.status_code == 413
+    assert "files" not in received
+
+
+def test_small_upload_passes():
+    client, received = limited_app(64 * 1024)
+    r = client.post("/upload", files=[("files", ("a.tif", b"\0" * 1024))])
+    assert r.status_code == 200 and received["files"] == 1
+
+
+def test_uploads_are_hashed_and_checked_in_place():
+    s1 = np.random.default_rng(0).random((256, 256, 4), dtype=np.float32)
+    uploads = {
+        "x_S1_00.tif": spooled_tiff(s1),
+        "x_S1_01.tif": spooled_tiff(np.zeros((512, 512, 4), np.float32)),
+        "notes_S2_02.tif": io.BytesIO(b"not a tiff"),
+        "readme.txt": spooled_tiff(np.zeros((2, 2), np.uint8)),
+    }
+    renamed = {"y_S1_00.tif": spooled_tiff(s1)}
+
+    hashes = hash_uploads(uploads)
+    assert hashes["x_S1_00.tif"] == hash_uploads(renamed)["y_S1_00.tif"]
+    assert upload_fingerprint({"x_S1_00.tif": hashes["x_S1_00.tif"]}) == \
+        upload_fingerprint(hash_uploads(renamed))
+
+    valid, errors = check_uploads(uploads)
+    assert list(valid) == ["x_S1_00.tif"]
+    assert len(errors) == 1 and errors[0].startswith("x_S1_01.tif")
+
+    imgs, mask = read_imgs_from_files(valid)
+    reference, _ = read_imgs_from_files({"x_S1_00.tif": s1})
+    np.testing.assert_array_equal(imgs, reference)
@@ -0,0 +1,89 @@
+import os
+import signal
+import time
+
+import pytest
+import torch
+
+from dataset import predict_tta
+from worker_pool import InferenceWorkerPool
+
+
+class MeanModel(torch.nn.Module):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.scale = torch.nn.Parameter(torch.tensor(2.0))
+        self.delay = delay
+
+    def forward(self, x, masks):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.scale * x.mean(dim=(1, 2)).unsqueeze(1)
+
+
+def inputs():
+    generator = torch.Generator().manual_seed(0)
+    return torch.rand(2, 12, 3, 8, 8, generator=generator), torch.zeros(2, 12, dtype=torch.bool)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(models, **kwargs):
+        pool = InferenceWorkerPool(models, start_method="fork", threads_per_worker=1, poll_interval=0.05, **kwargs)
+        pool.start()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.stop(timeout=2)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_pool_matches_in_process_prediction(make_pool):
+    model = MeanModel()
+    pool = make_pool({"mean": model}, num_workers=2)
+    images, masks = inputs()
+
+    pred = pool.run_model("mean", images, masks, ntta=4)
+    expected = predict_tta([model], images, masks, ntta=4, batched=True)[:, 0]
+    torch.testing.assert_close(torch.from_numpy(pred), expected)
+
+
+def test_dead_worker_fails_its_jobs_and_is_restarted(make_pool):
+    pool = make_pool({"slow": MeanModel(delay=30), "mean": MeanModel()}, num_workers=1)
+    images, masks = inputs()
+
+    future = pool.submit("slow", images, masks)
+    pid = pool.get_stats()["workers"][0]["pid"]
+    time.sleep(0.2)
+    os.kill(pid, signal.SIGKILL)
+
+    with pytest.raises(RuntimeError, match="died"):
+        future.result(timeout=5)
+    wait_for(lambda: pool.get_stats()["workers"][0]["alive"])
+
+    worker = pool.get_stats()["workers"][0]
+    assert worker["restarts"] == 1 and worker["pid"] != pid
+    assert worker["failed"] == 1 and worker["outstanding"] == 0
+    assert pool.run_model("mean", images, masks).shape == (2, 8, 8)
+
+
+def test_worker_is_retired_after_max_restarts(make_pool):
+    pool = make_pool({"mean": MeanModel()}, num_workers=1, max_restarts=0)
+    images, masks = inputs()
+
+    os.kill(pool.get_stats()["workers"][0]["pid"], signal.SIGKILL)
+    wait_for(lambda: pool.get_stats()["degraded"])
+
+    assert pool.get_stats()["workers"][0]["retired"]
+    with pytest.raises(RuntimeError, match="No live inference workers"):
+        pool.submit("mean", images, masks)
@@ -0,0 +1,246 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import tifffile
+import torch
+
+from dataset import IMG_SIZE, _valid_mask, normalize_s1, normalize_s2
+
+S1_BANDS = 4
+S2_BANDS = 11
+
+
+def _open_raster(path: Path, spool_dir: Path) -> np.ndarray:
+    """
+    Random-access view of a [H, W, C] raster without holding it in memory.
+
+    Uncompressed TIFFs are memory-mapped in place; anything else is decoded
+    once into a memory-mapped .npy file under `spool_dir`.
+    """
+    try:
+        return tifffile.memmap(path, mode="r")
+    except ValueError:
+        pass
+    with tifffile.TiffFile(path) as tif:
+        shape, dtype = tif.series[0].shape, tif.series[0].dtype
+    out = np.lib.format.open_memmap(spool_dir / f"{path.stem}.npy", mode="w+", dtype=dtype, shape=shape)
+    tifffile.imread(path, out=out)
+    return out
+
+
+class SceneReader:
+    """
+    Windowed reader over a 12-month S1/S2 stack of arbitrary size.
+
+    Files follow the chip naming (`<scene_id>_S1_MM.tif`, `<scene_id>_S2_MM.tif`)
+    but may be any height and width, as long as all months agree.
+    """
+
+    def __init__(self, scene_dir: Path, scene_id: str, spool_dir: Path):
+        self.scene_id = scene_id
+        self.s1: List[Optional[np.ndarray]] = []
+        self.s2: List[Optional[np.ndarray]] = []
+        for month in range(12):
+            s1_path = Path(scene_dir) / f"{scene_id}_S1_{month:0>2}.tif"
+            s2_path = Path(scene_dir) / f"{scene_id}_S2_{month:0>2}.tif"
+            self.s1.append(_open_raster(s1_path, spool_dir) if s1_path.is_file() else None)
+            self.s2.append(_open_raster(s2_path, spool_dir) if s2_path.is_file() else None)
+
+        shapes = {img.shape[:2] for img in self.s1 + self.s2 if img is not None}
+        if not shapes:
+            raise FileNotFoundError(f"No S1/S2 files for scene {scene_id} in {scene_dir}")
+        if len(shapes) > 1:
+            raise ValueError(f"Scene {scene_id} months differ in size: {sorted(shapes)}")
+        self.shape = shapes.pop()
+        self.mask = _valid_mask([s1 is None and s2 is None for s1, s2 in zip(self.s1, self.s2)])
+
+    def read_window(self, y: int, x: int, tile: int) -> np.ndarray:
+        """Normalized [T, C, tile, tile] window at (y, x), zero-padded past the scene edge."""
+        h = min(tile, self.shape[0] - y)
+        w = min(tile, self.shape[1] - x)
+        window = np.zeros((12, S1_BANDS + S2_BANDS, tile, tile), dtype=np.float32)
+        for month in range(12):
+            if self.s1[month] is not None:
+                normalize_s1(self.s1[month][y:y + h, x:x + w], window[month, :S1_BANDS, :h, :w])
+            if self.s2[month] is not None:
+                normalize_s2(self.s2[month][y:y + h, x:x + w], window[month, S1_BANDS:, :h, :w])
+        return window
+
+
+def blend_window(tile: int) -> np.ndarray:
+    """2D Hann weights that favour window centres; strictly positive so scene edges keep weight."""
+    hann = np.hanning(tile + 2)[1:-1]
+    return np.outer(hann, hann).astype(np.float32)
+
+
+def window_positions(length: int, tile: int, stride: int) -> List[int]:
+    """Window offsets covering [0, length); the last window is aligned to the end."""
+    if length <= tile:
+        return [0]
+    positions = list(range(0, length - tile + 1, stride))
+    if positions[-1] != length - tile:
+        positions.append(length - tile)
+    return positions
+
+
+def _write_normalized(path: Path, acc: np.ndarray, weights: np.ndarray, tile: int) -> Dict:
+    """Write acc / weights as a tiled float32 TIFF one tile at a time; returns its stats."""
+    height, width = acc.shape
+    stats = {"min": float("inf"), "max": float("-inf"), "sum": 0.0, "sum_sq": 0.0}
+
+    def tiles():
+        for y in range(0, height, tile):
+            for x in range(0, width, tile):
+                block = acc[y:y + tile, x:x + tile] / weights[y:y + tile, x:x + tile]
+                stats["min"] = min(stats["min"], float(block.min()))
+                stats["max"] = max(stats["max"], float(block.max()))
+                stats["sum"] += float(block.sum(dtype=np.float64))
+                stats["sum_sq"] += float(np.square(block, dtype=np.float64).sum())
+                padded = np.zeros((tile, tile), dtype=np.float32)
+                padded[:block.shape[0], :block.shape[1]] = block
+                yield padded
+
+    tifffile.imwrite(path, tiles(), shape=(height, width), dtype=np.float32, tile=(tile, tile))
+
+    n = height * width
+    mean = stats["sum"] / n
+    return {
+        "min": stats["min"],
+        "max": stats["max"],
+        "mean": mean,
+        "std": float(np.sqrt(max(stats["sum_sq"] / n - mean * mean, 0.0)))
+    }
+
+
+@torch.no_grad()
+def predict_scene(
+    predictor,
+    scene_dir: Path,
+    scene_id: str,
+    output_dir: Path,
+    model_names: Optional[List[str]] = None,
+    overlap: int = 64,
+    batch_size: int = 8,
+    ntta: int = 1,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict:
+    """
+    Sliding-window prediction over a whole scene, written as one float32 TIFF per model.
+
+    Windows of `IMG_SIZE` are read lazily, run through each model in batches
+    of `batch_size`, weighted by a Hann window and accumulated into
+    disk-backed arrays, so memory is bounded by the window batch rather than
+    the scene size. `progress(done, total)` is called after every batch.
+    """
+    tile = IMG_SIZE[0]
+    if not 0 <= overlap < tile:
+        raise ValueError(f"overlap must be in [0, {tile}), got {overlap}")
+    if model_names is None:
+        model_names = predictor.available_models()
+    if not model_names:
+        raise ValueError("No models available for scene prediction")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".scene-") as work_dir:
+        work_dir = Path(work_dir)
+        reader = SceneReader(scene_dir, scene_id, work_dir)
+        height, width = reader.shape
+        weight = blend_window(tile)
+        stride = tile - overlap
+        windows = [(y, x) for y in window_positions(height, tile, stride)
+                   for x in window_positions(width, tile, stride)]
+
+        weights = np.lib.format.open_memmap(work_dir / "weights.npy", mode="w+", dtype=np.float32, shape=(height, width))
+        accs = {
+            name: np.lib.format.open_memmap(work_dir / f"acc{i}.npy", mode="w+", dtype=np.float32, shape=(height, width))
+            for i, name in enumerate(model_names)
+        }
+
+        for start in range(0, len(windows), batch_size):
+            batch = windows[start:start + batch_size]
+            images = torch.from_numpy(np.stack([reader.read_window(y, x, tile) for y, x in batch]))
+            masks = torch.from_numpy(reader.mask).unsqueeze(0).repeat(len(batch), 1)
+            images, masks = images.to(predictor.device), masks.to(predictor.device)
+
+            for name in model_names:
+                preds = predictor.run_model(name, images, masks, ntta=ntta)
+                for pred, (y, x) in zip(preds, batch):
+                    h, w = min(tile, height - y), min(tile, width - x)
+                    accs[name][y:y + h, x:x + w] += pred[:h, :w] * weight[:h, :w]
+            for y, x in batch:
+                h, w = min(tile, height - y), min(tile, width - x)
+                weights[y:y + h, x:x + w] += weight[:h, :w]
+
+            if progress is not None:
+                progress(min(start + batch_size, len(windows)), len(windows))
+
+        outputs = {}
+        for name in model_names:
+            path = output_dir / f"{scene_id}_{name.replace(' ', '_')}_prediction.tif"
+            stats = _write_normalized(path, accs[name], weights, tile)
+            outputs[name] = {"path": str(path), "stats": stats}
+        del accs, weights
+
+    return {
+        "scene_id": scene_id,
+        "shape": [height, width],
+        "windows": len(windows),
+        "overlap": overlap,
+        "ntta": ntta,
+        "outputs": outputs,
+        "processing_time": time.time() - start_time
+    }
+
+
+def parse_args(args=None):
+    p = argparse.ArgumentParser(description="Sliding-window biomass prediction over a large scene")
+    p.add_argument("--scene-dir", type=str, required=True, help="directory with <scene-id>_S{1,2}_MM.tif files")
+    p.add_argument("--scene-id", type=str, required=True)
+    p.add_argument("--model-path", type=str, nargs="+", required=True, help="checkpoint(s) to run")
+    p.add_argument("--output-dir", type=str, default="scene_predictions")
+    p.add_argument("--overlap", type=int, default=64, help="pixels shared by neighbouring windows")
+    p.add_argument("--batch-size", type=int, default=8, help="windows per forward pass")
+    p.add_argument("--ntta", type=int, default=1)
+    return p.parse_args(args=args)
+
+
+def main():
+    from inference import BiomassPredictor
+
+    args = parse_args()
+    configs = [
+        {"name": Path(path).parent.name, "path": path, "backbone": ""}
+        for path in args.model_path
+    ]
+    predictor = BiomassPredictor(configs)
+
+    def report(done, total):
+        print(f"\r{done}/{total} windows", end="", flush=True)
+
+    result = predict_scene(
+        predictor,
+        Path(args.scene_dir),
+        args.scene_id,
+        Path(args.output_dir),
+        overlap=args.overlap,
+        batch_size=args.batch_size,
+        ntta=args.ntta,
+        progress=report
+    )
+    print()
+    for name, output in result["outputs"].items():
+        stats = output["stats"]
+        print(f"{name}: {output['path']}  mean {stats['mean']:.2f}  min {stats['min']:.2f}  max {stats['max']:.2f}")
+    print(f"{result['shape'][0]}x{result['shape'][1]} scene, {result['windows']} windows "
+          f"in {result['processing_time']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from dataset import predict_tta
+
+
+def _load_worker_model(payload):
+    # Memory-mapped checkpoints are mapped again here so the page cache is shared
+    if isinstance(payload, str):
+        from checkpoints import load_checkpoint
+        from models import load_from_checkpoint
+        return load_from_checkpoint(load_checkpoint(payload))
+    return payload
+
+
+def _worker_main(worker_id: int, models: Dict, batched_tta: bool, num_threads: int, requests, responses):
+    """Inference loop of a pool process; models arrive as shared-memory tensors or weight file paths."""
+    torch.set_num_threads(num_threads)
+    models = {name: _load_worker_model(payload) for name, payload in models.items()}
+
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break
+
+        kind = msg[0]
+        if kind == "model":
+            _, name, payload = msg
+            models[name] = _load_worker_model(payload)
+            continue
+        if kind == "drop":
+            models.pop(msg[1], None)
+            continue
+
+        _, job_id, model_name, images, masks, ntta = msg
+        try:
+            with torch.no_grad():
+                pred = predict_tta([models[model_name]], images, masks, ntta=ntta, batched=batched_tta)
+            if pred.ndim == 4 and pred.shape[1] == 1:
+                pred = pred[:, 0, ...]
+            responses.put((job_id, worker_id, pred.numpy(), None))
+        except Exception as e:
+            responses.put((job_id, worker_id, None, f"{type(e).__name__}: {e}"))
+
+
+@dataclass
+class _WorkerState:
+    worker_id: int
+    process: mp.Process
+    requests: object
+    outstanding: int = 0
+    completed: int = 0
+    failed: int = 0
+    restarts: int = 0
+    retired: bool = False
+    last_model: Optional[str] = None
+    models_served: Dict[str, int] = field(default_factory=dict)
+
+
+class InferenceWorkerPool:
+    """
+    Pool of inference processes sharing one copy of the model weights.
+
+    Models are moved to shared memory (`Module.share_memory()`) in the API
+    process and handed to the workers, which map the same pages instead of
+    loading their own copies. Models loaded from a memory-mapped safetensors
+    file (see `weights_paths`) are instead mapped from that file by each
+    worker, sharing the page cache. Each request goes to the least-loaded live
+    worker, preferring one that last ran the same model.
+
+    Worker liveness is checked on every dispatcher iteration: the jobs of a
+    worker that died fail immediately and the worker is restarted, up to
+    `max_restarts` times, after which it is retired and the pool runs degraded.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, torch.nn.Module],
+        num_workers: int = 2,
+        batched_tta: bool = True,
+        threads_per_worker: Optional[int] = None,
+        start_method: str = "spawn",
+        weights_paths: Optional[Dict[str, str]] = None,
+        max_restarts: int = 3,
+        poll_interval: float = 0.1
+    ):
+        self.num_workers = max(1, int(num_workers))
+        self.batched_tta = batched_tta
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.start_method = start_method
+        self.max_restarts = max_restarts
+        self.poll_interval = poll_interval
+
+        self._models: Dict[str, torch.nn.Module] = dict(models)
+        self._weights_paths: Dict[str, str] = dict(weights_paths or {})
+        self._shared: Set[str] = set()
+        self._ctx = mp.get_context(start_method)
+        self._responses = None
+        self._workers: Dict[int, _WorkerState] = {}
+        self._futures: Dict[int, Future] = {}
+        self._job_worker: Dict[int, int] = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self):
+        """Share the model weights and spawn the worker processes."""
+        if self._running:
+            return
+
+        payloads = {name: self._payload(name, model) for name, model in self._models.items()}
+        self._shared.update(payloads)
+
+        self._responses = self._ctx.Queue()
+        for worker_id in range(self.num_workers):
+            process, requests = self._spawn(worker_id, payloads)
+            self._workers[worker_id] = _WorkerState(worker_id=worker_id, process=process, requests=requests)
+
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch_responses, name="worker-pool-dispatcher", daemon=True)
+        self._dispatcher.start()
+        print(f"Started {self.num_workers} inference workers ({self.threads_per_worker} threads each)")
+
+    def _spawn(self, worker_id: int, payloads: Dict):
+        """Start one worker process; returns it with its request queue."""
+        requests = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, payloads, self.batched_tta, self.threads_per_worker,
+                  requests, self._responses),
+            daemon=True,
+            name=f"inference-worker-{worker_id}"
+        )
+        process.start()
+        return process, requests
+
+    def stop(self, timeout: float = 5.0):
+        """Ask workers to exit, then terminate any that do not."""
+        if not self._running:
+            return
+        self._running = False
+
+        for state in self._workers.values():
+            if state.retired:
+                continue
+            try:
+                state.requests.put(None)
+            except Exception:
+                pass
+        for state in self._workers.values():
+            state.process.join(timeout)
+            if state.process.is_alive():
+                state.process.terminate()
+            # Messages a dead worker never read must not block interpreter exit
+            state.requests.cancel_join_thread()
+
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+            self._dispatcher = None
+
+        with self._lock:
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Worker pool stopped"))
+            self._futures.clear()
+            self._job_worker.clear()
+        self._workers.clear()
+
+    def _payload(self, name: str, model: torch.nn.Module):
+        """What a worker receives for a model: its weight file path, or the shared module."""
+        if self._weights_paths.get(name):
+            return self._weights_paths[name]
+        model.share_memory()
+        return model
+
+    def ensure_model(self, name: str, model: torch.nn.Module, weights_path: Optional[str] = None):
+        """Make a model loaded after start() available to all workers."""
+        with self._lock:
+            if name in self._shared:
+                return
+            if weights_path is not None:
+                self._weights_paths[name] = weights_path
+            payload = self._payload(name, model)
+            self._models[name] = model
+            self._shared.add(name)
+            for state in self._workers.values():
+                state.requests.put(("model", name, payload))
+
+    def drop_model(self, name: str):
+        """Release a model evicted by the registry; queued jobs for it still run first."""
+        with self._lock:
+            if name not in self._shared:
+                return
+            self._shared.discard(name)
+            self._models.pop(name, None)
+            self._weights_paths.pop(name, None)
+            for state in self._workers.values():
+                state.requests.put(("drop", name))
+    
+    def _pick_worker(self, model_name: str) -> _WorkerState:
+        alive = [w for w in self._workers.values() if not w.retired and w.process.is_alive()]
+        if not alive:
+            raise RuntimeError("No live inference workers")
+        return min(alive, key=lambda w: (w.outstanding, w.last_model != model_name, w.worker_id))
+
+    def submit(self, model_name: str, images: torch.Tensor, masks: torch.Tensor, ntta: int = 1) -> Future:
+        """Route a batch to a worker; the future resolves to [B, H, W] predictions."""
+        if not self._running:
+            raise RuntimeError("Worker pool is not running")
+
+        future: Future = Future()
+        with self._lock:
+            if model_name not in self._shared:
+                raise KeyError(f"Model {model_name} is not shared with the worker pool")
+            worker = self._pick_worker(model_name)
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+            self._job_worker[job_id] = worker.worker_id
+            worker.outstanding += 1
+            worker.last_model = model_name
+            worker.models_served[model_name] = worker.models_served.get(model_name, 0) + 1
+
+        worker.requests.put(("predict", job_id, model_name, images.cpu(), masks.cpu(), ntta))
+        return future
+
+    def run_model(self, model_name: str, images: torch.Tensor, masks: torch.Tensor, ntta: int = 1) -> np.ndarray:
+        """Blocking version of submit(), matching BiomassPredictor.run_model."""
+        return self.submit(model_name, images, masks, ntta).result()
+
+    def _dispatch_responses(self):
+        while self._running or self._futures:
+            try:
+                self._handle_response(self._responses.get(timeout=self.poll_interval))
+            except queue.Empty:
+                if not self._running:
+                    break
+            except (EOFError, OSError):
+                break
+            if self._running:
+                self._check_workers()
+
+    def _handle_response(self, msg):
+        job_id, worker_id, pred, error = msg
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            self._job_worker.pop(job_id, None)
+            state = self._workers.get(worker_id)
+            if state is not None and future is not None:
+                state.outstanding -= 1
+                if error is None:
+                    state.completed += 1
+                else:
+                    state.failed += 1
+
+        if future is None or future.done():
+            return
+        if error is None:
+            future.set_result(pred)
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _check_workers(self):
+        """Fail the jobs of workers that died, then restart or retire them."""
+        dead = [w for w in self._workers.values() if not w.retired and not w.process.is_alive()]
+        if not dead:
+            return
+
+        # Results a worker sent before it died are still delivered
+        while True:
+            try:
+                self._handle_response(self._responses.get_nowait())
+            except queue.Empty:
+                break
+
+        restart = []
+        with self._lock:
+            for state in dead:
+                exitcode = state.process.exitcode
+                for job_id, worker_id in list(self._job_worker.items()):
+                    if worker_id != state.worker_id:
+                        continue
+                    del self._job_worker[job_id]
+                    future = self._futures.pop(job_id, None)
+                    state.outstanding -= 1
+                    state.failed += 1
+                    if future is not None and not future.done():
+                        future.set_exception(RuntimeError(
+                            f"Inference worker {state.worker_id} died (exit code {exitcode})"
+                        ))
+                state.requests.cancel_join_thread()
+
+                if state.restarts >= self.max_restarts:
+                    state.retired = True
+                    print(f"Inference worker {state.worker_id} died (exit code {exitcode}); "
+                          f"retired after {state.restarts} restarts")
+                else:
+                    restart.append((state, exitcode))
+            payloads = {name: self._payload(name, self._models[name]) for name in self._shared}
+
+        # Dead workers are never picked, so they are replaced outside the lock
+        for state, exitcode in restart:
+            process, requests = self._spawn(state.worker_id, payloads)
+            with self._lock:
+                state.process = process
+                state.requests = requests
+                state.restarts += 1
+                state.last_model = None
+                # Catch up on models shared or dropped while it was starting
+                for name in self._shared - payloads.keys():
+                    requests.put(("model", name, self._payload(name, self._models[name])))
+                for name in payloads.keys() - self._shared:
+                    requests.put(("drop", name))
+            print(f"Inference worker {state.worker_id} died (exit code {exitcode}); restarted")
+
+    def get_stats(self) -> Dict:
+        """Per-worker load and the size of the shared weights."""
+        shared_bytes = sum(
+            t.numel() * t.element_size()
+            for name in self._shared
+            for t in itertools.chain(self._models[name].parameters(), self._models[name].buffers())
+        )
+        return {
+            "running": self._running,
+            "num_workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "start_method": self.start_method,
+            "shared_models": sorted(self._shared),
+            "shared_weight_bytes": shared_bytes,
+            "degraded": any(w.retired for w in self._workers.values()),
+            "workers": [
+                {
+                    "id": w.worker_id,
+                    "pid": w.process.pid,
+                    "alive": w.process.is_alive(),
+                    "outstanding": w.outstanding,
+                    "completed": w.completed,
+                    "failed": w.failed,
+                    "restarts": w.restarts,
+                    "retired": w.retired,
+                    "models_served": dict(w.models_served)
+                }
+                for w in self._workers.values()
+            ]
+        }
@@ -3,6 +3,7 @@
 
 import argparse
 import os
+import time
 from pathlib import Path
 
 os.environ["MKL_NUM_THREADS"] = "1"
@@ -16,7 +17,10 @@ import torch.utils.data
 import tqdm
 import PIL.Image as Image
 
+import checkpoints
+import chip_store
 import dataset
+import quantization
 
 
 def parse_args(args=None):
@@ -39,9 +43,13 @@ def parse_args(args=None):
                    help="fallback extension if suffix file not found")
 
     p.add_argument("--num-workers", type=int, default=8, help="number of data loader workers")
+    p.add_argument("--decode-threads", type=int, default=None,
+                   help="threads per loader worker decoding a chip's monthly TIFFs (default: cores / workers)")
     p.add_argument("--batch-size", type=int, default=32, help="batch size")
     p.add_argument("--tta", type=int, default=1, help="tta")
     p.add_argument("--img-size", type=int, nargs=2, default=dataset.IMG_SIZE)
+    p.add_argument("--chip-store", type=str, default=None,
+                   help="packed chip store from chip_store.py (falls back to TIFFs for missing chips)")
 
     # Output handling
     p.add_argument("--save-pred-tiff", action="store_true",
@@ -59,7 +67,18 @@ def parse_args(args=None):
     p.add_argument("--clip-pred", type=float, nargs=2, default=None,
                    help="clip prediction to [min max], e.g. --clip-pred 0 300")
 
-    return p.parse_args(args=args)
+    # int8 quantization (evaluated side by side with the float model)
+    p.add_argument("--quantize", type=str, default=None, choices=quantization.QUANT_MODES,
+                   help="also evaluate an int8 copy of the model")
+    p.add_argument("--calib-dir", type=str, default=None,
+                   help="chips used for calibration; required with --quantize, chips in the test split are skipped")
+    p.add_argument("--calib-chips", type=int, default=16,
+                   help="number of chips used for static calibration")
+
+    parsed = p.parse_args(args=args)
+    if parsed.quantize is not None and parsed.calib_dir is None:
+        p.error("--quantize needs --calib-dir with chips outside the test split")
+    return parsed
 
 
 def _load_float_raster(path: Path) -> np.ndarray:
@@ -156,32 +175,118 @@ def _regression_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
     }
 
 
+def _summary_lines(per_chip_df: pd.DataFrame, global_y_true: list, global_y_pred: list):
+    """Macro/micro summary lines plus the metrics used for comparisons."""
+    valid = per_chip_df[per_chip_df.get("error", "") == ""].copy()
+    summary_lines = []
+    summary_lines.append(f"Valid chips: {len(valid)} / {len(per_chip_df)}")
+    macro, micro = {}, {}
+
+    if len(valid) > 0:
+        # Macro = mean of chip metrics
+        macro = {
+            "rmse": float(valid["rmse"].mean()),
+            "mae": float(valid["mae"].mean()),
+            "bias": float(valid["bias"].mean()),
+            "r2": float(valid["r2"].mean(skipna=True)),
+            "pearson_r": float(valid["pearson_r"].mean(skipna=True)),
+            "spearman_rho": float(valid["spearman_rho"].mean(skipna=True)),
+        }
+
+        # Micro = metrics over all pixels stacked
+        y_true_all = np.concatenate(global_y_true, axis=0) if len(global_y_true) else np.array([], dtype=np.float32)
+        y_pred_all = np.concatenate(global_y_pred, axis=0) if len(global_y_pred) else np.array([], dtype=np.float32)
+
+        micro = _regression_metrics(y_true_all, y_pred_all) if len(y_true_all) else {}
+
+        summary_lines.append("")
+        summary_lines.append("MACRO (mean over chips):")
+        summary_lines.append(f"  RMSE       : {macro['rmse']:.6f}")
+        summary_lines.append(f"  MAE        : {macro['mae']:.6f}")
+        summary_lines.append(f"  Bias       : {macro['bias']:.6f}   (pred - true)")
+        summary_lines.append(f"  R^2        : {macro['r2']:.6f}")
+        summary_lines.append(f"  Pearson r  : {macro['pearson_r']:.6f}")
+        summary_lines.append(f"  Spearman p : {macro['spearman_rho']:.6f}")
+
+        if micro:
+            summary_lines.append("")
+            summary_lines.append("MICRO (global over all pixels):")
+            summary_lines.append(f"  N          : {micro['n']}")
+            summary_lines.append(f"  RMSE       : {micro['rmse']:.6f}")
+            summary_lines.append(f"  MAE        : {micro['mae']:.6f}")
+            summary_lines.append(f"  Bias       : {micro['bias']:.6f}   (pred - true)")
+            summary_lines.append(f"  R^2        : {micro['r2']:.6f}")
+            summary_lines.append(f"  Pearson r  : {micro['pearson_r']:.6f}")
+            summary_lines.append(f"  Spearman p : {micro['spearman_rho']:.6f}")
+
+    return summary_lines, macro, micro
+
+
+def _comparison_lines(reports: dict) -> list:
+    """Float vs int8 table: accuracy deltas next to latency and size savings."""
+    base = reports["float"]
+    lines = ["QUANTIZATION REPORT (int8 vs float, RMSE / R^2 over all pixels)", ""]
+    lines.append(f"{'variant':10s} {'size MB':>9s} {'ms/chip':>9s} {'RMSE':>10s} {'R^2':>10s} "
+                 f"{'dRMSE':>10s} {'dR^2':>10s}")
+    for name, rep in reports.items():
+        rmse = rep["micro"].get("rmse", float("nan"))
+        r2 = rep["micro"].get("r2", float("nan"))
+        lines.append(
+            f"{name:10s} {rep['size_bytes'] / 2**20:9.2f} {rep['ms_per_chip']:9.2f} {rmse:10.4f} {r2:10.4f} "
+            f"{rmse - base['micro'].get('rmse', float('nan')):+10.4f} "
+            f"{r2 - base['micro'].get('r2', float('nan')):+10.4f}"
+        )
+    for name, rep in reports.items():
+        if name == "float":
+            continue
+        lines.append("")
+        lines.append(f"{name}: size {rep['size_bytes'] / base['size_bytes']:.1%} of float, "
+                     f"latency {rep['ms_per_chip'] / base['ms_per_chip']:.1%} of float")
+    return lines
+
+
 def main():
     args = parse_args()
     print(args)
 
     # Checkpoint'i yükle
-    checkpoint = torch.load(args.model_path, weights_only=False)
+    checkpoint = checkpoints.load_checkpoint(args.model_path)
     
-    # Model mimarisini oluştur
-    from models import UnetVFLOW
-    model = UnetVFLOW(checkpoint['args'])
-    
-    # Ağırlıkları yükle
-    model.load_state_dict(checkpoint['state_dict'])
-    model = model.eval()
-    models = [model]
+    # Model mimarisini oluştur ve ağırlıkları yükle (pretrained indirme olmadan)
+    from models import load_from_checkpoint
+    start_time = time.perf_counter()
+    model = load_from_checkpoint(checkpoint)
+    print(f"Built {checkpoint['args'].backbone} in {time.perf_counter() - start_time:.2f}s")
 
     df = pd.read_csv(args.test_df)
     test_df = df[df.split == "test"].copy()
     test_df = test_df.groupby("chip_id").agg(list).reset_index()
 
+    # Model variants evaluated on the same batches; "float" is always first
+    variants = {"float": [model]}
+    if args.quantize is not None:
+        # Calibrating on evaluated chips would flatter the int8 metrics
+        calib_dir = Path(args.calib_dir)
+        calib_ids = quantization.calibration_chip_ids(calib_dir, exclude=test_df.chip_id)
+        if not calib_ids:
+            raise SystemExit(f"No chips in {calib_dir} outside the test split to calibrate on")
+        batches = quantization.calibration_batches(calib_dir, chip_ids=calib_ids, num_chips=args.calib_chips)
+        int8_model, calibrated = quantization.quantize_model(model, args.quantize, batches)
+        print(f"Calibrated static int8 encoder on {calibrated} chips")
+        variants["int8"] = [int8_model]
+
     test_images_dir = Path(args.test_images_dir)
     gt_dir = Path(args.gt_dir)
 
-    test_dataset = dataset.DS(df=test_df, dir_features=test_images_dir)
+    store = chip_store.open_store(args.chip_store)
+    if args.chip_store and store is None:
+        print(f"No chip store at {args.chip_store}, reading TIFFs")
+    test_dataset = dataset.DS(df=test_df, dir_features=test_images_dir, store=store)
 
     args.num_workers = min(args.num_workers, args.batch_size, 8)
+    if args.decode_threads is None:
+        args.decode_threads = max(1, (os.cpu_count() or 1) // max(1, args.num_workers))
+    dataset.set_decode_threads(args.decode_threads)
 
     test_loader = torch.utils.data.DataLoader(
         test_dataset,
@@ -198,12 +303,15 @@ def main():
     out_dir = Path(args.out_dir)
     out_dir.mkdir(exist_ok=True, parents=True)
 
-    per_chip_rows = []
-    scatter_rows = []
+    # Per-variant accumulators
+    per_chip_rows = {name: [] for name in variants}
+    scatter_rows = {name: [] for name in variants}
+    inference_time = {name: 0.0 for name in variants}
+    n_chips = 0
 
     # For global (micro) metrics
-    global_y_true = []
-    global_y_pred = []
+    global_y_true = {name: [] for name in variants}
+    global_y_pred = {name: [] for name in variants}
 
     with torch.no_grad():
         with tqdm.tqdm(test_loader, leave=False, mininterval=2) as pbar:
@@ -211,156 +319,153 @@ def main():
                 #images = images.cuda(non_blocking=True)
                 #mask = mask.cuda(non_blocking=True)
 
-                pred = dataset.predict_tta(models, images, mask, ntta=args.tta)
-                # pred expected shape: (B,1,H,W) or (B,H,W)
-                if pred.ndim == 4 and pred.shape[1] == 1:
-                    pred = pred[:, 0, ...]  # (B,H,W)
+                preds = {}
+                for name, models in variants.items():
+                    start_time = time.perf_counter()
+                    pred = dataset.predict_tta(models, images, mask, ntta=args.tta)
+                    inference_time[name] += time.perf_counter() - start_time
+                    # pred expected shape: (B,1,H,W) or (B,H,W)
+                    if pred.ndim == 4 and pred.shape[1] == 1:
+                        pred = pred[:, 0, ...]  # (B,H,W)
 
-                pred_np = pred.detach().float().cpu().numpy()  # (B,H,W)
+                    preds[name] = pred.detach().float().cpu().numpy()  # (B,H,W)
+                n_chips += len(target)
 
-                for pred_map, chip_id in zip(pred_np, target):
+                for b, chip_id in enumerate(target):
                     chip_id = str(chip_id)
 
-                    # save prediction map
-                    if args.save_pred_tiff:
-                        im = Image.fromarray(pred_map.astype(np.float32))
-                        im.save(out_dir / f"{chip_id}_pred.tif", format="TIFF", save_all=True)
-
-                    # load gt map
+                    # load gt map (packed store first, then files)
+                    gt_stored = store.agbm(chip_id) if store is not None else None
                     gt_path = gt_dir / f"{chip_id}{args.gt_suffix}"
                     if not gt_path.exists():
                         alt = gt_dir / f"{chip_id}.{args.gt_ext}"
                         if alt.exists():
                             gt_path = alt
                         else:
-                            per_chip_rows.append({
+                            gt_path = None
+                    if gt_stored is not None:
+                        gt_raw = np.asarray(gt_stored, dtype=np.float32)
+                    else:
+                        gt_raw = _load_float_raster(gt_path) if gt_path is not None else None
+
+                    for name in variants:
+                        pred_map = preds[name][b]
+                        rows = per_chip_rows[name]
+                        suffix = "" if name == "float" else f"_{name}"
+
+                        # save prediction map
+                        if args.save_pred_tiff:
+                            im = Image.fromarray(pred_map.astype(np.float32))
+                            im.save(out_dir / f"{chip_id}_pred{suffix}.tif", format="TIFF", save_all=True)
+
+                        if gt_raw is None:
+                            rows.append({
                                 "chip_id": chip_id,
                                 "error": f"GT not found: {gt_dir}/{chip_id}{args.gt_suffix} (or .{args.gt_ext})"
                             })
                             continue
-
-                    gt_map = _load_float_raster(gt_path)
-
-                    # align shapes
-                    if gt_map.shape != pred_map.shape:
-                        if args.resize_gt_to_pred:
-                            gt_map = _resize_bilinear(gt_map, pred_map.shape)
-                        else:
-                            per_chip_rows.append({
+                        gt_map = gt_raw
+
+                        # align shapes
+                        if gt_map.shape != pred_map.shape:
+                            if args.resize_gt_to_pred:
+                                gt_map = _resize_bilinear(gt_map, pred_map.shape)
+                            else:
+                                rows.append({
+                                    "chip_id": chip_id,
+                                    "error": f"Shape mismatch gt={gt_map.shape} pred={pred_map.shape}"
+                                })
+                                continue
+
+                        # optional clipping
+                        if args.clip_gt is not None:
+                            gt_map = np.clip(gt_map, args.clip_gt[0], args.clip_gt[1])
+                        if args.clip_pred is not None:
+                            pred_map = np.clip(pred_map, args.clip_pred[0], args.clip_pred[1])
+
+                        # flatten
+                        y_true = gt_map.reshape(-1)
+                        y_pred = pred_map.reshape(-1)
+
+                        # optional NaN/Inf masking
+                        if args.mask_nan_inf:
+                            m = np.isfinite(y_true) & np.isfinite(y_pred)
+                            y_true = y_true[m]
+                            y_pred = y_pred[m]
+
+                        if len(y_true) == 0:
+                            rows.append({
                                 "chip_id": chip_id,
-                                "error": f"Shape mismatch gt={gt_map.shape} pred={pred_map.shape}"
+                                "error": "No valid pixels after masking"
                             })
                             continue
 
-                    # optional clipping
-                    if args.clip_gt is not None:
-                        gt_map = np.clip(gt_map, args.clip_gt[0], args.clip_gt[1])
-                    if args.clip_pred is not None:
-                        pred_map = np.clip(pred_map, args.clip_pred[0], args.clip_pred[1])
-
-                    # flatten
-                    y_true = gt_map.reshape(-1)
-                    y_pred = pred_map.reshape(-1)
-
-                    # optional NaN/Inf masking
-                    if args.mask_nan_inf:
-                        m = np.isfinite(y_true) & np.isfinite(y_pred)
-                        y_true = y_true[m]
-                        y_pred = y_pred[m]
-
-                    if len(y_true) == 0:
-                        per_chip_rows.append({
-                            "chip_id": chip_id,
-                            "error": "No valid pixels after masking"
-                        })
-                        continue
-
-                    # metrics per chip
-                    m = _regression_metrics(y_true, y_pred)
-                    m["chip_id"] = chip_id
-                    m["gt_path"] = str(gt_path)
-                    m["error"] = ""
-                    per_chip_rows.append(m)
-
-                    # collect for global micro metrics
-                    global_y_true.append(y_true.astype(np.float32))
-                    global_y_pred.append(y_pred.astype(np.float32))
-
-                    # scatter sample saving (downsample to keep file small)
-                    # keep at most 5000 points per chip
-                    k = min(5000, len(y_true))
-                    if k > 0:
-                        idx = np.random.choice(len(y_true), size=k, replace=False)
-                        scatter_rows.append(pd.DataFrame({
-                            "chip_id": chip_id,
-                            "y_true": y_true[idx],
-                            "y_pred": y_pred[idx],
-                        }))
-
-                torch.cuda.synchronize()
-
-    per_chip_df = pd.DataFrame(per_chip_rows)
-    per_chip_csv = out_dir / "metrics_per_chip.csv"
-    per_chip_df.to_csv(per_chip_csv, index=False)
-
-    # scatter csv
-    if len(scatter_rows) > 0:
-        scatter_df = pd.concat(scatter_rows, ignore_index=True)
-        scatter_csv = out_dir / "scatter_samples.csv"
-        scatter_df.to_csv(scatter_csv, index=False)
-    else:
-        scatter_csv = None
-
-    # summary (macro + micro)
-    valid = per_chip_df[per_chip_df.get("error", "") == ""].copy()
-    summary_lines = []
-    summary_lines.append(f"Valid chips: {len(valid)} / {len(per_chip_df)}")
-
-    if len(valid) > 0:
-        # Macro = mean of chip metrics
-        macro = {
-            "rmse": float(valid["rmse"].mean()),
-            "mae": float(valid["mae"].mean()),
-            "bias": float(valid["bias"].mean()),
-            "r2": float(valid["r2"].mean(skipna=True)),
-            "pearson_r": float(valid["pearson_r"].mean(skipna=True)),
-            "spearman_rho": float(valid["spearman_rho"].mean(skipna=True)),
+                        # metrics per chip
+                        m = _regression_metrics(y_true, y_pred)
+                        m["chip_id"] = chip_id
+                        m["gt_path"] = str(gt_path)
+                        m["error"] = ""
+                        rows.append(m)
+
+                        # collect for global micro metrics
+                        global_y_true[name].append(y_true.astype(np.float32))
+                        global_y_pred[name].append(y_pred.astype(np.float32))
+
+                        # scatter sample saving (downsample to keep file small)
+                        # keep at most 5000 points per chip
+                        k = min(5000, len(y_true))
+                        if k > 0:
+                            idx = np.random.choice(len(y_true), size=k, replace=False)
+                            scatter_rows[name].append(pd.DataFrame({
+                                "chip_id": chip_id,
+                                "y_true": y_true[idx],
+                                "y_pred": y_pred[idx],
+                            }))
+
+                if torch.cuda.is_available():
+                    torch.cuda.synchronize()
+
+    reports = {}
+    for name, models in variants.items():
+        suffix = "" if name == "float" else f"_{name}"
+
+        per_chip_df = pd.DataFrame(per_chip_rows[name])
+        per_chip_csv = out_dir / f"metrics_per_chip{suffix}.csv"
+        per_chip_df.to_csv(per_chip_csv, index=False)
+
+        # scatter csv
+        if len(scatter_rows[name]) > 0:
+            scatter_df = pd.concat(scatter_rows[name], ignore_index=True)
+            scatter_csv = out_dir / f"scatter_samples{suffix}.csv"
+            scatter_df.to_csv(scatter_csv, index=False)
+        else:
+            scatter_csv = None
+
+        # summary (macro + micro)
+        summary_lines, macro, micro = _summary_lines(per_chip_df, global_y_true[name], global_y_pred[name])
+
+        summary_txt = out_dir / f"metrics_summary{suffix}.txt"
+        summary_txt.write_text("\n".join(summary_lines), encoding="utf-8")
+
+        print(f"[OK] Saved: {per_chip_csv}")
+        if scatter_csv is not None:
+            print(f"[OK] Saved: {scatter_csv}")
+        print(f"[OK] Saved: {summary_txt}")
+
+        reports[name] = {
+            "macro": macro,
+            "micro": micro,
+            "size_bytes": quantization.model_size_bytes(models[0]),
+            "ms_per_chip": 1000.0 * inference_time[name] / max(n_chips, 1),
         }
 
-        # Micro = metrics over all pixels stacked
-        y_true_all = np.concatenate(global_y_true, axis=0) if len(global_y_true) else np.array([], dtype=np.float32)
-        y_pred_all = np.concatenate(global_y_pred, axis=0) if len(global_y_pred) else np.array([], dtype=np.float32)
-
-        micro = _regression_metrics(y_true_all, y_pred_all) if len(y_true_all) else {}
-
-        summary_lines.append("")
-        summary_lines.append("MACRO (mean over chips):")
-        summary_lines.append(f"  RMSE       : {macro['rmse']:.6f}")
-        summary_lines.append(f"  MAE        : {macro['mae']:.6f}")
-        summary_lines.append(f"  Bias       : {macro['bias']:.6f}   (pred - true)")
-        summary_lines.append(f"  R^2        : {macro['r2']:.6f}")
-        summary_lines.append(f"  Pearson r  : {macro['pearson_r']:.6f}")
-        summary_lines.append(f"  Spearman p : {macro['spearman_rho']:.6f}")
-
-        if micro:
-            summary_lines.append("")
-            summary_lines.append("MICRO (global over all pixels):")
-            summary_lines.append(f"  N          : {micro['n']}")
-            summary_lines.append(f"  RMSE       : {micro['rmse']:.6f}")
-            summary_lines.append(f"  MAE        : {micro['mae']:.6f}")
-            summary_lines.append(f"  Bias       : {micro['bias']:.6f}   (pred - true)")
-            summary_lines.append(f"  R^2        : {micro['r2']:.6f}")
-            summary_lines.append(f"  Pearson r  : {micro['pearson_r']:.6f}")
-            summary_lines.append(f"  Spearman p : {micro['spearman_rho']:.6f}")
-
-    summary_txt = out_dir / "metrics_summary.txt"
-    summary_txt.write_text("\n".join(summary_lines), encoding="utf-8")
-
-    print(f"[OK] Saved: {per_chip_csv}")
-    if scatter_csv is not None:
-        print(f"[OK] Saved: {scatter_csv}")
-    print(f"[OK] Saved: {summary_txt}")
+    if len(reports) > 1:
+        report_lines = _comparison_lines(reports)
+        report_txt = out_dir / "quantization_report.txt"
+        report_txt.write_text("\n".join(report_lines), encoding="utf-8")
+        print("\n".join(report_lines))
+        print(f"[OK] Saved: {report_txt}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import struct
+from pathlib import Path, PurePath
+from typing import Dict, Tuple
+
+import torch
+
+# safetensors dtype codes -> torch dtypes
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def converted_paths(checkpoint_path) -> Tuple[Path, Path]:
+    """The `.safetensors` weights file and `.json` config written next to a checkpoint."""
+    path = Path(checkpoint_path)
+    return path.with_suffix(".safetensors"), path.with_suffix(".json")
+
+
+def resolve_checkpoint(checkpoint_path) -> Path:
+    """Prefer the converted safetensors weights over the pickle checkpoint when present."""
+    path = Path(checkpoint_path)
+    if path.suffix == ".safetensors":
+        return path
+    weights_path, config_path = converted_paths(path)
+    if weights_path.exists() and config_path.exists():
+        return weights_path
+    return path
+
+
+def _json_arg(name: str, value):
+    """A training arg as a JSON value; types JSON cannot carry faithfully are rejected."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, PurePath):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [_json_arg(name, item) for item in value]
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _json_arg(f"{name}.{k}", v) for k, v in value.items()}
+    raise TypeError(f"Checkpoint arg '{name}' has unsupported type {type(value).__name__}: {value!r}")
+
+
+def convert_checkpoint(checkpoint_path, output_dir=None) -> Tuple[Path, Path]:
+    """
+    Write a pickle checkpoint's weights as safetensors plus its args as JSON.
+
+    Only `state_dict` and `args` are kept; optimizer and scheduler state are
+    dropped. Returns the (weights, config) paths.
+    """
+    from safetensors.torch import save_file
+
+    checkpoint_path = Path(checkpoint_path)
+    checkpoint = torch.load(checkpoint_path, weights_only=False, map_location="cpu")
+    weights_path, config_path = converted_paths(checkpoint_path)
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        weights_path = output_dir / weights_path.name
+        config_path = output_dir / config_path.name
+
+    # Paths become strings and tuples lists; anything else unknown fails the conversion
+    args = {name: _json_arg(name, value) for name, value in vars(checkpoint['args']).items()}
+
+    # safetensors refuses aliased storage, so every tensor gets its own copy
+    state_dict = {k: v.detach().contiguous().clone() for k, v in checkpoint['state_dict'].items()}
+    save_file(state_dict, str(weights_path), metadata={"source": checkpoint_path.name})
+
+    config = {"args": args, "source": checkpoint_path.name}
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=2)
+    return weights_path, config_path
+
+
+def mmap_safetensors(weights_path) -> Dict[str, torch.Tensor]:
+    """
+    Map a safetensors file and return views into it, without reading the data.
+
+    The file is mapped copy-on-write, so processes loading the same file share
+    its page-cache pages and nothing is ever written back.
+    """
+    weights_path = Path(weights_path)
+    with open(weights_path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+    header.pop("__metadata__", None)
+
+    data_start = 8 + header_size
+    storage = torch.UntypedStorage.from_file(str(weights_path), shared=False, nbytes=os.path.getsize(weights_path))
+
+    state_dict = {}
+    for name, entry in header.items():
+        dtype = SAFETENSORS_DTYPES[entry["dtype"]]
+        begin, end = entry["data_offsets"]
+        shape = entry["shape"]
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        offset = data_start + begin
+        if offset % itemsize:
+            # Misaligned for a zero-copy view; fall back to copying this tensor
+            raw = torch.empty(0, dtype=torch.uint8).set_(storage, offset, (end - begin,))
+            state_dict[name] = raw.clone().view(dtype).reshape(shape)
+            continue
+        tensor = torch.empty(0, dtype=dtype)
+        tensor.set_(storage, offset // itemsize, shape)
+        state_dict[name] = tensor
+    return state_dict
+
+
+def load_checkpoint(checkpoint_path, device="cpu") -> Dict:
+    """
+    Load `{'args', 'state_dict'}` for a model.
+
+    Converted checkpoints are memory-mapped; a plain pickle checkpoint is only
+    read when no conversion exists next to it.
+    """
+    path = resolve_checkpoint(checkpoint_path)
+    if path.suffix != ".safetensors":
+        print(f"No safetensors conversion for {path}, reading pickle checkpoint")
+        checkpoint = torch.load(path, weights_only=False, map_location=device, mmap=True)
+        return {"args": checkpoint['args'], "state_dict": checkpoint['state_dict']}
+
+    with open(converted_paths(path)[1]) as f:
+        config = json.load(f)
+    state_dict = mmap_safetensors(path)
+    if torch.device(device).type != "cpu":
+        state_dict = {k: v.to(device) for k, v in state_dict.items()}
+    return {"args": argparse.Namespace(**config["args"]), "state_dict": state_dict}
+
+
+def parse_args(args=None):
+    p = argparse.ArgumentParser(description="Convert pickle checkpoints to safetensors + JSON config")
+    p.add_argument("checkpoints", type=str, nargs="+", help="paths to model_best.pth files")
+    p.add_argument("--output-dir", type=str, default=None, help="write next to each checkpoint if omitted")
+    return p.parse_args(args=args)
+
+
+def main():
+    args = parse_args()
+    for checkpoint_path in args.checkpoints:
+        weights_path, config_path = convert_checkpoint(checkpoint_path, args.output_dir)
+        size_mb = os.path.getsize(weights_path) / 1024 / 1024
+        print(f"{checkpoint_path} -> {weights_path} ({size_mb:.1f} MB), {config_path}")
+
+
+if __name__ == "__main__":
+    main()
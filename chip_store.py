@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import tifffile
+
+STORE_VERSION = 1
+MONTHS = 12
+
+
+class ChipStore:
+    """
+    Packed, memory-mapped store of raw chip rasters.
+
+    One directory holds `s1.npy` [N, 12, H, W, 4], `s2.npy` [N, 12, H, W, 11]
+    and `agbm.npy` [N, H, W] in the dtypes of the source TIFFs, per-month
+    presence flags, and an `index.json` mapping chip_id -> row. Each chip is
+    a contiguous slice of every array, so reading it is a page-cache lookup
+    instead of 24 file opens and TIFF decodes. Arrays are opened lazily, per
+    process, so the store can be handed to DataLoader workers.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "index.json") as f:
+            self.index = json.load(f)
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported chip store version in {self.path}: {self.index.get('version')}")
+        self.rows: Dict[str, int] = {chip_id: i for i, chip_id in enumerate(self.index["chip_ids"])}
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._pid = None
+
+    def __getstate__(self):
+        # Memory maps are reopened in the receiving process rather than pickled
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        state["_pid"] = None
+        return state
+
+    def _open(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None or self._pid != os.getpid():
+            self._arrays = {
+                name: np.load(self.path / f"{name}.npy", mmap_mode="r")
+                for name in ("s1", "s2", "s1_present", "s2_present", "agbm", "agbm_present")
+            }
+            self._pid = os.getpid()
+        return self._arrays
+
+    def __contains__(self, chip_id: str) -> bool:
+        return chip_id in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def chip_ids(self) -> List[str]:
+        return list(self.index["chip_ids"])
+
+    def raw(self, chip_id: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Zero-copy views (s1 [12, H, W, 4], s2 [12, H, W, 11], s1_present [12], s2_present [12])."""
+        arrays = self._open()
+        row = self.rows[chip_id]
+        return arrays["s1"][row], arrays["s2"][row], arrays["s1_present"][row], arrays["s2_present"][row]
+
+    def agbm(self, chip_id: str) -> Optional[np.ndarray]:
+        """Zero-copy view of the chip's AGBM ground truth, or None if it was not ingested."""
+        if chip_id not in self.rows:
+            return None
+        arrays = self._open()
+        row = self.rows[chip_id]
+        return arrays["agbm"][row] if arrays["agbm_present"][row] else None
+
+    def signature(self) -> Tuple:
+        """(filename, mtime_ns, size) of the index and every array; changes when the store is rebuilt."""
+        names = ["index.json"] + [f"{name}.npy" for name in ("s1", "s2", "s1_present", "s2_present", "agbm", "agbm_present")]
+        signature = []
+        for name in names:
+            stat = os.stat(self.path / name)
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def get_stats(self) -> Dict:
+        return {
+            "path": str(self.path),
+            "chips": len(self.rows),
+            "img_size": self.index["img_size"],
+            "bytes": sum((self.path / f"{name}.npy").stat().st_size for name in ("s1", "s2", "agbm"))
+        }
+
+
+def _chip_ids_in(features_dir: Path) -> List[str]:
+    return sorted({f.name.split("_S")[0] for f in features_dir.glob("*_S[12]_*.tif")})
+
+
+def _probe(features_dir: Path, chip_ids: List[str], sensor: str) -> Tuple[Tuple[int, ...], np.dtype]:
+    for chip_id in chip_ids:
+        for month in range(MONTHS):
+            path = features_dir / f"{chip_id}_{sensor}_{month:0>2}.tif"
+            if path.is_file():
+                with tifffile.TiffFile(path) as tif:
+                    return tif.series[0].shape, tif.series[0].dtype
+    raise FileNotFoundError(f"No {sensor} files in {features_dir}")
+
+
+def ingest(
+    features_dir,
+    out_dir,
+    agbm_dir=None,
+    chip_ids: Optional[List[str]] = None,
+    agbm_suffix: str = "_agbm.tif"
+) -> ChipStore:
+    """
+    Pack per-month S1/S2 TIFFs (and optional AGBM maps) into a ChipStore.
+
+    Chips are written one at a time straight into the memory-mapped arrays,
+    so memory use does not grow with the number of chips.
+    """
+    features_dir = Path(features_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if chip_ids is None:
+        chip_ids = _chip_ids_in(features_dir)
+    if not chip_ids:
+        raise FileNotFoundError(f"No chips found in {features_dir}")
+
+    s1_shape, s1_dtype = _probe(features_dir, chip_ids, "S1")
+    s2_shape, s2_dtype = _probe(features_dir, chip_ids, "S2")
+    n = len(chip_ids)
+
+    def create(name, shape, dtype):
+        return np.lib.format.open_memmap(out_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+
+    s1 = create("s1", (n, MONTHS) + tuple(s1_shape), s1_dtype)
+    s2 = create("s2", (n, MONTHS) + tuple(s2_shape), s2_dtype)
+    s1_present = create("s1_present", (n, MONTHS), bool)
+    s2_present = create("s2_present", (n, MONTHS), bool)
+    agbm = create("agbm", (n,) + tuple(s1_shape[:2]), np.float32)
+    agbm_present = create("agbm_present", (n,), bool)
+
+    for row, chip_id in enumerate(chip_ids):
+        for month in range(MONTHS):
+            for sensor, data, present in (("S1", s1, s1_present), ("S2", s2, s2_present)):
+                path = features_dir / f"{chip_id}_{sensor}_{month:0>2}.tif"
+                if path.is_file():
+                    data[row, month] = tifffile.imread(path)
+                    present[row, month] = True
+        if agbm_dir is not None:
+            path = Path(agbm_dir) / f"{chip_id}{agbm_suffix}"
+            if path.is_file():
+                gt = tifffile.imread(path)
+                agbm[row] = gt[..., 0] if gt.ndim == 3 else gt
+                agbm_present[row] = True
+
+    for array in (s1, s2, s1_present, s2_present, agbm, agbm_present):
+        array.flush()
+    del s1, s2, s1_present, s2_present, agbm, agbm_present
+
+    index = {
+        "version": STORE_VERSION,
+        "chip_ids": list(chip_ids),
+        "img_size": list(s1_shape[:2]),
+        "source": str(features_dir)
+    }
+    with open(out_dir / "index.json", "w") as f:
+        json.dump(index, f)
+    return ChipStore(out_dir)
+
+
+def open_store(path) -> Optional[ChipStore]:
+    """Open a chip store if `path` is set and holds one, else None (callers fall back to TIFFs)."""
+    if not path or not (Path(path) / "index.json").is_file():
+        return None
+    return ChipStore(path)
+
+
+def parse_args(args=None):
+    p = argparse.ArgumentParser(description="Pack per-month chip TIFFs into a memory-mapped chip store")
+    p.add_argument("--features-dir", type=str, required=True, help="directory with {chip}_S{1,2}_{mm}.tif")
+    p.add_argument("--agbm-dir", type=str, default=None, help="directory with {chip}_agbm.tif ground truth")
+    p.add_argument("--out", type=str, required=True, help="store directory to create")
+    p.add_argument("--chip-ids", type=str, nargs="*", default=None, help="only ingest these chips")
+    return p.parse_args(args=args)
+
+
+def main():
+    args = parse_args()
+    store = ingest(args.features_dir, args.out, agbm_dir=args.agbm_dir, chip_ids=args.chip_ids)
+    stats = store.get_stats()
+    print(f"Packed {stats['chips']} chips into {stats['path']} ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
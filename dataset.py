@@ -1,4 +1,7 @@
+import os
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import numpy as np
@@ -17,33 +20,96 @@ s2_max = np.array(
 
 IMG_SIZE = (256, 256)
 
-
-def read_imgs(chip_id, data_dir):
-    imgs, mask = [], []
+# Shared pool for per-month TIFF decoding (tifffile releases the GIL)
+_decode_threads = min(8, os.cpu_count() or 1)
+_decode_pool = None
+_decode_pool_pid = None
+_decode_pool_lock = threading.Lock()
+
+
+def set_decode_threads(n):
+    global _decode_threads, _decode_pool
+    with _decode_pool_lock:
+        _decode_threads = max(1, int(n))
+        if _decode_pool is not None:
+            _decode_pool.shutdown(wait=False)
+            _decode_pool = None
+
+
+def _get_decode_pool():
+    global _decode_pool, _decode_pool_pid
+    if _decode_threads <= 1:
+        return None
+    with _decode_pool_lock:
+        # DataLoader workers are forked; a pool inherited that way has no threads
+        if _decode_pool is None or _decode_pool_pid != os.getpid():
+            _decode_pool = ThreadPoolExecutor(max_workers=_decode_threads, thread_name_prefix="decode")
+            _decode_pool_pid = os.getpid()
+        return _decode_pool
+
+
+def _valid_mask(missing):
+    # Months with neither S1 nor S2 are masked out, as in backend/dataset.py;
+    # if every month is missing nothing is masked (attention pooling needs one)
+    mask = np.array(missing, dtype=bool)
+    if mask.all():
+        mask[:] = False
+    return mask
+
+
+def read_imgs_from_store(chip_id, store):
+    s1, s2, s1_present, s2_present = store.raw(chip_id)
+    # Every month needs S1, as when reading TIFFs; only S2 may be missing
+    if not s1_present.all():
+        missing = [month for month in range(12) if not s1_present[month]]
+        raise FileNotFoundError(f"Chip {chip_id} has no S1 data for months {missing} in {store.path}")
+    imgs = np.zeros((12, s1.shape[-1] + s2.shape[-1]) + s1.shape[1:3], dtype="float32")
     for month in range(12):
+        img_s1 = s1[month]
+        m = img_s1 == -9999
+        img_s1 = (img_s1.astype("float32") - s1_min) / s1_mm
+        imgs[month, :s1.shape[-1]] = np.where(m, 0, img_s1).transpose(2, 0, 1)
+        if s2_present[month]:
+            imgs[month, s1.shape[-1]:] = (s2[month].astype("float32") / s2_max).transpose(2, 0, 1)
+
+    mask = _valid_mask(~(s1_present | s2_present))
+
+    return imgs, mask
+
+
+def read_imgs(chip_id, data_dir, store=None):
+    # Packed chip store (see chip_store.py) when it has the chip, else TIFFs
+    if store is not None and chip_id in store:
+        return read_imgs_from_store(chip_id, store)
+
+    imgs = np.empty((12, 4 + 11) + IMG_SIZE, dtype="float32")
+
+    def read_month(month):
         img_s1 = io.imread(data_dir / f"{chip_id}_S1_{month:0>2}.tif")
         m = img_s1 == -9999
         img_s1 = img_s1.astype("float32")
         img_s1 = (img_s1 - s1_min) / s1_mm
-        img_s1 = np.where(m, 0, img_s1)
+        imgs[month, :4] = np.where(m, 0, img_s1).transpose(2, 0, 1)
         filepath = data_dir / f"{chip_id}_S2_{month:0>2}.tif"
         if filepath.is_file():
             img_s2 = io.imread(filepath)
             img_s2 = img_s2.astype("float32")
-            img_s2 = img_s2 / s2_max
+            imgs[month, 4:] = (img_s2 / s2_max).transpose(2, 0, 1)
         else:
-            img_s2 = np.zeros(IMG_SIZE + (11,), dtype="float32")
+            imgs[month, 4:] = 0
 
-        img = np.concatenate([img_s1, img_s2], axis=2)
-        img = np.transpose(img, (2, 0, 1))
-        imgs.append(img)
-        mask.append(False)
+    pool = _get_decode_pool()
+    if pool is None:
+        for month in range(12):
+            read_month(month)
+    else:
+        for future in [pool.submit(read_month, month) for month in range(12)]:
+            future.result()
 
-    mask = np.array(mask)
+    # read_month raises without S1, so every month read has data and none is masked
+    mask = _valid_mask(np.zeros(12, dtype=bool))
 
-    imgs = np.stack(imgs, axis=0)  # [t, c, h, w]
-
-    return imgs, mask
+    return imgs, mask  # [t, c, h, w]
 
 
 def rotate_image(image, angle, rot_pnt, scale=1):
@@ -100,11 +166,12 @@ def train_aug(imgs, mask, target):
 
 
 class DS(torch.utils.data.Dataset):
-    def __init__(self, df, dir_features, dir_labels=None, augs=False):
+    def __init__(self, df, dir_features, dir_labels=None, augs=False, store=None):
         self.df = df
         self.dir_features = dir_features
         self.dir_labels = dir_labels
         self.augs = augs
+        self.store = store
 
     def __len__(self):
         return len(self.df)
@@ -112,9 +179,13 @@ class DS(torch.utils.data.Dataset):
     def __getitem__(self, index):
         item = self.df.iloc[index]
 
-        imgs, mask = read_imgs(item.chip_id, self.dir_features)
+        imgs, mask = read_imgs(item.chip_id, self.dir_features, store=self.store)
         if self.dir_labels is not None:
-            target = io.imread(self.dir_labels / f'{item.chip_id}_agbm.tif')
+            target = self.store.agbm(item.chip_id) if self.store is not None else None
+            if target is None:
+                target = io.imread(self.dir_labels / f'{item.chip_id}_agbm.tif')
+            else:
+                target = np.array(target)
         else:
             target = item.chip_id
 
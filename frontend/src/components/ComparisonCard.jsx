@@ -11,6 +11,10 @@ function ComparisonCard({ modelName, data, onDownload, hasGroundTruth }) {
   const [isExpanded, setIsExpanded] = useState(false)
   const [hoverValue, setHoverValue] = useState(null)
   const [hoverPosition, setHoverPosition] = useState({ x: 0, y: 0 })
+  const [showUncertainty, setShowUncertainty] = useState(false)
+
+  // Ensembles also send the per-pixel spread of their member models
+  const heatmapUrl = showUncertainty && data.uncertainty_heatmap_url ? data.uncertainty_heatmap_url : data.heatmap_url
 
   const handleMouseMove = (e) => {
     const rect = e.target.getBoundingClientRect()
@@ -36,6 +40,18 @@ function ComparisonCard({ modelName, data, onDownload, hasGroundTruth }) {
             <p className="text-sm text-gray-600">{data.backbone}</p>
           </div>
           <div className="flex items-center space-x-2">
+            {data.uncertainty_heatmap_url && (
+              <button
+                onClick={() => setShowUncertainty(!showUncertainty)}
+                className={`px-2 py-1 rounded-lg border text-sm transition-colors ${
+                  showUncertainty
+                    ? 'bg-orange-50 border-orange-200 text-orange-700'
+                    : 'bg-green-50 border-green-100 text-gray-600'
+                }`}
+              >
+                {showUncertainty ? 'Belirsizlik' : 'Tahmin'}
+              </button>
+            )}
             <div className="flex items-center space-x-1 px-2 py-1 rounded-lg bg-green-50 border border-green-100 text-sm text-gray-600">
               <Clock className="w-3 h-3" />
               <span>{data.processing_time?.toFixed(2)}s</span>
@@ -50,7 +66,7 @@ function ComparisonCard({ modelName, data, onDownload, hasGroundTruth }) {
           onMouseLeave={() => setHoverValue(null)}
         >
           <img
-            src={`data:image/png;base64,${data.heatmap}`}
+            src={heatmapUrl}
             alt={`${modelName} tahmini`}
             className="w-full h-full object-cover"
           />
@@ -77,13 +93,23 @@ function ComparisonCard({ modelName, data, onDownload, hasGroundTruth }) {
           </button>
 
           {/* Colorbar */}
-          <div className="absolute bottom-2 left-2 right-2 h-3 rounded-full overflow-hidden bg-gradient-to-r from-green-600 via-emerald-400 to-yellow-400 opacity-80">
-            <div className="absolute inset-0 flex justify-between items-center px-2 text-[8px] text-white font-medium">
-              <span>0</span>
-              <span>200</span>
-              <span>400 Mg/ha</span>
+          {showUncertainty && data.uncertainty_heatmap_url ? (
+            <div className="absolute bottom-2 left-2 right-2 h-3 rounded-full overflow-hidden bg-gradient-to-r from-gray-900 via-fuchsia-700 to-orange-300 opacity-80">
+              <div className="absolute inset-0 flex justify-between items-center px-2 text-[8px] text-white font-medium">
+                <span>0</span>
+                <span>50</span>
+                <span>100 Mg/ha σ</span>
+              </div>
             </div>
-          </div>
+          ) : (
+            <div className="absolute bottom-2 left-2 right-2 h-3 rounded-full overflow-hidden bg-gradient-to-r from-green-600 via-emerald-400 to-yellow-400 opacity-80">
+              <div className="absolute inset-0 flex justify-between items-center px-2 text-[8px] text-white font-medium">
+                <span>0</span>
+                <span>200</span>
+                <span>400 Mg/ha</span>
+              </div>
+            </div>
+          )}
         </div>
 
         {/* Metrics */}
@@ -147,7 +173,7 @@ function ComparisonCard({ modelName, data, onDownload, hasGroundTruth }) {
             </button>
             <div className="rounded-2xl overflow-hidden shadow-2xl">
               <img
-                src={`data:image/png;base64,${data.heatmap}`}
+                src={heatmapUrl}
                 alt={`${modelName} tahmini büyütülmüş`}
                 className="w-full h-auto"
               />
@@ -25,6 +25,7 @@ const API_BASE = '/api'
 
 function Predict() {
   const [chips, setChips] = useState([])
+  const [chipTotal, setChipTotal] = useState(0)
   const [selectedChip, setSelectedChip] = useState('')
   const [uploadedFiles, setUploadedFiles] = useState([])
   const [isLoading, setIsLoading] = useState(false)
@@ -45,6 +46,7 @@ function Predict() {
     try {
       const response = await axios.get(`${API_BASE}/chips`)
       setChips(response.data.chips || [])
+      setChipTotal(response.data.total ?? response.data.chips?.length ?? 0)
       if (response.data.chips?.length > 0) {
         setSelectedChip(response.data.chips[0])
       }
@@ -241,7 +243,8 @@ function Predict() {
                     <ChevronDown className="absolute right-4 top-1/2 -translate-y-1/2 w-5 h-5 text-gray-500 pointer-events-none" />
                   </div>
                   <p className="mt-3 text-sm text-gray-600">
-                    {chips.length} çip mevcut
+                    {chipTotal} çip mevcut
+                    {chipTotal > chips.length && ` (ilk ${chips.length} listeleniyor)`}
                   </p>
                 </motion.div>
               ) : (
@@ -432,7 +435,7 @@ function Predict() {
                       <div className="max-w-md mx-auto">
                         <div className="aspect-square rounded-xl overflow-hidden bg-gray-100">
                           <img
-                            src={`data:image/png;base64,${groundTruth.heatmap}`}
+                            src={groundTruth.heatmap_url}
                             alt="Referans Verisi"
                             className="w-full h-full object-cover"
                           />
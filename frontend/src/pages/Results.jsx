@@ -249,8 +249,9 @@ function Results() {
                         {/* Heatmap */}
                         <div className="aspect-square rounded-xl overflow-hidden bg-gray-100 mb-4">
                           <img
-                            src={`data:image/png;base64,${data.heatmap}`}
+                            src={data.heatmap_url}
                             alt={`${modelName} tahmini`}
+                            loading="lazy"
                             className="w-full h-full object-cover"
                           />
                         </div>
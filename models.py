@@ -34,13 +34,13 @@ class AttentionPooling(nn.Module):
 
 
 class TimmEncoder(nn.Module):
-    def __init__(self, cfg, output_stride=32):
+    def __init__(self, cfg, output_stride=32, pretrained=True):
         super().__init__()
         depth = len(cfg.out_indices)
         self.model = timm.create_model(
             cfg.backbone,
             in_chans=cfg.in_channels,
-            pretrained=True,
+            pretrained=pretrained,
             num_classes=0,
             features_only=True,
             output_stride=output_stride if output_stride != 32 else None,
@@ -67,10 +67,10 @@ class TimmEncoder(nn.Module):
 
 
 class UnetVFLOW(nn.Module):
-    def __init__(self, args, decoder_use_batchnorm: bool = True):
+    def __init__(self, args, decoder_use_batchnorm: bool = True, pretrained: bool = True):
         super().__init__()
         encoder_name = args.backbone
-        self.encoder = TimmEncoder(args)
+        self.encoder = TimmEncoder(args, pretrained=pretrained)
         encoder_depth = len(self.encoder.out_channels) - 1
 
         self.attn = nn.ModuleList(
@@ -120,4 +120,18 @@ class UnetVFLOW(nn.Module):
 
         masks = self.segmentation_head(decoder_output)
 
-        return masks
\ No newline at end of file
+        return masks
+
+
+def load_from_checkpoint(checkpoint, device="cpu"):
+    """
+    Build a UnetVFLOW from a loaded checkpoint dict without pretrained weights.
+
+    The architecture is created on the meta device, so neither the ImageNet
+    download nor any weight initialisation happens; the checkpoint tensors are
+    then assigned in place of the empty parameters.
+    """
+    with torch.device("meta"):
+        model = UnetVFLOW(checkpoint['args'], pretrained=False)
+    model.load_state_dict(checkpoint['state_dict'], assign=True)
+    return model.to(device).eval()